@@ -0,0 +1,424 @@
+"""
+batch.py
+
+Offline Portfolio Scoring
+
+Scores a file of portfolios without going through the HTTP API: each
+portfolio runs the same validation, cached price loading, metrics and Monte
+Carlo projection as /analyze_portfolio (run_portfolio_analysis), and one
+compact result line per portfolio is streamed to a JSONL file.
+
+- The union of all tickers is fetched once up front, through the shared price
+  cache, so workers only read cached prices.
+- Portfolios are scored on a process pool (BATCH_WORKERS or --workers, default:
+  CPU count); --workers 1 scores in this process.
+- Each result line is flushed as soon as it is ready. Re-running with the same
+  output file resumes: portfolios whose id already has a result are skipped
+  (--retry-errors re-scores the ones that failed).
+- --parquet additionally writes the finished results as a Parquet file
+  (requires pyarrow).
+
+Input formats (chosen by file extension):
+- .jsonl: one object per line with the /analyze_portfolio fields ('tickers',
+  'weights', optional 'initial_investment', 'monthly_contribution',
+  'contribution_frequency', 'num_paths', 'rebalance_frequency',
+  'rebalance_threshold') and an optional 'id'
+- .csv: a header row with the same column names; 'tickers' and 'weights' hold
+  ';'-separated lists (e.g. "AAPL;MSFT" and "0.6;0.4")
+Rows without an id are numbered by position (1, 2, ...). Ids must be unique.
+
+Usage (from the backend directory):
+    python batch.py portfolios.csv -o scores.jsonl
+    python batch.py portfolios.jsonl -o scores.jsonl --workers 8 --parquet scores.parquet
+    python batch.py portfolios.jsonl -o scores.jsonl --source local
+
+Configuration (environment):
+- BATCH_WORKERS: Default worker process count (default: CPU count)
+- DATA_SOURCE / ALPHAVANTAGE_API_KEY: Price source, as for the API
+"""
+
+import argparse
+import csv
+import importlib.util
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load .env before the logger reads its settings
+load_dotenv()
+
+from core.logger import get_logger, request_id_var
+
+logger = get_logger(__name__)
+
+# Optional portfolio fields read from the input (everything else is ignored)
+OPTIONAL_FIELDS = {
+    'initial_investment': float,
+    'monthly_contribution': float,
+    'contribution_frequency': str,
+    'num_paths': int,
+    'rebalance_frequency': str,
+    'rebalance_threshold': float,
+}
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+
+def _parse_list(value, cast):
+    if isinstance(value, list):
+        return [cast(item) for item in value]
+    return [cast(item.strip()) for item in str(value or '').split(';') if item.strip()]
+
+
+def _portfolio_fields(row):
+    """Portfolio keyword arguments from an input row (CSV strings or JSON values)."""
+    fields = {
+        'tickers': _parse_list(row.get('tickers'), lambda t: str(t).strip().upper()),
+        'weights': _parse_list(row.get('weights'), float)
+    }
+    for name, cast in OPTIONAL_FIELDS.items():
+        value = row.get(name)
+        if value is not None and value != '':
+            fields[name] = cast(value)
+    return fields
+
+
+def read_portfolios(path):
+    """
+    Read portfolios from a CSV or JSONL file.
+
+    Args:
+        path: Input file (.csv or .jsonl)
+
+    Yields:
+        tuple: (id, portfolio fields, error) - error is a message for rows that
+               could not be parsed (fields is then None)
+
+    Raises:
+        ValueError: If the file extension is not supported
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in ('.csv', '.jsonl'):
+        raise ValueError(f"Unsupported input format '{suffix}'. Use .csv or .jsonl.")
+
+    with open(path, 'r', newline='') as f:
+        if suffix == '.csv':
+            rows = enumerate(csv.DictReader(f), start=1)
+        else:
+            rows = ((number, line) for number, line in enumerate(f, start=1) if line.strip())
+
+        for number, row in rows:
+            try:
+                if suffix == '.jsonl':
+                    row = json.loads(row)
+                    if not isinstance(row, dict):
+                        raise ValueError("each line must be a JSON object")
+                portfolio_id = str(row['id']) if row.get('id') not in (None, '') else str(number)
+            except ValueError as e:
+                yield str(number), None, f"Could not parse line {number}: {e}"
+                continue
+            try:
+                yield portfolio_id, _portfolio_fields(row), None
+            except (TypeError, ValueError) as e:
+                yield portfolio_id, None, f"Could not parse row {number}: {e}"
+
+
+def completed_ids(output_path, retry_errors=False):
+    """
+    Ids that already have a result in `output_path`, repairing an interrupted last line.
+
+    Args:
+        output_path: JSONL results file (may not exist)
+        retry_errors: Only count successful results as completed
+
+    Returns:
+        set: Portfolio ids to skip
+    """
+    path = Path(output_path)
+    if not path.exists():
+        return set()
+
+    # A crash can leave a partial last line; cut it so appends start cleanly
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+
+    done = set()
+    for line in data.decode('utf-8').splitlines():
+        try:
+            result = json.loads(line)
+        except ValueError:
+            continue
+        if not retry_errors or result.get('status') == 'ok':
+            done.add(str(result.get('id')))
+    return done
+
+
+def summarize(portfolio_id, analysis):
+    """
+    Compact result line for one analysis response.
+
+    Args:
+        portfolio_id: Portfolio id from the input
+        analysis: run_portfolio_analysis() response or {'error': ...}
+
+    Returns:
+        dict: {'id', 'status': 'ok' | 'error', ...scores or 'error'}
+    """
+    if 'error' in analysis:
+        return {'id': portfolio_id, 'status': 'error', 'error': analysis['error']}
+
+    metrics = analysis['portfolio_metrics']
+    projections = analysis['projections']
+    risk = projections['risk_metrics']
+    result = {
+        'id': portfolio_id,
+        'status': 'ok',
+        'tickers': analysis['tickers'],
+        'weights': [float(w) for w in analysis['weights']],
+        'expected_annual_return': metrics['expected_annual_return'],
+        'annual_volatility': metrics['annual_volatility'],
+        'sharpe_ratio': metrics['sharpe_ratio'],
+        'historical_cagr': projections['cagr'],
+        'projection_years': projections['years'][-1],
+        'final_value_p10': projections['percentiles']['p10'][-1],
+        'final_value_p50': projections['percentiles']['p50'][-1],
+        'final_value_p90': projections['percentiles']['p90'][-1],
+        'var_95': risk['var_95'][-1],
+        'cvar_95': risk['cvar_95'][-1],
+        'max_drawdown_p50': risk['max_drawdown']['p50']
+    }
+    if analysis.get('warning'):
+        result['warning'] = analysis['warning']
+    return result
+
+
+# ---------- Worker side ----------
+
+_worker = {}
+
+
+def _init_worker(source, api_key):
+    """Process pool initializer: import the analysis pipeline once per worker."""
+    import main
+    _worker.update(main=main, source=source, api_key=api_key)
+
+
+def score_portfolio(portfolio_id, fields):
+    """
+    Score one portfolio (in a worker process, or in this one with --workers 1).
+
+    Returns:
+        dict: Result line (see summarize)
+    """
+    main = _worker['main']
+    token = request_id_var.set(f"batch-{portfolio_id}")
+    try:
+        portfolio = main.Portfolio(**fields)
+        analysis = main.run_portfolio_analysis(
+            portfolio, _worker['source'], _worker['api_key'], reject_when_full=False
+        )
+    except Exception as e:
+        logger.exception("Portfolio %s failed", portfolio_id)
+        analysis = {'error': str(e) or type(e).__name__}
+    finally:
+        request_id_var.reset(token)
+    return summarize(portfolio_id, analysis)
+
+
+# ---------- Driver ----------
+
+def _resolve_source(source):
+    """(source name, API key) from --source or the environment."""
+    if source is None:
+        from core.data_adapter import get_provider_from_env
+        source = get_provider_from_env().source_name
+    api_key = os.getenv("ALPHAVANTAGE_API_KEY") if source == 'alpha_vantage' else None
+    return source, api_key
+
+
+def prefetch(portfolios, source, api_key):
+    """
+    Fetch the union of all tickers once, filling the shared price cache.
+
+    Returns:
+        int: Number of tickers with price data
+    """
+    import main
+
+    tickers = sorted({ticker for _, fields in portfolios for ticker in fields['tickers']})
+    if not tickers:
+        return 0
+    start_date, end_date = main.analysis_window()
+    logger.info("Prefetching %d ticker(s) from %s", len(tickers), source)
+    prices_data, _ = main.fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, source, api_key)
+    return len(prices_data)
+
+
+def run_batch(input_path, output_path, workers=None, source=None, retry_errors=False, parquet_path=None):
+    """
+    Score every portfolio in `input_path`, appending result lines to `output_path`.
+
+    Args:
+        input_path: Portfolio file (.csv or .jsonl)
+        output_path: JSONL results file (created or resumed)
+        workers: Worker processes (default: BATCH_WORKERS or CPU count; 1 = in-process)
+        source: Data source name (default: DATA_SOURCE)
+        retry_errors: Re-score portfolios whose previous result was an error
+        parquet_path: Also write all results to this Parquet file at the end
+
+    Returns:
+        dict: {'scored', 'errors', 'skipped', 'seconds'}
+
+    Raises:
+        ValueError: For an unsupported input format
+        RuntimeError: If a Parquet file is requested but pyarrow is not installed
+    """
+    import main
+
+    if parquet_path and importlib.util.find_spec('pyarrow') is None:
+        raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow).")
+    if workers is None:
+        workers = int(os.getenv('BATCH_WORKERS', 0)) or os.cpu_count() or 1
+    source, api_key = _resolve_source(source)
+    started = time.perf_counter()
+
+    done = completed_ids(output_path, retry_errors=retry_errors)
+    pending, results, seen = [], [], set()
+    skipped = 0
+    for portfolio_id, fields, error in read_portfolios(input_path):
+        if portfolio_id in seen:
+            error = error or f"Duplicate id '{portfolio_id}'"
+        seen.add(portfolio_id)
+        if portfolio_id in done:
+            skipped += 1
+            continue
+        if error is None:
+            try:
+                error = main.portfolio_input_error(main.Portfolio(**fields))
+            except Exception as e:  # pydantic rejects wrongly typed fields
+                error = str(e)
+        if error:
+            results.append({'id': portfolio_id, 'status': 'error', 'error': error})
+        else:
+            pending.append((portfolio_id, fields))
+
+    logger.info("%d portfolio(s) to score, %d invalid, %d already done", len(pending), len(results), skipped)
+    counts = {'scored': 0, 'errors': 0}
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'a') as out:
+        def write(result):
+            out.write(json.dumps(result, default=float) + '\n')
+            out.flush()
+            counts['errors' if result['status'] == 'error' else 'scored'] += 1
+
+        for result in results:
+            write(result)
+
+        if pending:
+            prefetch(pending, source, api_key)
+
+        total = len(pending)
+        last_report = time.perf_counter()
+
+        def report(force=False):
+            nonlocal last_report
+            now = time.perf_counter()
+            if force or now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                failed = counts['errors'] - len(results)  # Invalid rows were not scored
+                finished = counts['scored'] + failed
+                rate = finished / max(now - started, 1e-9)
+                logger.info("Scored %d/%d portfolio(s) (%d failed), %.1f/s", finished, total, failed, rate)
+                last_report = now
+
+        if workers <= 1:
+            _init_worker(source, api_key)
+            for portfolio_id, fields in pending:
+                write(score_portfolio(portfolio_id, fields))
+                report()
+        else:
+            # Spawned workers: the parent already runs logging and cache threads,
+            # which a forked child would inherit in an undefined state
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                     initializer=_init_worker, initargs=(source, api_key)) as pool:
+                queue = iter(pending)
+                in_flight = {}
+                # Keep a bounded number of portfolios submitted so results stream out
+                for portfolio_id, fields in queue:
+                    in_flight[pool.submit(score_portfolio, portfolio_id, fields)] = portfolio_id
+                    if len(in_flight) >= workers * 2:
+                        break
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        del in_flight[future]
+                        # A crashed worker raises here; the results written so
+                        # far are kept and a rerun resumes after them
+                        write(future.result())
+                        next_item = next(queue, None)
+                        if next_item is not None:
+                            in_flight[pool.submit(score_portfolio, *next_item)] = next_item[0]
+                    report()
+
+        report(force=True)
+
+    if parquet_path:
+        write_parquet(output_path, parquet_path)
+
+    return {
+        'scored': counts['scored'],
+        'errors': counts['errors'],
+        'skipped': skipped,
+        'seconds': time.perf_counter() - started
+    }
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """Convert a results file to Parquet, keeping the latest line per id."""
+    import pandas as pd
+
+    latest = {}
+    with open(jsonl_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                latest[str(result['id'])] = result
+    pd.DataFrame(list(latest.values())).to_parquet(parquet_path, index=False)
+    logger.info("Wrote %d result(s) to %s", len(latest), parquet_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a file of portfolios offline.")
+    parser.add_argument('input', help="Portfolios (.csv or .jsonl)")
+    parser.add_argument('-o', '--output', required=True, help="Results file (JSONL, appended and resumable)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: BATCH_WORKERS or CPU count; 1 = in-process)")
+    parser.add_argument('--source', default=None, help="Data source (default: DATA_SOURCE)")
+    parser.add_argument('--retry-errors', action='store_true', help="Re-score portfolios that failed before")
+    parser.add_argument('--parquet', default=None, help="Also write the results to this Parquet file")
+    args = parser.parse_args()
+
+    try:
+        summary = run_batch(args.input, args.output, workers=args.workers, source=args.source,
+                            retry_errors=args.retry_errors, parquet_path=args.parquet)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Scored {summary['scored']} portfolio(s), {summary['errors']} error(s), "
+          f"{summary['skipped']} already done, in {summary['seconds']:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the analysis pipeline.
+
+Run with `python -m benchmarks.run` from the backend directory. Benchmarks
+use synthetic return matrices and an offline stub data provider, so results
+do not depend on the network; see benchmarks/run.py for the cases.
+"""
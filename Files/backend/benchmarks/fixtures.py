@@ -0,0 +1,64 @@
+"""
+Benchmark Fixtures
+
+Deterministic synthetic data for the benchmarks:
+- synthetic_returns(): correlated daily return matrices of any shape
+- stub_tickers() and the 'benchmark' data provider: an offline source that
+  generates reproducible price histories, so /analyze_portfolio can be timed
+  end to end without the network
+"""
+
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+STUB_PROVIDER = 'benchmark'
+
+
+def synthetic_returns(num_days=252, num_assets=10, seed=0):
+    """
+    Correlated daily returns from a one-factor model.
+
+    Args:
+        num_days: Rows (trading days)
+        num_assets: Columns (assets)
+        seed: RNG seed
+
+    Returns:
+        pd.DataFrame: Daily returns with columns T0..T{n-1}
+    """
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0004, 0.009, size=(num_days, 1))
+    betas = rng.uniform(0.6, 1.4, size=num_assets)
+    idiosyncratic = rng.normal(0.0001, 0.012, size=(num_days, num_assets))
+    return pd.DataFrame(market * betas + idiosyncratic, columns=[f"T{i}" for i in range(num_assets)])
+
+
+def stub_tickers(count):
+    """Ticker symbols accepted by the portfolio validators."""
+    return [f"BM{i:02d}" for i in range(count)]
+
+
+def fetch_prices(tickers, start, end):
+    """
+    Stub data source: reproducible geometric random walks per ticker.
+
+    Each ticker's path is seeded from its symbol, so repeated fetches (and
+    separate processes) see identical prices.
+    """
+    dates = pd.bdate_range(start=start, end=end, inclusive='left')
+    day_strings = dates.strftime('%Y-%m-%d').tolist()
+    prices = {}
+    for ticker in tickers:
+        rng = np.random.default_rng(zlib.crc32(ticker.encode('utf-8')))
+        closes = 100.0 * np.exp(np.cumsum(rng.normal(0.0003, 0.012, size=len(dates))))
+        prices[ticker] = [{"date": day, "close": close} for day, close in zip(day_strings, closes.tolist())]
+    return prices
+
+
+def register_stub_provider():
+    """Register this module as the offline 'benchmark' data source."""
+    from core.data_adapter import register_provider
+    register_provider(STUB_PROVIDER, sys.modules[__name__], offline=True)
@@ -0,0 +1,153 @@
+"""
+Benchmark Harness
+
+Times callables with time.perf_counter, summarizes the samples, appends each
+run to a JSONL history file and flags cases that got slower than their
+recent history.
+
+History line format:
+    {"timestamp", "commit", "python", "numpy", "machine", "profile",
+     "results": {case_name: {"min_ms", "median_ms", "mean_ms", "p95_ms", "stdev_ms", "runs"}}}
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_HISTORY_PATH = Path(__file__).parent / 'results' / 'history.jsonl'
+REGRESSION_THRESHOLD = 0.20  # Flag cases whose median grew by more than 20%
+BASELINE_WINDOW = 5  # Previous runs whose medians form the baseline
+
+
+def measure(fn, repeat=5, warmup=1, setup=None):
+    """
+    Time a callable.
+
+    Args:
+        fn: Callable to time. Called with the value returned by `setup` if given.
+        repeat: Number of timed runs (default: 5)
+        warmup: Untimed runs before timing (default: 1)
+        setup: Optional untimed callable run before every call (e.g. to build a cold cache)
+
+    Returns:
+        dict: {'min_ms', 'median_ms', 'mean_ms', 'p95_ms', 'stdev_ms', 'runs'}
+    """
+    samples = []
+    for i in range(warmup + repeat):
+        argument = setup() if setup else None
+        started = time.perf_counter()
+        if setup:
+            fn(argument)
+        else:
+            fn()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed * 1000.0)
+
+    ordered = sorted(samples)
+    return {
+        'min_ms': ordered[0],
+        'median_ms': statistics.median(ordered),
+        'mean_ms': statistics.fmean(ordered),
+        'p95_ms': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        'stdev_ms': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        'runs': len(ordered)
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path=DEFAULT_HISTORY_PATH):
+    """Read all previous runs from a history file (oldest first)."""
+    path = Path(path)
+    if not path.exists():
+        return []
+    runs = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    runs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return runs
+
+
+def append_history(results, profile, path=DEFAULT_HISTORY_PATH):
+    """
+    Append one benchmark run to the history file.
+
+    Args:
+        results: {case_name: stats from measure()}
+        profile: Name of the case profile that was run
+        path: History file path (default: benchmarks/results/history.jsonl)
+
+    Returns:
+        dict: The recorded entry
+    """
+    entry = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': f"{platform.machine()} x{os.cpu_count()}",
+        'profile': profile,
+        'results': results
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def find_regressions(results, history, threshold=REGRESSION_THRESHOLD, window=BASELINE_WINDOW):
+    """
+    Compare a run against the median of each case's recent history.
+
+    Args:
+        results: {case_name: stats} for the current run
+        history: Previous runs from load_history() (oldest first)
+        threshold: Relative slowdown that counts as a regression (default: 0.20)
+        window: Number of most recent runs of a case used as its baseline
+
+    Returns:
+        list: [{'case', 'baseline_ms', 'current_ms', 'change'}, ...] slowest change first
+    """
+    regressions = []
+    for case, stats in results.items():
+        previous = [run['results'][case]['median_ms'] for run in history if case in run.get('results', {})]
+        if not previous:
+            continue
+        baseline = statistics.median(previous[-window:])
+        if baseline <= 0:
+            continue
+        change = stats['median_ms'] / baseline - 1.0
+        if change > threshold:
+            regressions.append({
+                'case': case,
+                'baseline_ms': baseline,
+                'current_ms': stats['median_ms'],
+                'change': change
+            })
+
+    regressions.sort(key=lambda r: r['change'], reverse=True)
+    return regressions
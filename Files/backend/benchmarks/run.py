@@ -0,0 +1,347 @@
+"""
+Benchmark Runner
+
+Times the analysis pipeline on synthetic data and records the results:
+- monte_carlo: run_monte_carlo_simulation across path counts, asset counts
+  (up to MAX_PORTFOLIO_SIZE) and horizons, varying one axis at a time from a
+  base case
+- rebalancing: the per-asset holdings engine (monthly and threshold
+  rebalancing) next to the constant-weight engine at the same size
+- backtest: run_backtest over three years of prices for 1 to 500 weight
+  vectors at once (buy and hold, monthly and threshold rebalancing)
+- optimizer: optimize_portfolio frontier for small and large universes
+- cache: get_many/set_many on the JSON and SQLite backends, hit and miss
+- analyze_portfolio: the full endpoint through the ASGI app with the offline
+  'benchmark' provider, with a cold cache (fetch + write) and a warm cache
+- serialization: encoding an analysis-sized response with FastAPI's
+  jsonable_encoder path versus core.serialization (plain and gzip)
+
+Usage (from the backend directory):
+    python -m benchmarks.run                      # standard profile
+    python -m benchmarks.run --profile quick      # fast smoke profile for CI
+    python -m benchmarks.run --filter monte_carlo --repeat 10
+    python -m benchmarks.run --fail-on-regression # exit 1 if any case regressed
+
+Every run is appended to benchmarks/results/history.jsonl (--no-record to
+skip). Cases whose median is more than --threshold slower than the median of
+their last runs are reported as regressions.
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+# Keep pipeline logging out of the timings unless asked for
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+from benchmarks import fixtures
+from benchmarks.harness import (
+    DEFAULT_HISTORY_PATH,
+    REGRESSION_THRESHOLD,
+    append_history,
+    find_regressions,
+    load_history,
+    measure,
+)
+from core.logger import ROOT_LOGGER
+
+# Axis values per profile; each axis is swept with the others held at `base`
+PROFILES = {
+    'quick': {
+        'base': {'paths': 1000, 'assets': 10, 'years': 5},
+        'paths': [1000, 5000],
+        'assets': [1, 10, 50],
+        'years': [5, 10],
+        'optimizer_assets': [10, 50],
+        'cache_tickers': [10, 50],
+        'analyze_assets': [1, 10],
+        'serialization_assets': [10],
+        'rebalance_assets': [10],
+        'backtest_strategies': [1, 100],
+    },
+    'standard': {
+        'base': {'paths': 5000, 'assets': 10, 'years': 10},
+        'paths': [5000, 10000, 20000],
+        'assets': [1, 10, 25, 50],
+        'years': [10, 20, 30],
+        'optimizer_assets': [10, 25, 50],
+        'cache_tickers': [10, 50],
+        'analyze_assets': [1, 10, 50],
+        'serialization_assets': [10, 50],
+        'rebalance_assets': [10, 50],
+        'backtest_strategies': [1, 100, 500],
+    },
+}
+
+_temp_dirs = []
+
+
+def _temp_dir():
+    path = tempfile.mkdtemp(prefix='smartrisk-bench-')
+    _temp_dirs.append(path)
+    return path
+
+
+def _quiet(fn):
+    """Run `fn` with the pipeline's loggers silenced (below CRITICAL is dropped)."""
+    def wrapper(*args, **kwargs):
+        logger = logging.getLogger(ROOT_LOGGER)
+        level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            logger.setLevel(level)
+    return wrapper
+
+
+def monte_carlo_cases(profile):
+    from core.monte_carlo import run_monte_carlo_simulation
+
+    base = profile['base']
+    grid = {(base['paths'], base['assets'], base['years'])}
+    grid.update((paths, base['assets'], base['years']) for paths in profile['paths'])
+    grid.update((base['paths'], assets, base['years']) for assets in profile['assets'])
+    grid.update((base['paths'], base['assets'], years) for years in profile['years'])
+
+    # Cases map name -> (fn, setup run untimed before every call, one-off prepare)
+    cases = {}
+    for paths, assets, years in sorted(grid):
+        returns = fixtures.synthetic_returns(num_assets=assets)
+        weights = np.full(assets, 1.0 / assets)
+
+        def run(returns=returns, weights=weights, paths=paths, years=years):
+            run_monte_carlo_simulation(
+                returns, weights, num_years=years, num_paths=paths, rng=np.random.default_rng(0)
+            )
+
+        cases[f"monte_carlo/paths={paths}/assets={assets}/years={years}"] = (run, None, None)
+    return cases
+
+
+def rebalancing_cases(profile):
+    from core.monte_carlo import run_monte_carlo_simulation
+
+    paths, years = profile['base']['paths'], profile['base']['years']
+    cases = {}
+    for assets in profile['rebalance_assets']:
+        returns = fixtures.synthetic_returns(num_assets=assets)
+        weights = np.full(assets, 1.0 / assets)
+        # 'daily' is the constant-weight engine, the baseline for the others
+        for frequency in ('daily', 'monthly', 'threshold'):
+            def run(returns=returns, weights=weights, frequency=frequency):
+                run_monte_carlo_simulation(
+                    returns, weights, num_years=years, num_paths=paths,
+                    rng=np.random.default_rng(0), rebalance_frequency=frequency
+                )
+
+            cases[f"rebalancing/{frequency}/paths={paths}/assets={assets}/years={years}"] = (run, None, None)
+    return cases
+
+
+def backtest_cases(profile):
+    from core.backtest import run_backtest
+
+    assets = profile['base']['assets']
+    # Three years of prices; one strategy is the baseline for the batched runs
+    prices = 100 * np.cumprod(1 + fixtures.synthetic_returns(num_days=756, num_assets=assets).to_numpy(), axis=0)
+    cases = {}
+    for strategies in profile['backtest_strategies']:
+        weight_sets = np.random.default_rng(0).dirichlet(np.ones(assets), strategies)
+        for frequency in ('never', 'monthly', 'threshold'):
+            def run(weight_sets=weight_sets, frequency=frequency):
+                run_backtest(prices, weight_sets, periodic_contribution=500, rebalance_frequency=frequency)
+
+            cases[f"backtest/{frequency}/strategies={strategies}/assets={assets}"] = (run, None, None)
+    return cases
+
+
+def optimizer_cases(profile):
+    from core.optimizer import optimize_portfolio
+
+    cases = {}
+    for assets in profile['optimizer_assets']:
+        returns = fixtures.synthetic_returns(num_assets=assets)
+        cases[f"optimizer/assets={assets}/points=50"] = (lambda returns=returns: optimize_portfolio(returns), None, None)
+    return cases
+
+
+def cache_cases(profile):
+    from core.cache_manager import StockDataCache
+
+    start_date, end_date = '2024-01-01', '2025-01-01'
+    cases = {}
+    for backend in ('json', 'sqlite'):
+        for count in profile['cache_tickers']:
+            tickers = fixtures.stub_tickers(count)
+            data = fixtures.fetch_prices(tickers, start_date, end_date)
+
+            warm = _quiet(StockDataCache)(cache_dir=_temp_dir(), backend=backend)
+            _quiet(warm.set_many)(data, start_date, end_date, 'benchmark')
+
+            def hit(cache=warm, tickers=tickers):
+                assert len(cache.get_many(tickers, start_date, end_date)) == len(tickers)
+
+            def cold_cache(backend=backend):
+                return _quiet(StockDataCache)(cache_dir=_temp_dir(), backend=backend)
+
+            def miss(cache, tickers=tickers, data=data):
+                cache.get_many(tickers, start_date, end_date)
+                cache.set_many(data, start_date, end_date, 'benchmark')
+
+            cases[f"cache/{backend}/hit/tickers={count}"] = (hit, None, None)
+            cases[f"cache/{backend}/miss/tickers={count}"] = (_quiet(miss), cold_cache, None)
+    return cases
+
+
+def analyze_cases(profile):
+    from fastapi.testclient import TestClient
+
+    import main
+    from core import cache_manager
+
+    fixtures.register_stub_provider()
+    client = TestClient(main.app)
+    headers = {'X-Data-Source': fixtures.STUB_PROVIDER}
+
+    def use_new_cache():
+        cache_manager._cache = _quiet(cache_manager.StockDataCache)(cache_dir=_temp_dir())
+
+    cases = {}
+    for assets in profile['analyze_assets']:
+        body = {'tickers': fixtures.stub_tickers(assets), 'weights': [round(1.0 / assets, 4)] * assets}
+
+        def post(_=None, body=body):
+            response = client.post('/analyze_portfolio', json=body, headers=headers)
+            assert response.status_code == 200 and 'error' not in response.json(), response.text
+
+        def warm_setup(body=body):
+            use_new_cache()
+            _quiet(post)(None, body)
+
+        cases[f"analyze_portfolio/cold/assets={assets}"] = (_quiet(post), use_new_cache, None)
+        # Warm runs reuse a cache populated once before timing
+        cases[f"analyze_portfolio/warm/assets={assets}"] = (_quiet(post), None, warm_setup)
+    return cases
+
+
+def serialization_cases(profile):
+    import gzip
+    import json
+
+    from fastapi.encoders import jsonable_encoder
+
+    from core.monte_carlo import run_monte_carlo_simulation
+    from core.serialization import dumps_json
+
+    cases = {}
+    for assets in profile['serialization_assets']:
+        tickers = fixtures.stub_tickers(assets)
+        returns = fixtures.synthetic_returns(num_assets=assets)
+        returns.columns = tickers
+        weights = [1.0 / assets] * assets
+        simulation = run_monte_carlo_simulation(returns, weights, num_years=10, num_paths=1000, rng=np.random.default_rng(0))
+        # Shape of an /analyze_portfolio response
+        payload = {
+            'individual_metrics': {
+                ticker: {'expected_annual_return': 0.1, 'annual_volatility': 0.2, 'sharpe_ratio': 0.3}
+                for ticker in tickers
+            },
+            'projections': simulation,
+            'tickers': tickers,
+            'weights': weights,
+            'data_sources': {ticker: {'source': 'benchmark', 'cached': True} for ticker in tickers},
+        }
+
+        def baseline(payload=payload):
+            json.dumps(jsonable_encoder(payload), allow_nan=False).encode('utf-8')
+
+        cases[f"serialization/jsonable_encoder/assets={assets}"] = (baseline, None, None)
+        cases[f"serialization/dumps_json/assets={assets}"] = (lambda payload=payload: dumps_json(payload), None, None)
+        cases[f"serialization/dumps_json+gzip/assets={assets}"] = (
+            lambda payload=payload: gzip.compress(dumps_json(payload), compresslevel=5), None, None
+        )
+    return cases
+
+
+CASE_GROUPS = {
+    'monte_carlo': monte_carlo_cases,
+    'rebalancing': rebalancing_cases,
+    'backtest': backtest_cases,
+    'optimizer': optimizer_cases,
+    'cache': cache_cases,
+    'analyze_portfolio': analyze_cases,
+    'serialization': serialization_cases,
+}
+
+
+def run_benchmarks(profile_name='standard', repeat=3, case_filter=None):
+    """
+    Run the benchmark cases of a profile.
+
+    Args:
+        profile_name: 'quick' or 'standard'
+        repeat: Timed runs per case
+        case_filter: Optional substring; only matching case names run
+
+    Returns:
+        dict: {case_name: stats from measure()}
+    """
+    profile = PROFILES[profile_name]
+    results = {}
+    try:
+        for build_cases in CASE_GROUPS.values():
+            for name, (fn, setup, prepare) in build_cases(profile).items():
+                if case_filter and case_filter not in name:
+                    continue
+                if prepare:
+                    prepare()
+                results[name] = measure(fn, repeat=repeat, warmup=1, setup=setup)
+                stats = results[name]
+                print(f"{name:<55} median {stats['median_ms']:>10.1f} ms   p95 {stats['p95_ms']:>10.1f} ms")
+    finally:
+        for path in _temp_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        _temp_dirs.clear()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the SmartRisk performance benchmarks")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='standard')
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case (default: 3)")
+    parser.add_argument('--filter', dest='case_filter', help="Only run cases whose name contains this text")
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY_PATH), help="History JSONL file")
+    parser.add_argument('--no-record', action='store_true', help="Do not append this run to the history")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="Relative slowdown reported as a regression (default: 0.20)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Exit with status 1 on regressions")
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    results = run_benchmarks(args.profile, repeat=args.repeat, case_filter=args.case_filter)
+    regressions = find_regressions(results, history, threshold=args.threshold)
+
+    if not args.no_record:
+        append_history(results, args.profile, path=args.history)
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) against recent history:")
+        for regression in regressions:
+            print(
+                f"  {regression['case']}: {regression['baseline_ms']:.1f} ms -> "
+                f"{regression['current_ms']:.1f} ms (+{regression['change'] * 100:.0f}%)"
+            )
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("\nNo regressions against recent history.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Historical Backtest Module
+
+Replays buy-and-hold and rebalanced strategies with periodic contributions over
+an aligned historical price panel, evaluating many weight vectors at once.
+
+Every strategy shares the same prices, contribution days and (for calendar
+schedules) rebalance days, so the work is organized around the schedule
+rather than the strategy:
+- "never" (buy and hold) and calendar rebalancing split the history into
+  segments between rebalance days. Within a segment each asset's holding just
+  follows its price, so the values of all strategies over the whole segment
+  are two matrix products of the (days x assets) panel with the
+  (assets x strategies) weight matrix. Contributions are invested at the
+  target weights, i.e. they add units bought at that day's prices.
+- "daily" (constant weights) compounds the portfolio returns R @ W^T and folds
+  contributions in with a cumulative sum, with no per-day loop.
+- "threshold" depends on each strategy's own drift, so it steps day by day,
+  updating the (strategies x assets) holdings of all strategies together.
+
+Hundreds of weight vectors therefore cost about one pass over the data.
+
+Returns, CAGR, drawdowns and volatility are time-weighted: each day's return
+excludes that day's contribution, so deposits do not count as performance.
+Schedules match core.monte_carlo: contributions land at the close of every
+CONTRIBUTION_INTERVALS[frequency]-th trading day and calendar rebalances every
+REBALANCE_INTERVALS[frequency]-th, both counted from the first day.
+"""
+
+import numpy as np
+
+from core import metrics
+from core.monte_carlo import (
+    CONTRIBUTION_INTERVALS,
+    DAYS_IN_YEAR,
+    DEFAULT_REBALANCE_THRESHOLD,
+    REBALANCE_FREQUENCIES,
+    REBALANCE_INTERVALS,
+)
+
+DEFAULT_ROLLING_WINDOW = 63  # ~3 months of trading days
+
+
+def _contribution_flows(num_days, periodic_contribution, contribution_frequency):
+    """Cash added at the close of each day (length num_days, zero on day 0)."""
+    flows = np.zeros(num_days)
+    if periodic_contribution > 0:
+        interval = CONTRIBUTION_INTERVALS.get(contribution_frequency, 21)
+        flows[interval::interval] = periodic_contribution
+    return flows
+
+
+def _segment_values(prices, weight_sets, start_values, flows):
+    """
+    Value of buy-and-hold strategies over one segment.
+
+    Args:
+        prices: (L x n) prices; row 0 is the day the segment's holdings are set
+        weight_sets: (S x n) target weights
+        start_values: (S,) strategy values at row 0, held at the target weights
+        flows: (L,) contributions at the close of each row (row 0 is ignored)
+
+    Returns:
+        np.array: (L x S) strategy values
+    """
+    relative = prices / prices[0]
+    flows = flows.copy()
+    flows[0] = 0.0
+    # Units of each asset bought per unit of weight by the contributions so far
+    units = np.cumsum(flows[:, None] / prices, axis=0)
+    return start_values * (relative @ weight_sets.T) + (units * prices) @ weight_sets.T
+
+
+def _simulate_calendar(prices, weight_sets, initial_value, flows, interval):
+    """Buy and hold (interval None) or rebalance every `interval` days, segment by segment."""
+    num_days = len(prices)
+    boundaries = list(range(0, num_days, interval)) if interval else [0]
+    equity = np.empty((num_days, len(weight_sets)))
+    values = np.full(len(weight_sets), float(initial_value))
+
+    for start, stop in zip(boundaries, boundaries[1:] + [num_days]):
+        # The next boundary's row is included: its close is where the rebalance happens
+        end = min(stop, num_days - 1)
+        segment = _segment_values(prices[start:end + 1], weight_sets, values, flows[start:end + 1])
+        equity[start:end + 1] = segment
+        values = segment[-1]
+
+    return equity, np.full(len(weight_sets), len(boundaries) - 1)
+
+
+def _simulate_daily(prices, weight_sets, initial_value, flows):
+    """Constant weights: compound the portfolio returns and add the contributions."""
+    asset_returns = prices[1:] / prices[:-1] - 1.0
+    growth = np.ones((len(prices), len(weight_sets)))
+    np.cumprod(1.0 + asset_returns @ weight_sets.T, axis=0, out=growth[1:])
+    # V_t = G_t * (V_0 + sum_{k <= t} c_k / G_k)
+    equity = growth * (initial_value + np.cumsum(flows[:, None] / growth, axis=0))
+    return equity, np.full(len(weight_sets), len(prices) - 1)
+
+
+def _simulate_threshold(prices, weight_sets, initial_value, flows, threshold):
+    """Rebalance each strategy whenever one of its weights drifts beyond `threshold`."""
+    relatives = prices[1:] / prices[:-1]
+    holdings = weight_sets * float(initial_value)
+    equity = np.empty((len(prices), len(weight_sets)))
+    equity[0] = initial_value
+    counts = np.zeros(len(weight_sets), dtype=np.int64)
+
+    for day in range(1, len(prices)):
+        holdings *= relatives[day - 1]
+        if flows[day]:
+            holdings += weight_sets * flows[day]
+        totals = holdings.sum(axis=1)
+
+        drift = np.abs(holdings / totals[:, None] - weight_sets).max(axis=1)
+        due = drift > threshold
+        if due.any():
+            holdings[due] = weight_sets[due] * totals[due, None]
+            counts += due
+        equity[day] = totals
+
+    return equity, counts
+
+
+def _rolling_std(returns, window):
+    """Rolling sample standard deviation over `window` rows of a (T x S) array."""
+    num_rows = len(returns)
+    if window < 2 or num_rows < window:
+        return np.empty((0, returns.shape[1]))
+    # Centering first keeps the running-sum formula accurate
+    centered = returns - returns.mean(axis=0)
+    sums = np.cumsum(np.vstack([np.zeros(returns.shape[1]), centered]), axis=0)
+    squares = np.cumsum(np.vstack([np.zeros(returns.shape[1]), centered ** 2]), axis=0)
+    window_sums = sums[window:] - sums[:-window]
+    window_squares = squares[window:] - squares[:-window]
+    variance = (window_squares - window_sums ** 2 / window) / (window - 1)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def run_backtest(
+    prices,
+    weight_sets,
+    initial_value=10000.0,
+    periodic_contribution=0.0,
+    contribution_frequency="monthly",
+    rebalance_frequency="never",
+    rebalance_threshold=DEFAULT_REBALANCE_THRESHOLD,
+    rolling_window=DEFAULT_ROLLING_WINDOW,
+):
+    """
+    Backtest one or more weight vectors over historical prices.
+
+    Args:
+        prices (pd.DataFrame | np.array): Aligned prices (rows=dates, cols=assets), oldest first
+        weight_sets (np.array): (S x n) weight vectors, one strategy per row (a single
+                                vector of length n is treated as one strategy)
+        initial_value (float): Amount invested at the first close (default: 10000)
+        periodic_contribution (float): Amount added per contribution (default: 0.0)
+        contribution_frequency (str): "monthly", "quarterly" or "annually" (default: "monthly")
+        rebalance_frequency (str): "never" (buy and hold, default), "daily",
+                                   "monthly", "quarterly", "annually" or "threshold"
+        rebalance_threshold (float): Weight drift that triggers a "threshold"
+                                     rebalance (default: 0.05)
+        rolling_window (int): Trading days per rolling volatility window (default: 63)
+
+    Returns:
+        dict: {
+            'equity': (T x S) strategy values at each close,
+            'contributed': (T,) capital invested up to each close,
+            'cagr': (S,) time-weighted compound annual growth rates,
+            'max_drawdown': (S,) worst peak-to-trough decline of the time-weighted value,
+            'annual_volatility': (S,) annualized volatility of daily returns,
+            'rolling_volatility': (T - window x S) annualized volatility of the
+                                  trailing `rolling_window` daily returns, for
+                                  closes window, window + 1, ..., T - 1 (empty
+                                  if the history is shorter than the window),
+            'rebalance_counts': (S,) rebalances performed
+        }
+
+    Raises:
+        ValueError: If the inputs are inconsistent or prices are not positive
+    """
+    if rebalance_frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"rebalance_frequency must be one of {REBALANCE_FREQUENCIES}")
+
+    prices = np.asarray(prices, dtype=np.float64)
+    weight_sets = np.atleast_2d(np.asarray(weight_sets, dtype=np.float64))
+    if prices.ndim != 2 or len(prices) < 2:
+        raise ValueError("At least two days of prices are required.")
+    if weight_sets.shape[1] != prices.shape[1]:
+        raise ValueError(
+            f"Weight vectors have {weight_sets.shape[1]} entries but there are {prices.shape[1]} assets."
+        )
+    if not np.all(np.isfinite(prices)) or np.any(prices <= 0):
+        raise ValueError("Prices must be positive and finite.")
+
+    num_days = len(prices)
+    flows = _contribution_flows(num_days, periodic_contribution, contribution_frequency)
+
+    with metrics.span('backtest'):
+        if rebalance_frequency == "daily":
+            equity, rebalance_counts = _simulate_daily(prices, weight_sets, initial_value, flows)
+        elif rebalance_frequency == "threshold":
+            equity, rebalance_counts = _simulate_threshold(
+                prices, weight_sets, initial_value, flows, rebalance_threshold
+            )
+        else:
+            equity, rebalance_counts = _simulate_calendar(
+                prices, weight_sets, initial_value, flows, REBALANCE_INTERVALS.get(rebalance_frequency)
+            )
+
+        # Time-weighted daily returns: the day's contribution is not a gain
+        daily_returns = (equity[1:] - flows[1:, None]) / equity[:-1] - 1.0
+        growth_index = np.ones_like(equity)
+        np.cumprod(1.0 + daily_returns, axis=0, out=growth_index[1:])
+        cagr = growth_index[-1] ** (DAYS_IN_YEAR / (num_days - 1)) - 1.0
+        max_drawdown = np.max(1.0 - growth_index / np.maximum.accumulate(growth_index, axis=0), axis=0)
+
+        annual_volatility = (
+            daily_returns.std(axis=0, ddof=1) * np.sqrt(DAYS_IN_YEAR)
+            if len(daily_returns) > 1 else np.zeros(len(weight_sets))
+        )
+        rolling_volatility = _rolling_std(daily_returns, rolling_window) * np.sqrt(DAYS_IN_YEAR)
+
+    return {
+        'equity': equity,
+        'contributed': initial_value + np.cumsum(flows),
+        'cagr': cagr,
+        'max_drawdown': max_drawdown,
+        'annual_volatility': annual_volatility,
+        'rolling_volatility': rolling_volatility,
+        'rebalance_counts': rebalance_counts
+    }
@@ -0,0 +1,211 @@
+"""
+Cache Index Module
+
+Compact SQLite index of the price cache. Records key, ticker, window, source,
+write timestamp, payload size and last access for every cache entry, so that
+expiry sweeps, size-bounded LRU eviction and cache statistics are answered
+with indexed queries instead of opening every payload file.
+
+The index lives next to the payloads (cache/index.sqlite3) in WAL mode, so
+several worker processes can read it concurrently while one writes.
+"""
+
+import sqlite3
+import threading
+import time
+
+# Minimum seconds between last-access updates for the same key in one process
+TOUCH_INTERVAL_SECONDS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT PRIMARY KEY,
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    size INTEGER NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_timestamp ON entries (timestamp);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_ticker ON entries (ticker, timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class CacheIndex:
+    """
+    SQLite-backed index of cache entries.
+    """
+
+    def __init__(self, path):
+        """
+        Open (and create if needed) the index database.
+
+        Args:
+            path: Path of the SQLite file
+        """
+        self.path = str(path)
+        self._local = threading.local()
+        self._last_touch = {}
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        """Get this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def is_built(self):
+        """Whether the index has been populated from the payload files at least once."""
+        row = self._connection().execute("SELECT value FROM meta WHERE name = 'built'").fetchone()
+        return row is not None
+
+    def record(self, cache_key, ticker, start_date, end_date, source, timestamp, size):
+        """Insert or replace the index row for a freshly written entry."""
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries "
+            "(cache_key, ticker, start_date, end_date, source, timestamp, size, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (cache_key, ticker, start_date, end_date, source, timestamp, size, timestamp)
+        )
+        self._last_touch[cache_key] = timestamp
+
+    def replace_all(self, rows):
+        """
+        Replace every row with `rows` and mark the index built, in one transaction.
+
+        Readers in other processes see either the old index or the complete new one.
+
+        Args:
+            rows: (cache_key, ticker, start_date, end_date, source, timestamp, size) tuples
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM entries")
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(cache_key, ticker, start_date, end_date, source, timestamp, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [row + (row[5],) for row in rows]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('built', ?)", (str(time.time()),))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._last_touch.clear()
+
+    def touch(self, cache_key, when=None):
+        """Record a cache hit for LRU ordering (throttled per key)."""
+        when = when or time.time()
+        if when - self._last_touch.get(cache_key, 0) < TOUCH_INTERVAL_SECONDS:
+            return
+        self._last_touch[cache_key] = when
+        self._connection().execute("UPDATE entries SET last_access = ? WHERE cache_key = ?", (when, cache_key))
+
+    def timestamp(self, cache_key):
+        """Write timestamp of an entry, or None if it is not indexed."""
+        row = self._connection().execute("SELECT timestamp FROM entries WHERE cache_key = ?", (cache_key,)).fetchone()
+        return row[0] if row else None
+
+    def remove(self, cache_key):
+        """Delete the index row of an entry (no-op if it is not indexed)."""
+        self._last_touch.pop(cache_key, None)
+        self._connection().execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+
+    def clear(self):
+        """Delete every index row (the built marker is kept)."""
+        self._last_touch.clear()
+        self._connection().execute("DELETE FROM entries")
+
+    def expired_keys(self, cutoff):
+        """Keys written before `cutoff` (epoch seconds), oldest first."""
+        rows = self._connection().execute(
+            "SELECT cache_key FROM entries WHERE timestamp < ? ORDER BY timestamp", (cutoff,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def windows(self, tickers, cutoff):
+        """
+        Windows cached for `tickers` and written at or after `cutoff`, newest first.
+
+        Returns:
+            list: [(ticker, start_date, end_date), ...]
+        """
+        if not tickers:
+            return []
+        placeholders = ','.join('?' * len(tickers))
+        return self._connection().execute(
+            f"SELECT ticker, start_date, end_date FROM entries "
+            f"WHERE ticker IN ({placeholders}) AND timestamp >= ? ORDER BY timestamp DESC",
+            (*tickers, cutoff)
+        ).fetchall()
+
+    def total_size(self):
+        """Sum of the indexed payload sizes in bytes."""
+        row = self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return int(row[0])
+
+    def eviction_candidates(self, max_bytes):
+        """
+        Least recently used keys to delete so the indexed payloads fit in `max_bytes`.
+
+        Returns:
+            list: [(cache_key, size), ...] in eviction order
+        """
+        excess = self.total_size() - max_bytes
+        if excess <= 0:
+            return []
+
+        candidates = []
+        cursor = self._connection().execute("SELECT cache_key, size FROM entries ORDER BY last_access")
+        for cache_key, size in cursor:
+            if excess <= 0:
+                break
+            candidates.append((cache_key, size))
+            excess -= size
+        return candidates
+
+    def stats(self, ttl_seconds):
+        """
+        Summary statistics for the indexed cache.
+
+        Returns:
+            dict: {
+                'entries', 'total_bytes', 'expired_entries',
+                'oldest_timestamp', 'newest_timestamp',
+                'by_source': {source: {'entries', 'bytes'}}
+            }
+        """
+        conn = self._connection()
+        cutoff = time.time() - ttl_seconds
+        entries, total_bytes, oldest, newest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(timestamp), MAX(timestamp) FROM entries"
+        ).fetchone()
+        expired = conn.execute("SELECT COUNT(*) FROM entries WHERE timestamp < ?", (cutoff,)).fetchone()[0]
+        by_source = {
+            source: {'entries': count, 'bytes': int(size)}
+            for source, count, size in conn.execute(
+                "SELECT source, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY source"
+            )
+        }
+        return {
+            'entries': entries,
+            'total_bytes': int(total_bytes),
+            'expired_entries': expired,
+            'oldest_timestamp': oldest,
+            'newest_timestamp': newest,
+            'by_source': by_source
+        }
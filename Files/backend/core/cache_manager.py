@@ -3,29 +3,248 @@ Stock Data Caching Module
 
 Provides intelligent caching for stock price data to minimize API calls and
 work around rate limits (especially Alpha Vantage's 5 calls/minute limit).
+
+Backends:
+- json (default): one JSON file per ticker and window (JsonFileBackend)
+- sqlite: (ticker, source, date) price rows in a single database, with an
+  aligned multi-ticker panel query (core/sqlite_cache.py)
+Select with CACHE_BACKEND; StockDataCache exposes the same API for both.
+
+JSON backend concurrency:
+- Entries are written to a temp file and atomically renamed into place, so a
+  reader in any process sees either the old or the new file, never a partial one
+- Writers and deleters serialize on a per-key advisory lock (fcntl, striped
+  over a fixed set of lock files); deleters re-check the entry under the lock,
+  so an entry refreshed by another worker is never removed as expired/corrupt
+- Reads take no lock
+
+JSON backend index:
+- A SQLite index (core/cache_index.py) records key, size, timestamp, source
+  and last access for every entry, so expiry sweeps, size-bounded LRU
+  eviction and statistics never open payload files
+- set_many() runs the expiry sweep at most once per SWEEP_INTERVAL_SECONDS
+  per process, so old daily windows do not pile up on disk
+
+Stale-while-revalidate:
+- Entries past their TTL are kept for another max_stale_hours. lookup()
+  still returns them, flagged as stale, so the caller can answer at once
+  and refresh them with revalidate() on a background thread (one refresh
+  per entry at a time). Only entries older than TTL + max_stale_hours are
+  misses and cost an upstream fetch on the request path; both backends delete
+  them in the periodic sweep run by set_many().
+- The analysis window moves every day, so a ticker whose exact window is
+  missing falls back to its newest entry (fresh or stale) whose window
+  covers at least MIN_WINDOW_COVERAGE of the requested one. The entry is
+  trimmed to the requested dates and always reported stale, so the exact
+  window is fetched in the background.
 """
 
 import os
 import json
+import sqlite3
 import time
-from datetime import datetime, timedelta
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
 from pathlib import Path
 
+from core import metrics
+from core.cache_index import CacheIndex
+from core.logger import get_logger
 
-class StockDataCache:
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: atomic renames still protect readers
+    fcntl = None
+
+LOCK_STRIPES = 64  # Number of lock files shared by all cache keys
+MIN_WINDOW_COVERAGE = 0.9  # Share of a requested window a fallback entry must cover
+SWEEP_INTERVAL_SECONDS = 600  # Minimum seconds between expiry sweeps in one process
+
+
+def write_json_atomic(path, data):
+    """
+    Write JSON to `path` via a temp file and an atomic rename.
+
+    Args:
+        path: Destination file path
+        data: JSON-serializable object
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def window_coverage(start_date, end_date, other_start, other_end):
+    """
+    Share of the window [start_date, end_date] covered by [other_start, other_end].
+
+    Returns:
+        float: 0.0 (disjoint) to 1.0 (fully covered)
+    """
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    span = (end - start).days
+    if span <= 0:
+        return 1.0 if other_start <= start_date and end_date <= other_end else 0.0
+    overlap = (min(end, date.fromisoformat(other_end)) - max(start, date.fromisoformat(other_start))).days
+    return max(0, overlap) / span
+
+
+def trim_to_window(data, start_date, end_date):
+    """Price points of `data` dated within [start_date, end_date]."""
+    return [point for point in data if start_date <= point['date'] <= end_date]
+
+
+class CacheBackend:
+    """
+    Storage interface for the price cache.
+
+    Backends store per-ticker price lists for a (start_date, end_date) window
+    together with the original data source, and honour a TTL.
+    """
+
+    _last_sweep = 0.0
+
+    def get(self, ticker, start_date, end_date):
+        """Return (price_data, original_source), or (None, None) on a miss."""
+        raise NotImplementedError
+
+    def get_many(self, tickers, start_date, end_date):
+        """
+        Look up several tickers for the same window.
+
+        Returns:
+            dict: {ticker: (price_data, original_source)} for cache hits only
+        """
+        hits = {}
+        for ticker in tickers:
+            data, source = self.get(ticker, start_date, end_date)
+            if data:
+                hits[ticker] = (data, source)
+        return hits
+
+    def get_many_allow_stale(self, tickers, start_date, end_date):
+        """
+        Look up several tickers, including entries past their TTL but within
+        the backend's max-staleness bound.
+
+        Backends without stale retention return fresh hits only.
+
+        Returns:
+            dict: {ticker: (price_data, original_source, is_stale)}
+        """
+        return {
+            ticker: (data, source, False)
+            for ticker, (data, source) in self.get_many(tickers, start_date, end_date).items()
+        }
+
+    @staticmethod
+    def _choose_windows(candidates, start_date, end_date):
+        """
+        Pick each ticker's fallback window for a missed lookup.
+
+        Args:
+            candidates: (ticker, start_date, end_date) rows, newest first
+            start_date: Requested start date (YYYY-MM-DD)
+            end_date: Requested end date (YYYY-MM-DD)
+
+        Returns:
+            dict: {ticker: (start_date, end_date)} of the newest window covering
+                  at least MIN_WINDOW_COVERAGE of the requested one
+        """
+        chosen = {}
+        for ticker, other_start, other_end in candidates:
+            if ticker in chosen or (other_start, other_end) == (start_date, end_date):
+                continue
+            if window_coverage(start_date, end_date, other_start, other_end) >= MIN_WINDOW_COVERAGE:
+                chosen[ticker] = (other_start, other_end)
+        return chosen
+
+    def get_panel(self, tickers, start_date, end_date):
+        """
+        Read fresh prices of several tickers already aligned on their common dates.
+
+        Backends without a panel query return None; callers then align the
+        per-ticker results of get_many themselves.
+
+        Returns:
+            dict: {'dates', 'tickers', 'closes' (one row per date), 'sources'}
+            or None
+        """
+        return None
+
+    def set(self, ticker, start_date, end_date, data, source='unknown'):
+        """Store one ticker's price data for a window."""
+        raise NotImplementedError
+
+    def set_many(self, entries, start_date, end_date, source='unknown'):
+        """
+        Store several tickers fetched from the same source for the same window.
+
+        Args:
+            entries: {ticker: price_data}
+        """
+        for ticker, data in entries.items():
+            self.set(ticker, start_date, end_date, data, source=source)
+
+    def clear_expired(self):
+        """Remove all expired cache entries."""
+        raise NotImplementedError
+
+    def _maybe_sweep(self):
+        """Run clear_expired(), at most once per SWEEP_INTERVAL_SECONDS."""
+        now = time.time()
+        if now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        try:
+            self.clear_expired()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("Cache expiry sweep failed: %s", e)
+
+    def clear_all(self):
+        """Remove all cached data."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Cache statistics (entry counts, sizes, per-source breakdown)."""
+        raise NotImplementedError
+
+
+class JsonFileBackend(CacheBackend):
     """
     Manages caching of stock price data with TTL (time-to-live).
 
     Uses file-based caching for persistence across server restarts.
     """
 
-    def __init__(self, cache_dir=None, ttl_hours=24):
+    def __init__(self, cache_dir=None, ttl_hours=24, max_bytes=None, max_stale_hours=0):
         """
         Initialize the cache manager.
 
         Args:
             cache_dir: Directory to store cache files (default: backend/cache/)
             ttl_hours: Time-to-live in hours (default: 24)
+            max_bytes: Optional payload size budget; least recently used entries
+                       are evicted after writes that exceed it
+            max_stale_hours: Hours past the TTL an entry is kept and may be
+                             served as stale (default: 0)
         """
         if cache_dir is None:
             cache_dir = os.path.join(os.path.dirname(__file__), '..', 'cache')
@@ -33,6 +252,14 @@ class StockDataCache:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.ttl_seconds = ttl_hours * 3600
+        self.max_stale_seconds = max_stale_hours * 3600
+        self.lock_dir = self.cache_dir / '.locks'
+        self.lock_dir.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.index = CacheIndex(self.cache_dir / 'index.sqlite3')
+        if not self.index.is_built():
+            self.rebuild_index()
 
     def _get_cache_key(self, ticker, start_date, end_date):
         """Generate a unique cache key for a ticker and date range."""
@@ -42,6 +269,105 @@ class StockDataCache:
         """Get the file path for a cache key."""
         return self.cache_dir / f"{cache_key}.json"
 
+    @contextmanager
+    def _exclusive_lock(self, cache_key):
+        """Hold the cross-process write lock for a cache key."""
+        if fcntl is None:
+            yield
+            return
+
+        stripe = zlib.crc32(cache_key.encode('utf-8')) % LOCK_STRIPES
+        fd = os.open(self.lock_dir / f"{stripe}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # Closing the descriptor releases the lock
+
+    def _remove_if(self, cache_key, cache_path, should_remove):
+        """
+        Delete a cache file if it still qualifies once the write lock is held.
+
+        Args:
+            cache_key: Cache key (selects the lock)
+            cache_path: File to delete
+            should_remove: Callable taking the parsed entry (or None if unreadable)
+        """
+        with self._exclusive_lock(cache_key):
+            try:
+                with open(cache_path, 'r') as f:
+                    cached_data = json.load(f)
+            except FileNotFoundError:
+                return
+            except (json.JSONDecodeError, OSError):
+                cached_data = None
+
+            if should_remove(cached_data):
+                try:
+                    cache_path.unlink()
+                except FileNotFoundError:
+                    pass
+                self.index.remove(cache_key)
+
+    def _remove_key(self, cache_key, still_removable=None):
+        """
+        Delete an entry and its index row under the write lock.
+
+        Args:
+            cache_key: Cache key to delete
+            still_removable: Optional callable taking the indexed timestamp (None if
+                             unindexed); the entry is kept if it returns False
+        """
+        with self._exclusive_lock(cache_key):
+            if still_removable is not None and not still_removable(self.index.timestamp(cache_key)):
+                return
+            try:
+                self._get_cache_path(cache_key).unlink()
+            except FileNotFoundError:
+                pass
+            self.index.remove(cache_key)
+
+    def _age(self, cached_data, current_time=None):
+        """Seconds since a parsed entry was written (infinite if unreadable)."""
+        if not isinstance(cached_data, dict):
+            return float('inf')
+        return (current_time or time.time()) - cached_data.get('timestamp', 0)
+
+    def _is_expired(self, cached_data, current_time=None):
+        """Whether a parsed entry (None if unreadable) is past its TTL."""
+        return self._age(cached_data, current_time) > self.ttl_seconds
+
+    def _is_past_stale_bound(self, cached_data, current_time=None):
+        """Whether a parsed entry (None if unreadable) is too old to serve even as stale."""
+        return self._age(cached_data, current_time) > self.ttl_seconds + self.max_stale_seconds
+
+    def _read_entry(self, ticker, start_date, end_date):
+        """
+        Read an entry that is fresh or within the staleness bound.
+
+        Returns:
+            tuple: (cache_key, parsed entry), the entry being None on a miss
+        """
+        cache_key = self._get_cache_key(ticker, start_date, end_date)
+        cache_path = self._get_cache_path(cache_key)
+
+        try:
+            with open(cache_path, 'r') as f:
+                cached_data = json.load(f)
+        except FileNotFoundError:
+            return cache_key, None
+        except (json.JSONDecodeError, OSError):
+            # Corrupted cache: delete it unless another worker replaced it meanwhile
+            self._remove_if(cache_key, cache_path, lambda entry: entry is None)
+            return cache_key, None
+
+        if self._is_past_stale_bound(cached_data):
+            # Too old even to serve stale: delete it unless another worker refreshed it meanwhile
+            self._remove_if(cache_key, cache_path, self._is_past_stale_bound)
+            return cache_key, None
+
+        return cache_key, cached_data
+
     def get(self, ticker, start_date, end_date):
         """
         Retrieve cached data if available and not expired.
@@ -54,31 +380,48 @@ class StockDataCache:
         Returns:
             tuple: (price_data, original_source) or (None, None) if not in cache or expired
         """
-        cache_key = self._get_cache_key(ticker, start_date, end_date)
-        cache_path = self._get_cache_path(cache_key)
-
-        if not cache_path.exists():
+        cache_key, cached_data = self._read_entry(ticker, start_date, end_date)
+        if cached_data is None or self._is_expired(cached_data):
             return None, None
 
-        try:
-            with open(cache_path, 'r') as f:
-                cached_data = json.load(f)
+        self.index.touch(cache_key)
+        original_source = cached_data.get('source', 'unknown')
+        return cached_data.get('data'), original_source
 
-            # Check if cache is expired
-            cached_time = cached_data.get('timestamp', 0)
-            if time.time() - cached_time > self.ttl_seconds:
-                # Cache expired, delete it
-                cache_path.unlink()
-                return None, None
+    def get_many_allow_stale(self, tickers, start_date, end_date):
+        """
+        Look up several tickers, including entries within max_stale_hours past the TTL.
 
-            original_source = cached_data.get('source', 'unknown')
-            return cached_data.get('data'), original_source
+        Tickers without an entry for the exact window fall back to their
+        newest entry covering most of it (see _choose_windows), reported stale.
 
-        except (json.JSONDecodeError, KeyError, OSError):
-            # Corrupted cache, delete it
-            if cache_path.exists():
-                cache_path.unlink()
-            return None, None
+        Returns:
+            dict: {ticker: (price_data, original_source, is_stale)}
+        """
+        current_time = time.time()
+        hits = {}
+        for ticker in tickers:
+            cache_key, cached_data = self._read_entry(ticker, start_date, end_date)
+            if cached_data is None or not cached_data.get('data'):
+                continue
+            self.index.touch(cache_key)
+            hits[ticker] = (
+                cached_data['data'],
+                cached_data.get('source', 'unknown'),
+                self._is_expired(cached_data, current_time)
+            )
+
+        missing = [ticker for ticker in tickers if ticker not in hits]
+        if missing and self.max_stale_seconds > 0:
+            cutoff = current_time - self.ttl_seconds - self.max_stale_seconds
+            candidates = self.index.windows(missing, cutoff)
+            for ticker, (other_start, other_end) in self._choose_windows(candidates, start_date, end_date).items():
+                cache_key, cached_data = self._read_entry(ticker, other_start, other_end)
+                data = trim_to_window((cached_data or {}).get('data') or [], start_date, end_date)
+                if data:
+                    self.index.touch(cache_key)
+                    hits[ticker] = (data, cached_data.get('source', 'unknown'), True)
+        return hits
 
     def set(self, ticker, start_date, end_date, data, source='unknown'):
         """
@@ -104,38 +447,282 @@ class StockDataCache:
         }
 
         try:
-            with open(cache_path, 'w') as f:
-                json.dump(cache_entry, f)
+            with self._exclusive_lock(cache_key):
+                write_json_atomic(cache_path, cache_entry)
+                self.index.record(
+                    cache_key, ticker, start_date, end_date, source,
+                    cache_entry['timestamp'], cache_path.stat().st_size
+                )
         except OSError as e:
-            print(f"Warning: Failed to write cache for {ticker}: {e}")
+            logger.warning("Failed to write cache for %s: %s", ticker, e)
+            return
+
+        if self.max_bytes is not None:
+            self.evict_to_size(self.max_bytes)
+
+    def set_many(self, entries, start_date, end_date, source='unknown'):
+        """
+        Store several tickers fetched from the same source for the same window,
+        then sweep expired entries if the last sweep is old enough.
+
+        Args:
+            entries: {ticker: price_data}
+        """
+        for ticker, data in entries.items():
+            self.set(ticker, start_date, end_date, data, source=source)
+        self._maybe_sweep()
 
     def clear_expired(self):
-        """Remove all expired cache entries."""
-        current_time = time.time()
+        """Remove entries past the TTL and the staleness bound (a range query on the index)."""
+        cutoff = time.time() - self.ttl_seconds - self.max_stale_seconds
+
+        for cache_key in self.index.expired_keys(cutoff):
+            # Skip entries another worker rewrote after the query ran
+            self._remove_key(cache_key, lambda timestamp: timestamp is None or timestamp < cutoff)
+
+    def evict_to_size(self, max_bytes):
+        """
+        Evict least recently used entries until payloads fit in `max_bytes`.
+
+        Args:
+            max_bytes: Size budget for all cached payloads
+
+        Returns:
+            int: Number of entries evicted
+        """
+        candidates = self.index.eviction_candidates(max_bytes)
+        for cache_key, _ in candidates:
+            self._remove_key(cache_key)
+        return len(candidates)
 
+    def stats(self):
+        """
+        Cache statistics answered from the index.
+
+        Returns:
+            dict: Entry count, total bytes, expired entries, oldest/newest
+                  timestamps, per-source breakdown and the size budget
+        """
+        stats = self.index.stats(self.ttl_seconds)
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+    def rebuild_index(self):
+        """Rebuild the index by scanning the payload files (one-time migration)."""
+        rows = []
         for cache_file in self.cache_dir.glob("*.json"):
             try:
                 with open(cache_file, 'r') as f:
                     cached_data = json.load(f)
+                rows.append((
+                    cache_file.stem,
+                    cached_data.get('ticker', cache_file.stem.split('_')[0]),
+                    cached_data.get('start_date', ''),
+                    cached_data.get('end_date', ''),
+                    cached_data.get('source', 'unknown'),
+                    float(cached_data.get('timestamp', 0)),
+                    cache_file.stat().st_size
+                ))
+            except (json.JSONDecodeError, OSError, TypeError, ValueError, AttributeError):
+                # Unreadable files are left for get() to clean up
+                continue
 
-                cached_time = cached_data.get('timestamp', 0)
-                if current_time - cached_time > self.ttl_seconds:
-                    cache_file.unlink()
-
-            except (json.JSONDecodeError, KeyError, OSError):
-                # Corrupted file, delete it
-                cache_file.unlink()
+        self.index.replace_all(rows)
 
     def clear_all(self):
         """Remove all cached data."""
         for cache_file in self.cache_dir.glob("*.json"):
-            cache_file.unlink()
+            self._remove_key(cache_file.stem)
+        self.index.clear()
+
+
+class StockDataCache:
+    """
+    Price cache front end over a pluggable storage backend.
+    """
 
+    def __init__(self, cache_dir=None, ttl_hours=24, max_bytes=None, backend='json', max_stale_hours=0):
+        """
+        Initialize the cache with the requested backend.
 
-# Global cache instance
-_cache = StockDataCache()
+        Args:
+            cache_dir: Directory for cache storage (default: backend/cache/)
+            ttl_hours: Time-to-live in hours (default: 24)
+            max_bytes: Optional size budget (JSON backend only)
+            backend: 'json', 'sqlite', or a CacheBackend instance
+            max_stale_hours: Hours past the TTL that lookup() still returns an
+                             entry, flagged as stale (default: 0)
+
+        Raises:
+            ValueError: If the backend name is not supported
+        """
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(__file__), '..', 'cache')
+
+        if isinstance(backend, CacheBackend):
+            self.backend = backend
+        elif backend == 'json':
+            self.backend = JsonFileBackend(
+                cache_dir=cache_dir, ttl_hours=ttl_hours, max_bytes=max_bytes, max_stale_hours=max_stale_hours
+            )
+        elif backend == 'sqlite':
+            from core.sqlite_cache import SqlitePriceCache
+            Path(cache_dir).mkdir(exist_ok=True)
+            self.backend = SqlitePriceCache(
+                Path(cache_dir) / 'prices.sqlite3', ttl_hours=ttl_hours, max_stale_hours=max_stale_hours
+            )
+        else:
+            raise ValueError(f"Cache backend '{backend}' is not supported.")
+
+        # (ticker, start_date, end_date) entries with a background refresh in flight
+        self._revalidating = set()
+        self._revalidating_lock = threading.Lock()
+
+    def get(self, ticker, start_date, end_date):
+        """
+        Retrieve cached data if available and not expired.
+
+        Returns:
+            tuple: (price_data, original_source) or (None, None) if not in cache or expired
+        """
+        return self.backend.get(ticker, start_date, end_date)
+
+    def get_many(self, tickers, start_date, end_date):
+        """
+        Retrieve cached data for several tickers and one window.
+
+        Returns:
+            dict: {ticker: (price_data, original_source)} for cache hits only
+        """
+        with metrics.span('cache_lookup'):
+            hits = self.backend.get_many(tickers, start_date, end_date)
+        metrics.increment('smartrisk_cache_lookups_total', len(hits), result='hit')
+        metrics.increment('smartrisk_cache_lookups_total', len(tickers) - len(hits), result='miss')
+        return hits
+
+    def get_panel(self, tickers, start_date, end_date):
+        """
+        Retrieve an aligned price panel when every ticker is a fresh hit.
+
+        Returns:
+            dict: {'dates', 'tickers', 'closes', 'sources'}, or None if the
+                  backend has no panel query or any ticker misses
+        """
+        with metrics.span('cache_lookup'):
+            panel = self.backend.get_panel(tickers, start_date, end_date)
+        if panel is not None:
+            metrics.increment('smartrisk_cache_lookups_total', len(tickers), result='hit')
+        return panel
+
+    def lookup(self, tickers, start_date, end_date):
+        """
+        Retrieve cached data for several tickers, serving stale entries.
+
+        Entries past the TTL but within max_stale_hours of it are returned
+        and reported as stale; refresh them with revalidate().
+
+        Returns:
+            tuple: ({ticker: (price_data, original_source)}, set of stale tickers)
+        """
+        with metrics.span('cache_lookup'):
+            entries = self.backend.get_many_allow_stale(tickers, start_date, end_date)
+        hits = {ticker: (data, source) for ticker, (data, source, _) in entries.items()}
+        stale = {ticker for ticker, (_, _, is_stale) in entries.items() if is_stale}
+        metrics.increment('smartrisk_cache_lookups_total', len(hits) - len(stale), result='hit')
+        metrics.increment('smartrisk_cache_lookups_total', len(stale), result='stale')
+        metrics.increment('smartrisk_cache_lookups_total', len(tickers) - len(hits), result='miss')
+        return hits, stale
+
+    def revalidate(self, tickers, start_date, end_date, refresh):
+        """
+        Refresh stale entries on a background thread.
+
+        Entries this process is already refreshing are skipped, so a burst of
+        requests for a popular stale ticker costs one upstream fetch.
+
+        Args:
+            tickers: Stale tickers to refresh
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            refresh: Callable taking the list of tickers to refresh; it must
+                     fetch and store them (exceptions are logged)
+
+        Returns:
+            list: Tickers a refresh was started for
+        """
+        with self._revalidating_lock:
+            keys = [
+                (ticker, start_date, end_date) for ticker in dict.fromkeys(tickers)
+                if (ticker, start_date, end_date) not in self._revalidating
+            ]
+            self._revalidating.update(keys)
+        if not keys:
+            return []
+        scheduled = [ticker for ticker, _, _ in keys]
+
+        def run():
+            try:
+                refresh(scheduled)
+            except Exception as e:
+                logger.warning("Background refresh of %d stale ticker(s) failed: %s", len(scheduled), e)
+            finally:
+                with self._revalidating_lock:
+                    self._revalidating.difference_update(keys)
+
+        threading.Thread(target=run, name='cache-revalidate', daemon=True).start()
+        return scheduled
+
+    def set(self, ticker, start_date, end_date, data, source='unknown'):
+        """Store one ticker's data with its original source."""
+        self.backend.set(ticker, start_date, end_date, data, source=source)
+
+    def set_many(self, entries, start_date, end_date, source='unknown'):
+        """Store {ticker: data} fetched from one source for one window."""
+        with metrics.span('cache_write'):
+            self.backend.set_many(entries, start_date, end_date, source=source)
+
+    def clear_expired(self):
+        """Remove entries too old to serve, even as stale."""
+        self.backend.clear_expired()
+
+    def clear_all(self):
+        """Remove all cached data."""
+        self.backend.clear_all()
+
+    def stats(self):
+        """Cache statistics from the backend."""
+        return self.backend.stats()
+
+
+# Global cache instance (created on first use, so importing this module
+# touches neither the cache directory nor the index database)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def cache_ttl_hours():
+    """Price cache TTL in hours (CACHE_TTL_HOURS, default: 24)."""
+    return float(os.getenv('CACHE_TTL_HOURS', 24))
 
 
 def get_cache():
-    """Get the global cache instance."""
+    """
+    Get the global cache instance.
+
+    Configured by CACHE_DIR (default backend/cache/), CACHE_BACKEND,
+    CACHE_MAX_MB, CACHE_TTL_HOURS (default: 24) and CACHE_MAX_STALE_HOURS
+    (default: 24; 0 disables stale-while-revalidate).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                max_mb = os.getenv('CACHE_MAX_MB')
+                _cache = StockDataCache(
+                    cache_dir=os.getenv('CACHE_DIR') or None,
+                    ttl_hours=cache_ttl_hours(),
+                    max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+                    backend=os.getenv('CACHE_BACKEND', 'json'),
+                    max_stale_hours=float(os.getenv('CACHE_MAX_STALE_HOURS', 24))
+                )
     return _cache
@@ -0,0 +1,404 @@
+"""
+Universe Correlation Module
+
+Precomputes the correlation matrix of every asset in the curated universe
+(data/popular_stocks.json) so correlation and redundancy requests only slice
+a stored matrix instead of fetching and correlating prices per request.
+
+A snapshot holds:
+- the pairwise daily-return correlations (pairs with fewer than
+  CORRELATION_MIN_OVERLAP common days are NaN), stored as float16
+- the leaf order of an average-linkage hierarchical clustering on the
+  distance sqrt((1 - rho) / 2), so any subset can be shown in clustered order
+- flat cluster labels from cutting that tree at CORRELATION_CLUSTER_THRESHOLD
+
+File layout (one file, written to a temp file and atomically renamed):
+- 8-byte little-endian header length
+- JSON header (tickers, order, cluster labels, window, build time), padded to 64 bytes
+- float16 block of shape (tickers x tickers)
+
+Readers memory-map the file, so the ~130 KB matrix is shared through the page
+cache by every worker. Rebuild nightly with `python -m core.correlation` (the
+API also refreshes a snapshot older than CORRELATION_MAX_AGE_HOURS in the
+background). Rebuilds hold an advisory lock file next to the snapshot (fcntl,
+where available), so only one process rebuilds at a time and the others skip.
+
+Configuration (environment):
+- CORRELATION_STORE_PATH: Snapshot file (default: backend/cache/correlation/universe.corr)
+- CORRELATION_MAX_AGE_HOURS: Age after which the snapshot is rebuilt (default: 24)
+- CORRELATION_MIN_OVERLAP: Common trading days needed for a correlation (default: 60)
+- CORRELATION_CLUSTER_THRESHOLD: Average correlation joining a cluster (default: 0.7)
+- CORRELATION_REDUNDANCY_THRESHOLD: Correlation flagging a pair as redundant (default: 0.9)
+"""
+
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the per-process guard applies
+    fcntl = None
+
+HEADER_ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+
+def correlation_distance(correlation):
+    """Distance sqrt((1 - rho) / 2): 0 for identical, 1 for opposite movements."""
+    return np.sqrt(np.clip((1.0 - correlation) / 2.0, 0.0, 1.0))
+
+
+def average_linkage(distance, cut_distance):
+    """
+    Average-linkage (UPGMA) hierarchical clustering.
+
+    Args:
+        distance (np.array): Symmetric (n x n) distance matrix
+        cut_distance (float): Merges at or below this distance form flat clusters
+
+    Returns:
+        tuple: (order, labels) where order is the dendrogram leaf order and
+               labels[i] is the flat cluster of leaf i, numbered along the order
+    """
+    n = len(distance)
+    if n == 0:
+        return [], []
+
+    work = np.array(distance, dtype=np.float64)
+    np.fill_diagonal(work, np.inf)
+    sizes = np.ones(n)
+    members = [[i] for i in range(n)]
+    raw_labels = np.arange(n)
+
+    for _ in range(n - 1):
+        flat_index = int(np.argmin(work))
+        i, j = divmod(flat_index, n)
+        merge_distance = work[i, j]
+
+        # Distance from the merged cluster is the size-weighted average
+        merged = (sizes[i] * work[i] + sizes[j] * work[j]) / (sizes[i] + sizes[j])
+        work[i, :] = merged
+        work[:, i] = merged
+        work[i, i] = np.inf
+        work[j, :] = np.inf
+        work[:, j] = np.inf
+
+        if merge_distance <= cut_distance:
+            raw_labels[members[j]] = raw_labels[members[i][0]]
+        sizes[i] += sizes[j]
+        members[i] = members[i] + members[j]
+        members[j] = None
+
+    order = next(group for group in members if group is not None)
+
+    # Renumber clusters 0, 1, 2, ... in leaf order
+    renumbered = {}
+    labels = [0] * n
+    for leaf in order:
+        labels[leaf] = renumbered.setdefault(int(raw_labels[leaf]), len(renumbered))
+    return order, labels
+
+
+def build_snapshot(prices_data, start_date, end_date, min_overlap=None, cluster_threshold=None):
+    """
+    Correlate the universe's daily returns and cluster it.
+
+    Args:
+        prices_data (dict): {ticker: [{'date', 'close'}, ...]} as returned by the data providers
+        start_date: Window start (YYYY-MM-DD)
+        end_date: Window end (YYYY-MM-DD)
+        min_overlap: Common days needed per pair (default: CORRELATION_MIN_OVERLAP or 60)
+        cluster_threshold: Correlation level of a flat cluster (default:
+                           CORRELATION_CLUSTER_THRESHOLD or 0.7)
+
+    Returns:
+        dict: {'tickers', 'correlation' (n x n float array), 'order', 'labels',
+               'start_date', 'end_date'}
+    """
+    if min_overlap is None:
+        min_overlap = int(os.getenv('CORRELATION_MIN_OVERLAP', 60))
+    if cluster_threshold is None:
+        cluster_threshold = float(os.getenv('CORRELATION_CLUSTER_THRESHOLD', 0.7))
+
+    series = {}
+    for ticker, rows in prices_data.items():
+        if not rows:
+            continue
+        frame = pd.DataFrame(rows)
+        prices = pd.Series(frame['close'].to_numpy(dtype=float), index=pd.to_datetime(frame['date'])).sort_index()
+        # Returns on each asset's own trading calendar, so a stock's Monday
+        # return spans the weekend instead of following a crypto-only date
+        series[ticker] = prices.pct_change(fill_method=None).iloc[1:]
+
+    tickers = sorted(series)
+    # Outer join of the returns; correlations use the days each pair has in common
+    returns = pd.concat([series[ticker] for ticker in tickers], axis=1, keys=tickers, sort=True)
+    correlation = returns.corr(min_periods=min_overlap).to_numpy()
+
+    # Pairs without enough overlap count as uncorrelated for clustering
+    distance = correlation_distance(np.nan_to_num(correlation, nan=0.0))
+    order, labels = average_linkage(distance, correlation_distance(cluster_threshold))
+
+    return {
+        'tickers': tickers,
+        'correlation': correlation,
+        'order': [int(i) for i in order],
+        'labels': labels,
+        'start_date': start_date,
+        'end_date': end_date
+    }
+
+
+class CorrelationStore:
+    """
+    Memory-mapped universe correlation snapshot.
+    """
+
+    def __init__(self, path=None):
+        """
+        Initialize the store.
+
+        Args:
+            path: Snapshot file (default: CORRELATION_STORE_PATH or
+                  backend/cache/correlation/universe.corr)
+        """
+        if path is None:
+            path = os.getenv('CORRELATION_STORE_PATH') or os.path.join(
+                os.path.dirname(__file__), '..', 'cache', 'correlation', 'universe.corr'
+            )
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + '.lock')
+        self._mapped = None  # (inode, mtime_ns, entry)
+        self._refreshing = threading.Lock()
+
+    @contextmanager
+    def rebuild_lock(self):
+        """
+        Try to take the cross-process rebuild lock without waiting.
+
+        Yields:
+            bool: True if this process holds the lock, False if another one does
+        """
+        if fcntl is None:
+            yield True
+            return
+
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)  # Closing the descriptor releases the lock
+
+    def save(self, snapshot):
+        """
+        Write a snapshot from build_snapshot() atomically.
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        tickers = snapshot['tickers']
+        matrix = np.asarray(snapshot['correlation'], dtype='<f2')
+        header = {
+            'version': FORMAT_VERSION,
+            'tickers': tickers,
+            'order': snapshot['order'],
+            'labels': snapshot['labels'],
+            'start_date': snapshot['start_date'],
+            'end_date': snapshot['end_date'],
+            'built_at': time.time()
+        }
+        # Size the header with a placeholder offset, then pad to the alignment boundary
+        header['data_offset'] = 0
+        encoded = json.dumps(header).encode('utf-8')
+        data_offset = -(-(8 + len(encoded) + 16) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+        header['data_offset'] = data_offset
+        encoded = json.dumps(header).encode('utf-8')
+        encoded += b' ' * (data_offset - 8 - len(encoded))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix='.tmp-', suffix='.corr')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(struct.pack('<Q', len(encoded)))
+                f.write(encoded)
+                f.write(matrix.tobytes())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info("Saved correlation snapshot for %d asset(s)", len(tickers))
+
+    def load(self):
+        """
+        Attach to the current snapshot.
+
+        Returns:
+            dict: {
+                'tickers': [...], 'index': {ticker: position},
+                'matrix': np.memmap (n x n float16, read-only),
+                'order': [...], 'labels': [...],
+                'start_date', 'end_date', 'built_at'
+            }
+            or None if there is no readable snapshot
+        """
+        try:
+            stat = self.path.stat()
+        except OSError:
+            self._mapped = None
+            return None
+
+        mapped = self._mapped
+        if mapped and mapped[0] == stat.st_ino and mapped[1] == stat.st_mtime_ns:
+            return mapped[2]
+
+        try:
+            with open(self.path, 'rb') as f:
+                (header_length,) = struct.unpack('<Q', f.read(8))
+                header = json.loads(f.read(header_length).decode('utf-8'))
+            if header.get('version') != FORMAT_VERSION:
+                return None
+            size = len(header['tickers'])
+            matrix = np.memmap(self.path, dtype='<f2', mode='r', offset=header['data_offset'], shape=(size, size))
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+        entry = dict(header, matrix=matrix, index={ticker: i for i, ticker in enumerate(header['tickers'])})
+        self._mapped = (stat.st_ino, stat.st_mtime_ns, entry)
+        return entry
+
+    def is_stale(self, entry, max_age_hours=None):
+        """Whether a loaded snapshot is older than CORRELATION_MAX_AGE_HOURS (default: 24)."""
+        if max_age_hours is None:
+            max_age_hours = float(os.getenv('CORRELATION_MAX_AGE_HOURS', 24))
+        return time.time() - entry['built_at'] > max_age_hours * 3600
+
+    def refresh_in_background(self, build_fn):
+        """
+        Rebuild the snapshot on a daemon thread unless a rebuild is already running.
+
+        Args:
+            build_fn: Zero-argument callable that builds and saves a new snapshot
+
+        Returns:
+            bool: True if a rebuild was started
+        """
+        if not self._refreshing.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                build_fn()
+            except Exception:
+                logger.exception("Correlation snapshot refresh failed")
+            finally:
+                self._refreshing.release()
+
+        threading.Thread(target=run, name='correlation-refresh', daemon=True).start()
+        return True
+
+
+def slice_correlations(entry, tickers, redundancy_threshold=None):
+    """
+    Correlations among `tickers`, in the universe's clustered order.
+
+    Args:
+        entry: Snapshot from CorrelationStore.load()
+        tickers: Requested tickers (None for the whole universe)
+        redundancy_threshold: Correlation at or above which a pair is flagged
+                              (default: CORRELATION_REDUNDANCY_THRESHOLD or 0.9)
+
+    Returns:
+        dict: {
+            'tickers': Known tickers in clustered order,
+            'matrix': (k x k) float32 correlations (NaN where history overlaps too little),
+            'clusters': Groups of the requested tickers sharing a universe cluster,
+            'redundant_pairs': [{'tickers': [a, b], 'correlation': rho}, ...] strongest first,
+            'missing': Requested tickers outside the universe
+        }
+    """
+    if redundancy_threshold is None:
+        redundancy_threshold = float(os.getenv('CORRELATION_REDUNDANCY_THRESHOLD', 0.9))
+
+    index = entry['index']
+    if tickers is None:
+        positions = list(entry['order'])
+        missing = []
+    else:
+        rank = {leaf: position for position, leaf in enumerate(entry['order'])}
+        known = list(dict.fromkeys(t for t in tickers if t in index))
+        missing = [t for t in tickers if t not in index]
+        positions = sorted((index[t] for t in known), key=rank.__getitem__)
+
+    names = [entry['tickers'][i] for i in positions]
+    matrix = np.asarray(entry['matrix'][np.ix_(positions, positions)], dtype=np.float32)
+
+    clusters = {}
+    for position, name in zip(positions, names):
+        clusters.setdefault(entry['labels'][position], []).append(name)
+
+    upper_i, upper_j = np.triu_indices(len(names), k=1)
+    values = matrix[upper_i, upper_j]
+    flagged = np.flatnonzero(values >= redundancy_threshold)  # NaN compares False
+    flagged = flagged[np.argsort(-values[flagged], kind='stable')]
+
+    return {
+        'tickers': names,
+        'matrix': matrix,
+        'clusters': [group for group in clusters.values() if len(group) > 1],
+        'redundant_pairs': [
+            {'tickers': [names[upper_i[k]], names[upper_j[k]]], 'correlation': float(values[k])}
+            for k in flagged
+        ],
+        'missing': missing
+    }
+
+
+# Global store (created on first use)
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_correlation_store():
+    """Get the global correlation snapshot store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CorrelationStore()
+    return _store
+
+
+def main():
+    """Rebuild the snapshot (run nightly, e.g. from cron)."""
+    # Imported here: the refresh reuses the API's cached, multi-source fetch path
+    from main import refresh_correlations
+
+    snapshot = refresh_correlations()
+    if snapshot is None:
+        print("Correlation snapshot is being rebuilt by another process; skipped.")
+        return
+    print(f"Correlation snapshot: {len(snapshot['tickers'])} asset(s), "
+          f"{snapshot['start_date']} to {snapshot['end_date']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,18 +9,69 @@ Handles source-specific initialization, API key management, and request routing.
 Supported Sources:
 - yfinance: Free Yahoo Finance data (default, no API key required)
 - alpha_vantage: Alpha Vantage API (requires API key, has rate limits)
+- local: CSV/Parquet files from LOCAL_DATA_DIR (offline, deterministic)
+
+Sources live in a registry and their modules are imported on first use, so a
+deployment only loads the client libraries of the sources it actually calls.
+Additional sources (e.g. stubs for load tests) can be added with
+register_provider().
 
 Usage:
     provider = DataProvider(source='yfinance')
     prices = provider.get_prices(['AAPL', 'MSFT'], '2023-01-01', '2024-01-01')
 """
 
-from sources import yfinance_source, alpha_vantage_source
+import importlib
 import os
-from dotenv import load_dotenv
+import time
+
+from core import metrics
+
+# Registered sources: name -> {'module', 'requires_api_key', 'offline'}
+# `module` is an import path (resolved lazily) or an already imported module
+# exposing fetch_prices(tickers, start, end[, api_key]).
+_PROVIDERS = {}
+
+
+def register_provider(name: str, module, requires_api_key: bool = False, offline: bool = False) -> None:
+    """
+    Register (or replace) a data source.
+
+    Args:
+        name: Source name used in DATA_SOURCE and the X-Data-Source header
+        module: Import path of the source module, or the module object itself
+        requires_api_key: Whether fetch_prices needs an `api_key` argument
+        offline: Whether the source works without network access; offline
+                 sources are never backfilled from yfinance
+    """
+    _PROVIDERS[name] = {
+        'module': module,
+        'requires_api_key': requires_api_key,
+        'offline': offline
+    }
+
+
+def available_providers() -> list[str]:
+    """Names of all registered data sources."""
+    return list(_PROVIDERS)
+
+
+def is_offline_provider(name: str) -> bool:
+    """Whether a registered source works without network access."""
+    return name in _PROVIDERS and _PROVIDERS[name]['offline']
+
+
+def _load_source(name: str):
+    """Import a registered source module on first use."""
+    entry = _PROVIDERS[name]
+    if isinstance(entry['module'], str):
+        entry['module'] = importlib.import_module(entry['module'])
+    return entry['module']
+
 
-# Load environment variables from .env file
-load_dotenv()
+register_provider('yfinance', 'sources.yfinance_source')
+register_provider('alpha_vantage', 'sources.alpha_vantage_source', requires_api_key=True)
+register_provider('local', 'sources.local_source', offline=True)
 
 
 class DataProvider:
@@ -36,7 +87,7 @@ class DataProvider:
         Initialize the data provider.
 
         Args:
-            source: Data source name ('yfinance' or 'alpha_vantage')
+            source: Registered data source name ('yfinance', 'alpha_vantage', 'local', ...)
             api_key: API key for sources that require authentication
 
         Raises:
@@ -45,21 +96,19 @@ class DataProvider:
         self.source_name = source
         self.api_key = api_key
 
-        if source == "yfinance":
-            self.source = yfinance_source
-        elif source == "alpha_vantage":
-            if not api_key:
-                raise ValueError("API key is required for Alpha Vantage source.")
-            self.source = alpha_vantage_source
-        else:
+        if source not in _PROVIDERS:
             raise ValueError(f"Source '{source}' is not supported.")
+        self.requires_api_key = _PROVIDERS[source]['requires_api_key']
+        if self.requires_api_key and not api_key:
+            raise ValueError(f"API key is required for {source} source.")
+        self.source = _load_source(source)
 
     def get_prices(self, tickers: list[str], start: str, end: str) -> dict:
         """
         Fetch historical price data from the configured source.
 
-        Routes the request to the appropriate source module (yfinance or alpha_vantage)
-        and handles source-specific parameter passing (e.g., API keys).
+        Routes the request to the registered source module and handles
+        source-specific parameter passing (e.g., API keys).
 
         Args:
             tickers: List of stock ticker symbols (e.g., ['AAPL', 'MSFT'])
@@ -80,17 +129,25 @@ class DataProvider:
             Exception: If data fetch fails (source-specific exceptions)
         """
         # Route to source-specific fetch function
-        if self.source_name == 'alpha_vantage':
-            return self.source.fetch_prices(tickers, start, end, api_key=self.api_key)
-        return self.source.fetch_prices(tickers, start, end)
+        started = time.perf_counter()
+        ok = False
+        try:
+            if self.requires_api_key:
+                prices = self.source.fetch_prices(tickers, start, end, api_key=self.api_key)
+            else:
+                prices = self.source.fetch_prices(tickers, start, end)
+            ok = bool(prices)
+            return prices
+        finally:
+            metrics.record_upstream_call(self.source_name, time.perf_counter() - started, ok)
 
 
 def get_provider_from_env() -> DataProvider:
     """
     Create a DataProvider instance from environment variables.
 
-    Reads configuration from .env file:
-        DATA_SOURCE: 'yfinance' or 'alpha_vantage' (default: yfinance)
+    Reads configuration from the environment (.env is loaded by main.py):
+        DATA_SOURCE: 'yfinance', 'alpha_vantage' or 'local' (default: yfinance)
         ALPHAVANTAGE_API_KEY: API key for Alpha Vantage (if using that source)
 
     Returns:
@@ -0,0 +1,335 @@
+"""
+Background Job Store
+
+Runs long analyses outside the HTTP request that asked for them: a client
+submits work, gets a job id back immediately, then polls for the status and
+fetches the result when it is ready.
+
+- Identical submissions (same kind and payload) share one job while it is
+  queued, running or holding a result, so retries and double clicks do not
+  repeat the work. Failed and expired jobs are re-run on the next submission.
+- Job records are JSON files under the cache directory (cache/jobs/), written
+  atomically, so results survive worker restarts and are visible to every
+  worker process that shares the directory.
+- Records expire JOB_RESULT_TTL_SECONDS after they finish. Jobs left queued or
+  running by a process that no longer exists are reported as failed (and then
+  expire like any other failure).
+- Each record carries the owning process's pid and a boot token created at
+  import, so a server relaunched with the same pid (common in containers)
+  does not mistake an interrupted job for its own. The owner renews a lease
+  on its active jobs every JOB_LEASE_SECONDS / 3; an active job whose lease
+  ran out is treated as orphaned even if its pid looks alive.
+
+Jobs run on a small thread pool; CPU-heavy stages inside a job should go
+through the simulation scheduler (core.scheduler) so they share its limits.
+
+Configuration (environment):
+- JOB_RESULT_TTL_SECONDS: How long finished jobs are kept (default: 3600)
+- JOB_MAX_WORKERS: Jobs executed concurrently per process (default: 4)
+- JOB_LEASE_SECONDS: Seconds without a lease renewal after which an active
+  job counts as orphaned (default: 300)
+- JOBS_DIR: Directory for job records (default: backend/cache/jobs/)
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from core.cache_manager import write_json_atomic
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+# queued -> running -> succeeded | failed
+ACTIVE_STATES = ('queued', 'running')
+# Minimum seconds between sweeps for expired records
+PURGE_INTERVAL_SECONDS = 60
+# Identifies this process instance; a relaunched server may reuse the pid
+BOOT_TOKEN = uuid.uuid4().hex
+
+
+def job_key(kind, payload):
+    """
+    Deduplication key of a submission (payload keys are order-independent).
+
+    Args:
+        kind: Job type (e.g. 'analyze_portfolio')
+        payload: JSON-serializable job parameters (must not contain secrets)
+
+    Returns:
+        str: 32-character hex digest, also used as the job id
+    """
+    canonical = json.dumps({'kind': kind, 'payload': payload}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]
+
+
+def _owner_alive(job):
+    """Whether the process that owns an active job record may still be running it."""
+    pid = job.get('pid', 0)
+    if pid == os.getpid():
+        return job.get('boot') == BOOT_TOKEN
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # Exists but belongs to someone else
+    return True
+
+
+class JobStore:
+    """
+    Deduplicating job store persisted as one JSON file per job.
+    """
+
+    def __init__(self, jobs_dir=None, ttl_seconds=None, max_workers=None, lease_seconds=None):
+        """
+        Initialize the store (the worker pool starts on first submit).
+
+        Args:
+            jobs_dir: Directory for job records (default: JOBS_DIR or backend/cache/jobs/)
+            ttl_seconds: Lifetime of finished jobs (default: JOB_RESULT_TTL_SECONDS or 3600)
+            max_workers: Concurrent jobs (default: JOB_MAX_WORKERS or 4)
+            lease_seconds: Seconds without a lease renewal after which an
+                           active job is orphaned (default: JOB_LEASE_SECONDS or 300)
+        """
+        if jobs_dir is None:
+            jobs_dir = os.getenv('JOBS_DIR') or os.path.join(os.path.dirname(__file__), '..', 'cache', 'jobs')
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv('JOB_RESULT_TTL_SECONDS', 3600))
+        if max_workers is None:
+            max_workers = int(os.getenv('JOB_MAX_WORKERS', 4))
+        if lease_seconds is None:
+            lease_seconds = float(os.getenv('JOB_LEASE_SECONDS', 300))
+
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max(1, max_workers)
+        self.lease_seconds = lease_seconds
+
+        self._lock = threading.Lock()
+        self._jobs = {}  # job id -> record of jobs owned or seen by this process
+        self._executor = None
+        self._heartbeat = None
+        self._last_purge = 0.0
+
+    def _get_path(self, job_id):
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _save(self, job):
+        try:
+            write_json_atomic(self._get_path(job['id']), job)
+        except (OSError, TypeError, ValueError) as e:
+            # The in-memory record still serves this process
+            logger.warning("Could not persist job %s: %s", job['id'], e)
+
+    def _load(self, job_id):
+        try:
+            with open(self._get_path(job_id), 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _is_expired(self, job, now):
+        return job.get('expires_at') is not None and job['expires_at'] <= now
+
+    def _is_orphaned(self, job, now):
+        """Whether an active record belongs to no live owner (dead process or lapsed lease)."""
+        if job['status'] not in ACTIVE_STATES or job['id'] in self._jobs:
+            return False
+        renewed = job.get('heartbeat_at') or job.get('started_at') or job.get('submitted_at') or 0
+        return now - renewed > self.lease_seconds or not _owner_alive(job)
+
+    def _fail_orphan(self, job, now):
+        job = dict(job, status='failed', error='Job was interrupted by a server restart',
+                   finished_at=now, expires_at=now + self.ttl_seconds)
+        self._save(job)
+        return job
+
+    def _lookup(self, job_id):
+        """Current record of a job (memory first, then disk), or None if unknown or expired."""
+        now = time.time()
+        job = self._jobs.get(job_id)
+        if job is None or job['status'] not in ACTIVE_STATES:
+            # Finished records may have been written by another worker
+            job = self._load(job_id) or job
+        if job is None:
+            return None
+        if self._is_expired(job, now):
+            self._jobs.pop(job_id, None)
+            return None
+        if self._is_orphaned(job, now):
+            job = self._fail_orphan(job, now)
+        return job
+
+    def submit(self, kind, payload, fn):
+        """
+        Start a job, or join an identical one that is active or finished.
+
+        Args:
+            kind: Job type
+            payload: JSON-serializable parameters identifying the work
+            fn: Zero-argument callable doing the work; its return value must be
+                JSON-serializable. A dict with an 'error' key marks the job failed.
+
+        Returns:
+            dict: The job record (see get())
+        """
+        job_id = job_key(kind, payload)
+        with self._lock:
+            self._maybe_purge()
+            job = self._lookup(job_id)
+            if job is not None and job['status'] != 'failed':
+                return _public(job)
+
+            now = time.time()
+            job = {
+                'id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'submitted_at': now,
+                'started_at': None,
+                'finished_at': None,
+                'expires_at': None,
+                'pid': os.getpid(),
+                'boot': BOOT_TOKEN,
+                'heartbeat_at': now,
+                'error': None,
+                'result': None
+            }
+            self._jobs[job_id] = job
+            self._save(job)
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+                self._heartbeat = threading.Thread(target=self._renew_leases, name='job-heartbeat', daemon=True)
+                self._heartbeat.start()
+            # Run in a copy of the caller's context so job logs keep its request id
+            self._executor.submit(contextvars.copy_context().run, self._run, job_id, fn)
+        logger.info("Queued %s job %s", kind, job_id)
+        return _public(job)
+
+    def _renew_leases(self):
+        """Renew the lease of every active job this process owns (runs forever on a daemon thread)."""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._lock:
+                now = time.time()
+                for job_id, job in list(self._jobs.items()):
+                    if job['status'] in ACTIVE_STATES:
+                        job = dict(job, heartbeat_at=now)
+                        self._jobs[job_id] = job
+                        self._save(job)
+
+    def _run(self, job_id, fn):
+        self._update(job_id, status='running', started_at=time.time())
+        try:
+            result = fn()
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            self._finish(job_id, error=str(e) or type(e).__name__)
+            return
+
+        if isinstance(result, dict) and 'error' in result:
+            self._finish(job_id, error=result['error'])
+        else:
+            self._finish(job_id, result=result)
+
+    def _finish(self, job_id, result=None, error=None):
+        now = time.time()
+        self._update(
+            job_id,
+            status='failed' if error is not None else 'succeeded',
+            finished_at=now,
+            expires_at=now + self.ttl_seconds,
+            error=error,
+            result=result
+        )
+        logger.info("Job %s %s", job_id, 'failed' if error is not None else 'succeeded')
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = dict(self._jobs[job_id], **fields)
+            self._save(job)
+            if job['status'] in ACTIVE_STATES:
+                self._jobs[job_id] = job
+            else:
+                # Finished records are served from disk; keep them in memory
+                # only if they could not be written
+                if self._get_path(job_id).exists():
+                    self._jobs.pop(job_id, None)
+                else:
+                    self._jobs[job_id] = job
+
+    def get(self, job_id, include_result=False):
+        """
+        Get a job's status.
+
+        Args:
+            job_id: Id returned by submit()
+            include_result: Include the 'result' field
+
+        Returns:
+            dict: {'id', 'kind', 'status', 'submitted_at', 'started_at',
+                   'finished_at', 'expires_at', 'error'[, 'result']},
+                  or None if the job is unknown or expired
+        """
+        if not all(c in '0123456789abcdef' for c in job_id) or len(job_id) != 32:
+            return None
+        with self._lock:
+            job = self._lookup(job_id)
+        if job is None:
+            return None
+        return _public(job, include_result=include_result)
+
+    def _maybe_purge(self):
+        """
+        Delete expired records and fail orphaned ones (so they expire in turn),
+        at most once per PURGE_INTERVAL_SECONDS.
+        """
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+
+        for path in self.jobs_dir.glob("*.json"):
+            job = self._load(path.stem)
+            if job is None:
+                continue
+            if self._is_expired(job, now):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            elif self._is_orphaned(job, now):
+                self._fail_orphan(job, now)
+
+
+def _public(job, include_result=False):
+    """Copy of a job record without internal fields."""
+    view = {key: value for key, value in job.items() if key not in ('pid', 'boot', 'heartbeat_at', 'result')}
+    if include_result:
+        view['result'] = job.get('result')
+    return view
+
+
+# Global job store (created on first use)
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Get the global job store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
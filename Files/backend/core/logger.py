@@ -0,0 +1,195 @@
+"""
+Logging Module
+
+Structured, level-filtered logging for the backend with asynchronous output.
+
+- Records go through a bounded in-memory queue (QueueHandler) and are written
+  to stdout by a background QueueListener thread, so request handlers never
+  block on console I/O. If the queue is full, records are dropped and counted
+  instead of stalling the caller.
+- Every record carries the current request id (set by the request-id
+  middleware in main.py, or '-' outside a request).
+- Per-ticker diagnostics use sampled_debug(), which costs one level check when
+  DEBUG is off and keeps only a LOG_SAMPLE_RATE fraction when it is on.
+
+Configuration (environment):
+- LOG_LEVEL: DEBUG, INFO, WARNING or ERROR (default: INFO)
+- LOG_FORMAT: 'text' (default) or 'json' (one JSON object per line)
+- LOG_SAMPLE_RATE: Fraction of sampled debug lines kept (default: 0.1)
+- LOG_QUEUE_SIZE: Maximum buffered records (default: 10000)
+
+Usage:
+    from core.logger import get_logger, sampled_debug
+    logger = get_logger(__name__)
+    logger.info("Fetched %d ticker(s)", count)
+    sampled_debug(logger, "%s: found in cache", ticker)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+
+ROOT_LOGGER = 'smartrisk'
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+request_id_var = ContextVar('request_id', default='-')
+
+# Attributes every LogRecord has; anything else came from `extra=` and is
+# emitted as a structured field in JSON output
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+_configure_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+_sample_rate = 0.1
+
+
+class _RequestIdFilter(logging.Filter):
+    """Stamp records with the request id of the context that logged them."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops (and counts) records instead of blocking when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only interpolate the message here; formatting happens on the
+        # listener thread
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, message and extra fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(stream=None, force=False):
+    """
+    Set up the queue handler and background writer for the 'smartrisk' loggers.
+
+    Called automatically by get_logger(); safe to call more than once.
+
+    Args:
+        stream: Output stream (default: sys.stdout)
+        force: Reconfigure even if logging was already set up (re-reads the environment)
+    """
+    global _listener, _queue_handler, _sample_rate
+
+    with _configure_lock:
+        if _listener is not None and not force:
+            return
+        if _listener is not None:
+            _listener.stop()
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        if os.getenv('LOG_FORMAT', 'text').lower() == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.Queue(maxsize=max(1, int(os.getenv('LOG_QUEUE_SIZE', 10000))))
+        _queue_handler = _DroppingQueueHandler(log_queue)
+        _queue_handler.addFilter(_RequestIdFilter())
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.handlers = [_queue_handler]
+        root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+        root.propagate = False
+
+        _sample_rate = min(max(float(os.getenv('LOG_SAMPLE_RATE', 0.1)), 0.0), 1.0)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+
+
+def flush_logging():
+    """Write out every queued record (blocks until the queue is drained)."""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener.start()
+
+
+def dropped_records():
+    """Number of records dropped because the queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def get_logger(name):
+    """
+    Get a logger under the 'smartrisk' namespace.
+
+    Args:
+        name: Module name (e.g. __name__); 'main' becomes 'smartrisk.main'
+    """
+    configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def sampled_debug(logger, msg, *args, **kwargs):
+    """
+    Log a high-volume DEBUG line, keeping only a LOG_SAMPLE_RATE fraction.
+
+    Returns immediately when DEBUG is not enabled for `logger`.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if _sample_rate < 1.0 and random.random() >= _sample_rate:
+        return
+    logger.debug(msg, *args, **kwargs)
+
+
+def new_request_id(candidate=None):
+    """
+    Request id for a new request: the caller's id if it is safe to echo, else a fresh one.
+
+    Args:
+        candidate: Value of an incoming X-Request-ID header, if any
+    """
+    if candidate and len(candidate) <= 64 and all(c.isalnum() or c in '-_.' for c in candidate):
+        return candidate
+    return uuid.uuid4().hex[:16]
+
+
+atexit.register(lambda: _listener.stop() if _listener is not None else None)
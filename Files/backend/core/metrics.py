@@ -0,0 +1,208 @@
+"""
+Metrics Module
+
+In-process counters, gauges and latency histograms for the analysis pipeline,
+rendered in the Prometheus text exposition format by the /metrics endpoint.
+
+Recorded metrics:
+- smartrisk_stage_duration_seconds{stage}: timing spans for pipeline stages
+  (cache lookup, provider fetch, alignment, metrics, Monte Carlo, ...)
+- smartrisk_cache_lookups_total{result}: per-ticker cache hits and misses
+- smartrisk_upstream_requests_total{provider,outcome}: data provider calls
+- smartrisk_upstream_request_duration_seconds{provider}: provider call latency
+- smartrisk_simulation_paths_total / smartrisk_simulation_paths_per_second:
+  Monte Carlo volume and the throughput of the most recent run
+- smartrisk_http_request_duration_seconds{method,route,status}: per-route latency
+- smartrisk_scheduler_queue_depth / smartrisk_scheduler_rejected_total: simulation
+  admission control (queue wait is the 'scheduler_wait' stage)
+- smartrisk_rolling_stats_updates_total{mode}: window statistics reused,
+  updated incrementally or rebuilt
+
+Enable with METRICS_ENABLED=1. When disabled, span() returns a shared no-op
+context manager and the record functions return after one flag check, so
+instrumented code pays essentially nothing.
+
+Metrics are per process; with several uvicorn workers each worker reports
+its own series (scrape each worker, or aggregate in Prometheus).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    'smartrisk_stage_duration_seconds': ('histogram', 'Time spent in each analysis pipeline stage.'),
+    'smartrisk_cache_lookups_total': ('counter', 'Price cache lookups per ticker, by result.'),
+    'smartrisk_upstream_requests_total': ('counter', 'Data provider fetch calls, by provider and outcome.'),
+    'smartrisk_upstream_request_duration_seconds': ('histogram', 'Data provider fetch latency.'),
+    'smartrisk_simulation_paths_total': ('counter', 'Monte Carlo paths simulated.'),
+    'smartrisk_simulation_paths_per_second': ('gauge', 'Monte Carlo throughput of the most recent simulation.'),
+    'smartrisk_http_request_duration_seconds': ('histogram', 'HTTP request latency by route.'),
+    'smartrisk_scheduler_queue_depth': ('gauge', 'Simulations waiting for a scheduler worker.'),
+    'smartrisk_scheduler_rejected_total': ('counter', 'Simulations rejected because the scheduler queue was full.'),
+    'smartrisk_rolling_stats_updates_total': ('counter', 'Return window statistics lookups, by update mode.'),
+}
+
+_enabled = None
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_NOOP = nullcontext()
+
+
+def metrics_enabled():
+    """Whether metrics are recorded (METRICS_ENABLED, read once)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    return _enabled
+
+
+def set_enabled(enabled):
+    """Switch recording on or off at runtime (mainly for tests and benchmarks)."""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def reset():
+    """Drop all recorded values."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def increment(name, amount=1, **labels):
+    """Add `amount` to a counter."""
+    if not metrics_enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to `value`."""
+    if not metrics_enabled():
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    if not metrics_enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        buckets = _histograms.get(key)
+        if buckets is None:
+            buckets = _histograms[key] = [0] * (len(DURATION_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[len(DURATION_BUCKETS)] += 1
+        buckets[-1] += value
+
+
+@contextmanager
+def _timed_span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe('smartrisk_stage_duration_seconds', time.perf_counter() - started, stage=stage)
+
+
+def span(stage):
+    """
+    Time a pipeline stage.
+
+    Usage:
+        with metrics.span('monte_carlo'):
+            ...
+
+    Returns:
+        A context manager (a shared no-op when metrics are disabled)
+    """
+    if not metrics_enabled():
+        return _NOOP
+    return _timed_span(stage)
+
+
+def record_upstream_call(provider, seconds, ok):
+    """Record one data provider fetch call and its latency."""
+    if not metrics_enabled():
+        return
+    increment('smartrisk_upstream_requests_total', provider=provider, outcome='ok' if ok else 'error')
+    observe('smartrisk_upstream_request_duration_seconds', seconds, provider=provider)
+
+
+def record_simulation(num_paths, seconds):
+    """Record a finished Monte Carlo simulation."""
+    if not metrics_enabled():
+        return
+    increment('smartrisk_simulation_paths_total', num_paths)
+    if seconds > 0:
+        set_gauge('smartrisk_simulation_paths_per_second', num_paths / seconds)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def render():
+    """
+    Render all recorded metrics in the Prometheus text format (version 0.0.4).
+
+    Returns:
+        str: Exposition text ending in a newline
+    """
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {key: list(values) for key, values in _histograms.items()}
+
+    lines = []
+    for name, (metric_type, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        if metric_type == 'histogram':
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, values):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', bound))} {cumulative}")
+                cumulative += values[len(DURATION_BUCKETS)]
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]!r}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        else:
+            source = counters if metric_type == 'counter' else gauges
+            for (metric, labels), value in sorted(source.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value!r}")
+
+    return '\n'.join(lines) + '\n'
@@ -7,6 +7,212 @@ Respects the observed mean vector and covariance matrix for multi-asset portfoli
 
 import numpy as np
 import os
+import time
+
+from core import metrics
+
+DAYS_IN_YEAR = 252
+RISK_CONFIDENCE = 0.95  # Confidence level for simulated VaR / CVaR
+
+# Contribution interval in trading days for each supported frequency
+CONTRIBUTION_INTERVALS = {
+    "monthly": 21,    # ~21 trading days per month
+    "quarterly": 63,   # ~63 trading days per quarter
+    "annually": 252    # 252 trading days per year
+}
+
+# Rebalancing modes: 'daily' keeps constant weights (the collapsed portfolio
+# engine), calendar modes rebalance every N trading days, 'threshold' when any
+# weight drifts more than the threshold from target, 'never' buys and holds
+REBALANCE_FREQUENCIES = ("daily", "monthly", "quarterly", "annually", "threshold", "never")
+REBALANCE_INTERVALS = {
+    "monthly": 21,
+    "quarterly": 63,
+    "annually": 252
+}
+DEFAULT_REBALANCE_THRESHOLD = 0.05  # Absolute weight drift that triggers a rebalance
+
+
+def _return_moments(daily_returns, moments=None):
+    """Mean vector and covariance matrix of daily returns (precomputed `moments` win)."""
+    if moments is not None:
+        return np.asarray(moments[0]), np.asarray(moments[1])
+    mean_returns = daily_returns.mean().values  # Mean daily return for each asset
+    cov_matrix = daily_returns.cov().values     # Covariance matrix of daily returns
+    return mean_returns, cov_matrix
+
+
+def _cholesky_factor(cov_matrix):
+    """Lower Cholesky factor of a covariance matrix, with jitter if it is not positive definite."""
+    try:
+        return np.linalg.cholesky(cov_matrix)
+    except np.linalg.LinAlgError:
+        # Add small jitter for numerical stability
+        jitter = np.eye(len(cov_matrix)) * 1e-8
+        return np.linalg.cholesky(cov_matrix + jitter)
+
+
+def _build_return_sampler(daily_returns, weights, rng, moments=None):
+    """
+    Prepare a sampler of correlated daily portfolio returns.
+
+    The Cholesky factor is computed once so every simulated day only costs a
+    matrix product, regardless of how many paths or days are drawn.
+
+    Args:
+        daily_returns (pd.DataFrame): Historical daily returns (rows=dates, cols=tickers)
+        weights (np.array): Portfolio weights for each asset
+        rng (np.random.Generator): Random generator used for all draws
+        moments (tuple): Optional precomputed (mean, covariance) of the daily returns
+
+    Returns:
+        callable: sample(size) -> np.array of `size` simulated daily portfolio returns
+    """
+    # Calculate historical statistics
+    mean_returns, cov_matrix = _return_moments(daily_returns, moments)
+
+    # Convert weights to numpy array if needed
+    weights_array = np.array(weights)
+    asset_count = len(weights_array)
+
+    if asset_count == 1:
+        # Single asset stats
+        mean_return_single = mean_returns[0]
+        std_return_single = np.sqrt(max(cov_matrix[0, 0], 0))
+
+        def sample(size):
+            return rng.normal(loc=mean_return_single, scale=std_return_single, size=size)
+
+        return sample
+
+    # Precompute structures for correlated sampling to avoid repeated decompositions
+    chol = _cholesky_factor(cov_matrix)
+
+    def sample(size):
+        standard_normals = rng.standard_normal(size=(size, asset_count))
+        correlated = standard_normals @ chol.T
+        correlated += mean_returns
+        return correlated @ weights_array
+
+    return sample
+
+
+def _rebalance_block_size(asset_count, num_paths):
+    """
+    Paths per block for the rebalancing engine.
+
+    The per-day working set is three (assets x paths) float64 buffers (normals,
+    asset growth, holdings); blocks are sized so it fits in MC_REBALANCE_BLOCK_KB
+    (default 512 KB, about a per-core L2 cache).
+    """
+    budget = int(os.getenv('MC_REBALANCE_BLOCK_KB', 512)) * 1024
+    return max(16, min(budget // (3 * 8 * asset_count), num_paths))
+
+
+def _simulate_rebalanced_paths(
+    mean_returns,
+    cov_matrix,
+    weights,
+    rng,
+    num_paths,
+    total_days,
+    capture_lookup,
+    initial_value,
+    periodic_contribution,
+    contribution_interval,
+    rebalance_frequency,
+    rebalance_threshold,
+):
+    """
+    Simulate per-asset holdings that drift with returns and are periodically
+    rebalanced to the target weights.
+
+    Holdings are laid out asset-major in blocks of paths (assets x block) sized
+    to stay in CPU cache. Each simulated day reuses the block's preallocated
+    buffers: draw normals, correlate them with the Cholesky factor, grow the
+    holdings, then rebalance the paths that are due. Contributions are
+    invested at the target weights.
+
+    Returns:
+        tuple: (yearly_values, drawdown_sums, final_drawdowns, rebalance_counts),
+               the first three as accumulated by run_monte_carlo_simulation and
+               rebalance_counts as one array of per-path counts per block
+    """
+    target = np.asarray(weights, dtype=np.float64)[:, None]
+    asset_count = len(target)
+    chol = _cholesky_factor(cov_matrix)
+    growth_offset = (1.0 + np.asarray(mean_returns, dtype=np.float64))[:, None]
+    contribution_split = target * periodic_contribution
+    interval = REBALANCE_INTERVALS.get(rebalance_frequency)
+    by_threshold = rebalance_frequency == "threshold"
+
+    yearly_values = {year: [] for year in capture_lookup.values()}
+    drawdown_sums = {year: 0.0 for year in capture_lookup.values()}
+    final_drawdowns = []
+    rebalance_counts = []
+
+    block_size = _rebalance_block_size(asset_count, num_paths)
+    buffers_for = None
+    for block_start in range(0, num_paths, block_size):
+        paths_in_block = min(block_size, num_paths - block_start)
+        if buffers_for != paths_in_block:
+            # Allocated once per block size (only the last block can be shorter)
+            normals = np.empty((asset_count, paths_in_block))
+            growth = np.empty((asset_count, paths_in_block))
+            holdings = np.empty((asset_count, paths_in_block))
+            drift = np.empty((asset_count, paths_in_block)) if by_threshold else None
+            totals = np.empty(paths_in_block)
+            running_peak = np.empty(paths_in_block)
+            peak_ratio = np.empty(paths_in_block)
+            worst_ratio = np.empty(paths_in_block)
+            max_drift = np.empty(paths_in_block)
+            due = np.empty(paths_in_block, dtype=bool)
+            buffers_for = paths_in_block
+
+        np.multiply(target, initial_value, out=holdings)
+        totals.fill(initial_value)
+        running_peak.fill(initial_value)
+        worst_ratio.fill(1.0)
+        counts = np.zeros(paths_in_block)
+
+        for day in range(1, total_days + 1):
+            if periodic_contribution > 0 and day % contribution_interval == 0:
+                holdings += contribution_split
+
+            rng.standard_normal(out=normals)
+            np.matmul(chol, normals, out=growth)
+            growth += growth_offset
+            holdings *= growth
+            holdings.sum(axis=0, out=totals)
+
+            if interval is not None and day % interval == 0:
+                np.multiply(target, totals, out=holdings)
+                counts += 1
+            elif by_threshold:
+                np.divide(holdings, totals, out=drift)
+                drift -= target
+                np.abs(drift, out=drift)
+                drift.max(axis=0, out=max_drift)
+                np.greater(max_drift, rebalance_threshold, out=due)
+                if due.any():
+                    # The drift buffer is free again: reuse it for the rebalanced holdings
+                    np.multiply(target, totals, out=drift)
+                    np.copyto(holdings, drift, where=due)
+                    counts += due
+
+            np.maximum(running_peak, totals, out=running_peak)
+            np.divide(totals, running_peak, out=peak_ratio)
+            np.minimum(worst_ratio, peak_ratio, out=worst_ratio)
+
+            if day in capture_lookup:
+                year = capture_lookup[day]
+                yearly_values[year].append(totals.copy())
+                drawdown_sums[year] += paths_in_block - float(worst_ratio.sum())
+
+        final_drawdowns.append(1.0 - worst_ratio)
+        rebalance_counts.append(counts)
+
+    return yearly_values, drawdown_sums, final_drawdowns, rebalance_counts
 
 
 def run_monte_carlo_simulation(
@@ -18,10 +224,18 @@ def run_monte_carlo_simulation(
     periodic_contribution=0.0,
     contribution_frequency="monthly",
     rng=None,
+    moments=None,
+    rebalance_frequency="daily",
+    rebalance_threshold=DEFAULT_REBALANCE_THRESHOLD,
 ):
     """
     Run Monte Carlo simulation for portfolio projections with periodic contributions.
 
+    With the default rebalance_frequency ("daily") the weights are held
+    constant and each day is simulated as one portfolio return per path. Any
+    other mode simulates per-asset holdings so weights drift between
+    rebalances (slower: the work per day scales with the asset count).
+
     Args:
         daily_returns (pd.DataFrame): DataFrame of daily returns for each asset (rows=dates, cols=tickers)
         weights (np.array): Portfolio weights for each asset
@@ -30,6 +244,13 @@ def run_monte_carlo_simulation(
         initial_value (float): Starting portfolio value for projections (default: 10000)
         periodic_contribution (float): Amount to contribute periodically (default: 0.0)
         contribution_frequency (str): "monthly", "quarterly", or "annually" (default: "monthly")
+        rng (np.random.Generator): Optional random generator
+        moments (tuple): Optional (mean, covariance) of daily returns, e.g. from
+                         core.rolling_stats, to skip recomputing them
+        rebalance_frequency (str): "daily", "monthly", "quarterly", "annually",
+                                   "threshold" or "never" (default: "daily")
+        rebalance_threshold (float): Weight drift that triggers a rebalance in
+                                     "threshold" mode (default: 0.05)
 
     Returns:
         dict: {
@@ -45,82 +266,79 @@ def run_monte_carlo_simulation(
                 'p50': [...],
                 'p90': [...],
                 'mean': [...]
+            },
+            'risk_metrics': {  # Tracked online during the simulation pass
+                'var_95': [...],             # Loss vs. capital contributed at the 5th percentile
+                'cvar_95': [...],            # Average loss vs. capital contributed in the worst 5%
+                'max_drawdown_mean': [...],  # Mean worst peak-to-trough decline so far
+                'max_drawdown': {'p50': ..., 'p90': ..., 'worst': ...}  # At the final year
+            },
+            'rebalancing': {  # Only when simulating per-asset holdings
+                'frequency': ..., 'threshold': ..., 'rebalances_per_year_mean': ...
             }
         }
     """
     if num_paths is None:
         num_paths = int(os.getenv('MC_PATH_COUNT', 5000))
     num_paths = max(1, num_paths)
+    started = time.perf_counter()
 
-    # Constants
-    DAYS_IN_YEAR = 252
     total_days = DAYS_IN_YEAR * num_years
 
     # Calculate contribution interval in trading days
-    contribution_intervals = {
-        "monthly": 21,    # ~21 trading days per month
-        "quarterly": 63,   # ~63 trading days per quarter
-        "annually": 252    # 252 trading days per year
-    }
-    contribution_interval = contribution_intervals.get(contribution_frequency, 21)
+    contribution_interval = CONTRIBUTION_INTERVALS.get(contribution_frequency, 21)
 
-    # Calculate historical statistics
-    mean_returns = daily_returns.mean().values  # Mean daily return for each asset
-    cov_matrix = daily_returns.cov().values     # Covariance matrix of daily returns
-
-    # Convert weights to numpy array if needed
-    weights_array = np.array(weights)
-    asset_count = len(weights_array)
+    if rebalance_frequency not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"rebalance_frequency must be one of {REBALANCE_FREQUENCIES}")
 
     rng = rng or np.random.default_rng()
-
-    # Precompute structures for correlated sampling to avoid repeated decompositions
-    chol = None
-    if asset_count > 1:
-        try:
-            chol = np.linalg.cholesky(cov_matrix)
-        except np.linalg.LinAlgError:
-            # Add small jitter for numerical stability
-            jitter = np.eye(asset_count) * 1e-8
-            chol = np.linalg.cholesky(cov_matrix + jitter)
-    else:
-        # Single asset stats
-        mean_return_single = mean_returns[0]
-        std_return_single = np.sqrt(max(cov_matrix[0, 0], 0))
+    rebalanced = rebalance_frequency != "daily" and len(weights) > 1
 
     years = list(range(1, num_years + 1))
     capture_lookup = {year * DAYS_IN_YEAR: year for year in years}
-    yearly_values = {year: [] for year in years}
 
-    chunk_size = int(os.getenv('MC_PATH_CHUNK_SIZE', 500))
-    chunk_size = max(1, min(chunk_size, num_paths))
+    if rebalanced:
+        mean_returns, cov_matrix = _return_moments(daily_returns, moments)
+        yearly_values, drawdown_sums, final_drawdowns, rebalance_counts = _simulate_rebalanced_paths(
+            mean_returns, cov_matrix, weights, rng, num_paths, total_days, capture_lookup,
+            initial_value, periodic_contribution, contribution_interval,
+            rebalance_frequency, rebalance_threshold
+        )
+    else:
+        sample_daily_returns = _build_return_sampler(daily_returns, weights, rng, moments)
+        yearly_values = {year: [] for year in years}
+        drawdown_sums = {year: 0.0 for year in years}
+        final_drawdowns = []
 
-    for chunk_start in range(0, num_paths, chunk_size):
-        paths_in_chunk = min(chunk_size, num_paths - chunk_start)
-        current_values = np.full(paths_in_chunk, initial_value, dtype=np.float64)
+        chunk_size = int(os.getenv('MC_PATH_CHUNK_SIZE', 500))
+        chunk_size = max(1, min(chunk_size, num_paths))
 
-        for day in range(1, total_days + 1):
-            # Add periodic contribution at the start of each period
-            if periodic_contribution > 0 and day % contribution_interval == 0:
-                current_values += periodic_contribution
-
-            if asset_count == 1:
-                daily_returns = rng.normal(
-                    loc=mean_return_single,
-                    scale=std_return_single,
-                    size=paths_in_chunk
-                )
-            else:
-                standard_normals = rng.standard_normal(size=(paths_in_chunk, asset_count))
-                correlated = standard_normals @ chol.T
-                correlated += mean_returns
-                daily_returns = correlated @ weights_array
-
-            current_values *= (1 + daily_returns)
+        for chunk_start in range(0, num_paths, chunk_size):
+            paths_in_chunk = min(chunk_size, num_paths - chunk_start)
+            current_values = np.full(paths_in_chunk, initial_value, dtype=np.float64)
 
-            if day in capture_lookup:
-                year = capture_lookup[day]
-                yearly_values[year].append(current_values.copy())
+            # Running peak and worst value/peak ratio per path, updated in place
+            running_peak = current_values.copy()
+            peak_ratio = np.empty(paths_in_chunk, dtype=np.float64)
+            worst_ratio = np.ones(paths_in_chunk, dtype=np.float64)
+
+            for day in range(1, total_days + 1):
+                # Add periodic contribution at the start of each period
+                if periodic_contribution > 0 and day % contribution_interval == 0:
+                    current_values += periodic_contribution
+
+                current_values *= (1 + sample_daily_returns(paths_in_chunk))
+
+                np.maximum(running_peak, current_values, out=running_peak)
+                np.divide(current_values, running_peak, out=peak_ratio)
+                np.minimum(worst_ratio, peak_ratio, out=worst_ratio)
+
+                if day in capture_lookup:
+                    year = capture_lookup[day]
+                    yearly_values[year].append(current_values.copy())
+                    drawdown_sums[year] += paths_in_chunk - float(worst_ratio.sum())
+
+            final_drawdowns.append(1.0 - worst_ratio)
 
     percentiles = {
         'p10': [],
@@ -128,6 +346,11 @@ def run_monte_carlo_simulation(
         'p90': [],
         'mean': []
     }
+    risk_metrics = {
+        'var_95': [],
+        'cvar_95': [],
+        'max_drawdown_mean': []
+    }
 
     for year in years:
         if yearly_values[year]:
@@ -140,12 +363,202 @@ def run_monte_carlo_simulation(
         percentiles['p90'].append(float(np.percentile(year_samples, 90)))
         percentiles['mean'].append(float(np.mean(year_samples)))
 
+        # Tail losses are measured against the capital put in so far
+        contributed = initial_value
+        if periodic_contribution > 0:
+            contributed += periodic_contribution * ((year * DAYS_IN_YEAR) // contribution_interval)
+        tail_cutoff = np.percentile(year_samples, 100 * (1 - RISK_CONFIDENCE))
+        tail_mean = year_samples[year_samples <= tail_cutoff].mean()
+        risk_metrics['var_95'].append(float(contributed - tail_cutoff))
+        risk_metrics['cvar_95'].append(float(contributed - tail_mean))
+        risk_metrics['max_drawdown_mean'].append(drawdown_sums[year] / num_paths)
+
+    horizon_drawdowns = np.concatenate(final_drawdowns)
+    risk_metrics['max_drawdown'] = {
+        'p50': float(np.percentile(horizon_drawdowns, 50)),
+        'p90': float(np.percentile(horizon_drawdowns, 90)),
+        'worst': float(horizon_drawdowns.max())
+    }
+
+    metrics.record_simulation(num_paths, time.perf_counter() - started)
+
+    results = {
+        'years': years,
+        'percentiles': percentiles,
+        'risk_metrics': risk_metrics
+    }
+    if rebalanced:
+        results['rebalancing'] = {
+            'frequency': rebalance_frequency,
+            'threshold': rebalance_threshold if rebalance_frequency == "threshold" else None,
+            'rebalances_per_year_mean': float(np.concatenate(rebalance_counts).mean() / num_years)
+        }
+    return results
+
+
+
+def simulate_growth_factors(
+    daily_returns,
+    weights,
+    num_years=10,
+    num_paths=None,
+    contribution_frequencies=("monthly",),
+    rng=None,
+    moments=None,
+):
+    """
+    Simulate per-path growth factors that price any cash-flow scenario.
+
+    Along a fixed path, the portfolio value at a checkpoint is linear in the
+    cash flows: value = initial * growth + contribution * contribution_growth.
+    Recording both factors once lets many (initial, contribution, frequency)
+    combinations be evaluated without re-simulating.
+
+    Args:
+        daily_returns (pd.DataFrame): DataFrame of daily returns for each asset (rows=dates, cols=tickers)
+        weights (np.array): Portfolio weights for each asset
+        num_years (int): Number of years to project forward (default: 10)
+        num_paths (int): Number of Monte Carlo paths to simulate (default: from env or 5000)
+        contribution_frequencies (iterable): Frequencies to track contribution growth for
+        rng (np.random.Generator): Optional random generator
+        moments (tuple): Optional (mean, covariance) of daily returns, e.g. from
+                         core.rolling_stats, to skip recomputing them
+
+    Returns:
+        dict: {
+            'years': [1, 2, ..., num_years],
+            'growth': np.array (years x paths) growth of 1 unit invested at day 0,
+            'contribution_growth': {
+                frequency: np.array (years x paths) value of a 1-unit contribution stream
+            }
+        }
+    """
+    if num_paths is None:
+        num_paths = int(os.getenv('MC_PATH_COUNT', 5000))
+    num_paths = max(1, num_paths)
+    started = time.perf_counter()
+
+    total_days = DAYS_IN_YEAR * num_years
+    frequencies = list(dict.fromkeys(contribution_frequencies))
+    intervals = {freq: CONTRIBUTION_INTERVALS.get(freq, 21) for freq in frequencies}
+
+    rng = rng or np.random.default_rng()
+    sample_daily_returns = _build_return_sampler(daily_returns, weights, rng, moments)
+
+    years = list(range(1, num_years + 1))
+    capture_lookup = {year * DAYS_IN_YEAR: year - 1 for year in years}
+    growth = np.empty((num_years, num_paths), dtype=np.float64)
+    contribution_growth = {freq: np.empty((num_years, num_paths), dtype=np.float64) for freq in frequencies}
+
+    chunk_size = int(os.getenv('MC_PATH_CHUNK_SIZE', 500))
+    chunk_size = max(1, min(chunk_size, num_paths))
+
+    for chunk_start in range(0, num_paths, chunk_size):
+        paths_in_chunk = min(chunk_size, num_paths - chunk_start)
+        chunk_slice = slice(chunk_start, chunk_start + paths_in_chunk)
+        current_growth = np.ones(paths_in_chunk, dtype=np.float64)
+        current_streams = {freq: np.zeros(paths_in_chunk, dtype=np.float64) for freq in frequencies}
+
+        for day in range(1, total_days + 1):
+            # Unit contributions land at the start of each period, as in the main engine
+            for freq in frequencies:
+                if day % intervals[freq] == 0:
+                    current_streams[freq] += 1.0
+
+            day_growth = 1 + sample_daily_returns(paths_in_chunk)
+            current_growth *= day_growth
+            for stream in current_streams.values():
+                stream *= day_growth
+
+            if day in capture_lookup:
+                year_index = capture_lookup[day]
+                growth[year_index, chunk_slice] = current_growth
+                for freq, stream in current_streams.items():
+                    contribution_growth[freq][year_index, chunk_slice] = stream
+
+    metrics.record_simulation(num_paths, time.perf_counter() - started)
+
     return {
         'years': years,
-        'percentiles': percentiles
+        'growth': growth,
+        'contribution_growth': contribution_growth
     }
 
 
+def run_scenario_sweep(
+    daily_returns,
+    weights,
+    scenarios,
+    num_years=10,
+    num_paths=None,
+    rng=None,
+    moments=None,
+):
+    """
+    Price a grid of cash-flow scenarios from one set of simulated paths.
+
+    Args:
+        daily_returns (pd.DataFrame): DataFrame of daily returns for each asset (rows=dates, cols=tickers)
+        weights (np.array): Portfolio weights for each asset
+        scenarios (list): Dicts with 'initial_value', 'periodic_contribution'
+                          and 'contribution_frequency'
+        num_years (int): Number of years to project forward (default: 10)
+        num_paths (int): Number of Monte Carlo paths to simulate (default: from env or 5000)
+        rng (np.random.Generator): Optional random generator
+        moments (tuple): Optional (mean, covariance) of daily returns, e.g. from
+                         core.rolling_stats, to skip recomputing them
+
+    Returns:
+        dict: {
+            'years': [1, 2, ..., num_years],
+            'scenarios': [
+                {
+                    'initial_value': ..., 'periodic_contribution': ...,
+                    'contribution_frequency': ...,
+                    'percentiles': {'p10': [...], 'p50': [...], 'p90': [...], 'mean': [...]}
+                },
+                ...
+            ]
+        }
+    """
+    frequencies = [scenario.get('contribution_frequency', 'monthly') for scenario in scenarios]
+    factors = simulate_growth_factors(
+        daily_returns,
+        weights,
+        num_years=num_years,
+        num_paths=num_paths,
+        contribution_frequencies=frequencies,
+        rng=rng,
+        moments=moments
+    )
+
+    results = []
+    for scenario, frequency in zip(scenarios, frequencies):
+        initial_value = scenario.get('initial_value', 10000)
+        periodic_contribution = scenario.get('periodic_contribution', 0.0)
+
+        values = factors['growth'] * initial_value
+        if periodic_contribution > 0:
+            values += factors['contribution_growth'][frequency] * periodic_contribution
+
+        p10, p50, p90 = np.percentile(values, [10, 50, 90], axis=1)
+        results.append({
+            'initial_value': initial_value,
+            'periodic_contribution': periodic_contribution,
+            'contribution_frequency': frequency,
+            'percentiles': {
+                'p10': p10.tolist(),
+                'p50': p50.tolist(),
+                'p90': p90.tolist(),
+                'mean': values.mean(axis=1).tolist()
+            }
+        })
+
+    return {
+        'years': factors['years'],
+        'scenarios': results
+    }
+
 def calculate_historical_cagr(price_data):
     """
     Calculate the realized Compound Annual Growth Rate (CAGR) from historical price data.
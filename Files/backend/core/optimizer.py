@@ -0,0 +1,263 @@
+"""
+Portfolio Optimization Module
+
+Computes long-only minimum-variance, maximum-Sharpe and efficient-frontier
+portfolios from the same mean vector and covariance matrix used for the
+portfolio metrics.
+
+Approach:
+- Every frontier point solves min w'Σw - t·μ'w over the simplex (w >= 0, sum(w) = 1)
+- All points are solved together with an accelerated projected-gradient (FISTA)
+  iteration, so the per-iteration cost is one (points x assets) matrix product
+- Covariance-derived solver operators are cached per ticker set and window
+- Frontier points warm-start from the minimum-variance solution, and each
+  maximum-Sharpe refinement round warm-starts from the best point so far
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DAYS_IN_YEAR = 252
+MAX_SHARPE_PROBES = 9  # Tradeoffs solved per maximum-Sharpe refinement round
+MAX_SHARPE_REFINE_ROUNDS = 4
+
+# Cached solver operators keyed by (tickers, window)
+_factor_cache = OrderedDict()
+_factor_cache_lock = threading.Lock()
+
+
+def _cache_size():
+    return max(1, int(os.getenv('OPTIMIZER_CACHE_SIZE', 32)))
+
+
+def _project_to_simplex(points):
+    """
+    Euclidean projection of each row onto the probability simplex.
+
+    Uses the sort-based algorithm of Duchi et al. (2008), vectorized over rows.
+
+    Args:
+        points (np.array): Array of shape (k, n)
+
+    Returns:
+        np.array: Array of shape (k, n) whose rows are non-negative and sum to 1
+    """
+    k, n = points.shape
+    sorted_desc = -np.sort(-points, axis=1)
+    cumulative = np.cumsum(sorted_desc, axis=1) - 1.0
+    index = np.arange(1, n + 1)
+    condition = sorted_desc - cumulative / index > 0
+    rho = n - 1 - np.argmax(condition[:, ::-1], axis=1)
+    theta = cumulative[np.arange(k), rho] / (rho + 1)
+    return np.maximum(points - theta[:, None], 0.0)
+
+
+def _factorize_covariance(cov_matrix, cache_key=None):
+    """
+    Precompute the solver operators for a covariance matrix, cached per ticker set.
+
+    The gradient step on the quadratic part is the affine map
+    Y - step·2YΣ = Y(I - 2·step·Σ), so the largest eigenvalue (which fixes the
+    step) and that matrix are all the solver needs from Σ.
+
+    Args:
+        cov_matrix (np.array): Annualized covariance matrix
+        cache_key (hashable): Optional key, e.g. (tickers, start_date, end_date)
+
+    Returns:
+        dict: {'lipschitz', 'step_matrix'} where `lipschitz` is the gradient
+              Lipschitz constant 2·λmax and `step_matrix` is I - (2/L)·Σ
+    """
+    if cache_key is not None:
+        with _factor_cache_lock:
+            if cache_key in _factor_cache:
+                _factor_cache.move_to_end(cache_key)
+                return _factor_cache[cache_key]
+
+    lipschitz = max(2.0 * float(np.linalg.eigvalsh(cov_matrix)[-1]), 1e-12)
+    factors = {
+        'lipschitz': lipschitz,
+        'step_matrix': np.eye(len(cov_matrix)) - (2.0 / lipschitz) * cov_matrix
+    }
+
+    if cache_key is not None:
+        with _factor_cache_lock:
+            _factor_cache[cache_key] = factors
+            while len(_factor_cache) > _cache_size():
+                _factor_cache.popitem(last=False)
+
+    return factors
+
+
+def _solve_simplex_qp(factors, mean_returns, tradeoffs, initial_weights, max_iterations=5000, tolerance=1e-8):
+    """
+    Solve min w'Σw - t·μ'w over the simplex for many tradeoffs t at once.
+
+    Args:
+        factors (dict): Solver operators from _factorize_covariance
+        mean_returns (np.array): Expected returns (n,)
+        tradeoffs (np.array): Return/risk tradeoff for each problem (k,)
+        initial_weights (np.array): Warm-start weights (k x n)
+        max_iterations (int): Iteration cap
+        tolerance (float): Stop when no weight moves more than this
+
+    Returns:
+        np.array: Optimal weights (k x n)
+    """
+    step_matrix = factors['step_matrix']
+    linear_term = (tradeoffs[:, None] * mean_returns[None, :]) / factors['lipschitz']
+
+    weights = _project_to_simplex(initial_weights)
+    momentum_point = weights
+    momentum = np.ones(len(tradeoffs))
+
+    for _ in range(max_iterations):
+        next_weights = _project_to_simplex(momentum_point @ step_matrix + linear_term)
+        change = next_weights - weights
+        if np.max(np.abs(change)) < tolerance:
+            weights = next_weights
+            break
+
+        # Adaptive restart (O'Donoghue & Candes): drop momentum on rows where it
+        # points against the latest step, which keeps convergence linear
+        restart = np.einsum('ij,ij->i', momentum_point - next_weights, change) > 0
+        momentum[restart] = 1.0
+
+        next_momentum = (1.0 + np.sqrt(1.0 + 4.0 * momentum * momentum)) / 2.0
+        momentum_point = next_weights + ((momentum - 1.0) / next_momentum)[:, None] * change
+        weights = next_weights
+        momentum = next_momentum
+
+    return weights
+
+
+def _max_return_tradeoff(cov_matrix, mean_returns):
+    """
+    Smallest tradeoff at which the highest-return asset alone is optimal.
+
+    At the corner e_j the simplex optimality conditions reduce to
+    t >= 2(Σjj - Σij) / (μj - μi) for every asset i with a lower return.
+    """
+    best = int(np.argmax(mean_returns))
+    gaps = mean_returns[best] - mean_returns
+    lower = gaps > 1e-15
+    if not np.any(lower):
+        return 0.0
+    bounds = 2.0 * (cov_matrix[best, best] - cov_matrix[lower, best]) / gaps[lower]
+    return float(max(np.max(bounds), 0.0))
+
+
+def _describe(weights, mean_returns, cov_matrix, risk_free_rate):
+    """Annualized return, volatility and Sharpe ratio for each row of weights."""
+    expected_returns = weights @ mean_returns
+    variances = np.einsum('ij,jk,ik->i', weights, cov_matrix, weights)
+    volatilities = np.sqrt(np.maximum(variances, 0.0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratios = np.where(volatilities > 0, (expected_returns - risk_free_rate) / volatilities, 0.0)
+    return expected_returns, volatilities, sharpe_ratios
+
+
+def _portfolio_summary(weights, expected_return, volatility, sharpe_ratio):
+    return {
+        'weights': [float(w) for w in weights],
+        'expected_annual_return': float(expected_return),
+        'annual_volatility': float(volatility),
+        'sharpe_ratio': float(sharpe_ratio)
+    }
+
+
+def optimize_portfolio(daily_returns, risk_free_rate=0.04, num_points=50, cache_key=None, moments=None):
+    """
+    Compute minimum-variance, maximum-Sharpe and efficient-frontier portfolios.
+
+    Args:
+        daily_returns (pd.DataFrame): DataFrame of daily returns for each asset (rows=dates, cols=tickers)
+        risk_free_rate (float): Annual risk-free rate used for Sharpe ratios (default: 0.04)
+        num_points (int): Number of frontier portfolios to sample (default: 50)
+        cache_key (hashable): Optional key for reusing the covariance factorization
+        moments (tuple): Optional precomputed (mean, covariance) of the daily returns
+
+    Returns:
+        dict: {
+            'tickers': [...],
+            'min_variance': {'weights', 'expected_annual_return', 'annual_volatility', 'sharpe_ratio'},
+            'max_sharpe': {...same fields...},
+            'frontier': [{...same fields...}, ...]  # Sorted by increasing volatility
+        }
+    """
+    tickers = list(daily_returns.columns)
+    if moments is not None:
+        mean_returns = np.asarray(moments[0]) * DAYS_IN_YEAR
+        cov_matrix = np.asarray(moments[1]) * DAYS_IN_YEAR
+    else:
+        mean_returns = daily_returns.mean().values * DAYS_IN_YEAR
+        cov_matrix = daily_returns.cov().values * DAYS_IN_YEAR
+    asset_count = len(tickers)
+    num_points = max(2, int(num_points))
+
+    factors = _factorize_covariance(cov_matrix, cache_key=cache_key)
+
+    # Minimum variance (t = 0), starting from equal weights
+    equal_weights = np.full((1, asset_count), 1.0 / asset_count)
+    min_variance = _solve_simplex_qp(factors, mean_returns, np.zeros(1), equal_weights)
+
+    # Frontier: tradeoffs from 0 to the point where the best single asset takes over
+    max_tradeoff = _max_return_tradeoff(cov_matrix, mean_returns)
+    if max_tradeoff > 0:
+        tradeoffs = np.concatenate([[0.0], np.geomspace(max_tradeoff / 1000.0, max_tradeoff, num_points - 1)])
+    else:
+        tradeoffs = np.zeros(num_points)
+
+    frontier = _solve_simplex_qp(
+        factors,
+        mean_returns,
+        tradeoffs,
+        np.repeat(min_variance, num_points, axis=0)
+    )
+    frontier[0] = min_variance[0]
+    frontier_returns, frontier_vols, frontier_sharpes = _describe(frontier, mean_returns, cov_matrix, risk_free_rate)
+
+    # Maximum Sharpe: zoom in on the tradeoff between the best sampled point's
+    # neighbours, solving each batch of probes warm-started from the current best
+    best = int(np.argmax(frontier_sharpes))
+    low = tradeoffs[max(best - 1, 0)]
+    high = tradeoffs[min(best + 1, num_points - 1)]
+    best_weights = frontier[best:best + 1]
+    best_sharpe = frontier_sharpes[best]
+
+    for _ in range(MAX_SHARPE_REFINE_ROUNDS):
+        if high - low <= 1e-9 * max(max_tradeoff, 1.0):
+            break
+        probes = np.linspace(low, high, MAX_SHARPE_PROBES)
+        probe_weights = _solve_simplex_qp(
+            factors,
+            mean_returns,
+            probes,
+            np.repeat(best_weights, MAX_SHARPE_PROBES, axis=0)
+        )
+        _, _, probe_sharpes = _describe(probe_weights, mean_returns, cov_matrix, risk_free_rate)
+
+        winner = int(np.argmax(probe_sharpes))
+        if probe_sharpes[winner] > best_sharpe:
+            best_sharpe = probe_sharpes[winner]
+            best_weights = probe_weights[winner:winner + 1]
+        low = probes[max(winner - 1, 0)]
+        high = probes[min(winner + 1, MAX_SHARPE_PROBES - 1)]
+
+    min_var_stats = _describe(min_variance, mean_returns, cov_matrix, risk_free_rate)
+    max_sharpe_stats = _describe(best_weights, mean_returns, cov_matrix, risk_free_rate)
+
+    order = np.argsort(frontier_vols, kind='stable')
+
+    return {
+        'tickers': tickers,
+        'min_variance': _portfolio_summary(min_variance[0], *(stat[0] for stat in min_var_stats)),
+        'max_sharpe': _portfolio_summary(best_weights[0], *(stat[0] for stat in max_sharpe_stats)),
+        'frontier': [
+            _portfolio_summary(frontier[i], frontier_returns[i], frontier_vols[i], frontier_sharpes[i])
+            for i in order
+        ]
+    }
@@ -0,0 +1,194 @@
+"""
+Rolling Return Statistics Module
+
+Keeps the mean vector and covariance matrix of each ticker set's return window
+up to date incrementally instead of recomputing them from the full window on
+every request.
+
+The analysis window slides by whole days: from one request to the next the
+same rows are usually present, or a few new days have been appended and the
+same number of old days dropped. For each ticker set the store keeps the
+window's rows, their running mean and the co-moment matrix
+    M2 = sum over rows of (x - mean)(x - mean)^T
+and applies Welford updates for the rows entering and leaving the window:
+O(n^2) per changed day for n assets, instead of O(T * n^2) for a full pass
+over T days. Rows are compared exactly (dates and values) before reuse, so a
+revised or re-fetched history falls back to a full two-pass rebuild, and a
+rebuild is also forced every RESYNC_INTERVAL incremental updates so rounding
+error from removals cannot accumulate.
+
+Covariances use ddof=1, matching pandas DataFrame.cov() and Series.std().
+
+Configuration (environment):
+- ROLLING_STATS_MAX_ENTRIES: Ticker sets kept in memory (default: 64)
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from core import metrics
+
+# Incremental updates allowed before the moments are rebuilt from scratch
+RESYNC_INTERVAL = 252
+
+WindowStats = namedtuple('WindowStats', ['mean', 'cov', 'count'])
+
+
+class RollingMoments:
+    """
+    Running mean and co-moment matrix with Welford add/remove updates.
+    """
+
+    def __init__(self, num_assets):
+        self.count = 0
+        self.mean = np.zeros(num_assets, dtype=np.float64)
+        self.comoment = np.zeros((num_assets, num_assets), dtype=np.float64)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build the moments of `rows` (T x n) with a two-pass computation."""
+        rows = np.asarray(rows, dtype=np.float64)
+        moments = cls(rows.shape[1])
+        moments.count = rows.shape[0]
+        if moments.count:
+            moments.mean = rows.mean(axis=0)
+            centered = rows - moments.mean
+            moments.comoment = centered.T @ centered
+        return moments
+
+    def add(self, row):
+        """Include one observation (length n)."""
+        self.count += 1
+        delta = row - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, row - self.mean)
+
+    def remove(self, row):
+        """Exclude an observation previously added."""
+        if self.count <= 1:
+            self.count = 0
+            self.mean[:] = 0.0
+            self.comoment[:] = 0.0
+            return
+        delta = row - self.mean
+        self.count -= 1
+        self.mean -= delta / self.count
+        self.comoment -= np.outer(delta, row - self.mean)
+
+    def covariance(self, ddof=1):
+        """Sample covariance matrix (NaN when there are too few observations)."""
+        if self.count - ddof <= 0:
+            return np.full_like(self.comoment, np.nan)
+        cov = self.comoment / (self.count - ddof)
+        # Removals can leave tiny asymmetries; keep the matrix exactly symmetric
+        return (cov + cov.T) / 2
+
+
+class RollingStatsStore:
+    """
+    Per-ticker-set window statistics, updated as days enter and leave the window.
+    """
+
+    def __init__(self, max_entries=None, resync_interval=RESYNC_INTERVAL):
+        """
+        Initialize the store.
+
+        Args:
+            max_entries: Ticker sets kept (default: ROLLING_STATS_MAX_ENTRIES or 64);
+                         the least recently used set is dropped first
+            resync_interval: Incremental updates before a full rebuild
+        """
+        if max_entries is None:
+            max_entries = int(os.getenv('ROLLING_STATS_MAX_ENTRIES', 64))
+        self.max_entries = max(1, max_entries)
+        self.resync_interval = resync_interval
+        self._entries = OrderedDict()  # key -> {'dates', 'rows', 'moments', 'updates'}
+        self._lock = threading.Lock()
+
+    def update(self, key, daily_returns):
+        """
+        Statistics of the current return window for a ticker set.
+
+        Args:
+            key: Hashable ticker-set key (e.g. tuple of tickers in column order)
+            daily_returns (pd.DataFrame): Current window (rows=dates, cols=tickers)
+
+        Returns:
+            WindowStats: (mean, cov, count) of daily returns; mean has length n
+                         and cov is n x n, in the DataFrame's column order
+        """
+        dates = daily_returns.index.to_numpy()
+        rows = daily_returns.to_numpy(dtype=np.float64)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            mode = self._apply(entry, dates, rows) if entry is not None else None
+            if mode is None:
+                entry = {'moments': RollingMoments.from_rows(rows), 'updates': 0}
+                mode = 'rebuild'
+            entry['dates'] = dates
+            entry['rows'] = rows.copy()
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            moments = entry['moments']
+            stats = WindowStats(moments.mean.copy(), moments.covariance(), moments.count)
+
+        metrics.increment('smartrisk_rolling_stats_updates_total', mode=mode)
+        return stats
+
+    def _apply(self, entry, dates, rows):
+        """
+        Slide `entry` to the new window in place.
+
+        Returns:
+            str: 'reuse' or 'incremental', or None when a rebuild is needed
+        """
+        old_dates, old_rows = entry['dates'], entry['rows']
+        if old_rows.shape[1] != rows.shape[1] or not len(dates) or not len(old_dates):
+            return None
+
+        # The new window must continue the old one: old[drop:] == new[:overlap]
+        drop = int(np.searchsorted(old_dates, dates[0]))
+        overlap = len(old_dates) - drop
+        if drop >= len(old_dates) or overlap > len(dates):
+            return None
+        if not (np.array_equal(old_dates[drop:], dates[:overlap])
+                and np.array_equal(old_rows[drop:], rows[:overlap])):
+            return None
+
+        changes = drop + len(dates) - overlap
+        if changes == 0:
+            return 'reuse'
+        if changes >= len(dates) or entry['updates'] + changes > self.resync_interval:
+            return None
+
+        moments = entry['moments']
+        # Add before removing so the running count never gets small
+        for row in rows[overlap:]:
+            moments.add(row)
+        for row in old_rows[:drop]:
+            moments.remove(row)
+        entry['updates'] += changes
+        return 'incremental'
+
+
+# Global store (created on first use)
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_rolling_stats():
+    """Get the global rolling statistics store."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = RollingStatsStore()
+    return _store
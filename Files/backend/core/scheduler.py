@@ -0,0 +1,176 @@
+"""
+Simulation Scheduler Module
+
+Admission control for CPU-heavy work (Monte Carlo simulations, scenario
+sweeps). Jobs run on a bounded pool of worker threads fed from a priority
+queue; when every worker is busy and the queue is full, submit() raises
+SchedulerFull immediately so the API can answer 503 with Retry-After
+instead of letting latency grow for everyone.
+
+Priority: each job gets a virtual deadline of
+    submit time + cost * SCHEDULER_COST_WEIGHT_SECONDS
+and the earliest deadline runs first. Small jobs therefore overtake large
+ones submitted at about the same time, but a large job is never starved:
+once it has waited longer than the cost difference, newer small jobs queue
+behind it.
+
+Configuration (environment):
+- SCHEDULER_MAX_WORKERS: Concurrent simulations (default: CPU count)
+- SCHEDULER_MAX_QUEUE: Jobs allowed to wait for a worker (default: 2 x workers)
+- SCHEDULER_COST_WEIGHT_SECONDS: Queue priority seconds per unit of cost (default: 2)
+"""
+
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from core import metrics
+
+# Work of the default analysis: 5,000 paths x 10 years x 1 asset
+BASE_COST_UNITS = 5000 * 10
+
+
+class SchedulerFull(Exception):
+    """Raised when no worker is free and the wait queue is at capacity."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Simulation queue is full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def estimate_cost(num_paths, num_years, num_assets=1):
+    """
+    Relative cost of a simulation (1.0 = 5,000 paths, 10 years, one asset).
+
+    Sampling correlated returns scales with the asset count, so the cost is
+    proportional to paths x years x assets.
+    """
+    return num_paths * num_years * max(1, num_assets) / BASE_COST_UNITS
+
+
+class JobScheduler:
+    """
+    Bounded worker pool with a cost-weighted priority queue.
+    """
+
+    def __init__(self, max_workers=None, max_queued=None, cost_weight_seconds=None):
+        """
+        Initialize the scheduler (worker threads start on first submit).
+
+        Args:
+            max_workers: Concurrent jobs (default: SCHEDULER_MAX_WORKERS or CPU count)
+            max_queued: Jobs allowed to wait (default: SCHEDULER_MAX_QUEUE or 2 x workers)
+            cost_weight_seconds: Priority seconds per unit of cost
+                                 (default: SCHEDULER_COST_WEIGHT_SECONDS or 2)
+        """
+        if max_workers is None:
+            max_workers = int(os.getenv('SCHEDULER_MAX_WORKERS', os.cpu_count() or 2))
+        if max_queued is None:
+            max_queued = int(os.getenv('SCHEDULER_MAX_QUEUE', 2 * max_workers))
+        if cost_weight_seconds is None:
+            cost_weight_seconds = float(os.getenv('SCHEDULER_COST_WEIGHT_SECONDS', 2.0))
+
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max(0, max_queued)
+        self.cost_weight_seconds = cost_weight_seconds
+
+        self._queue = []  # (deadline, sequence, future, fn, args, kwargs, enqueued_at)
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._running = 0
+        self._average_seconds = 1.0  # Moving average of job run time
+
+    def submit(self, fn, *args, cost=1.0, reject_when_full=True, **kwargs):
+        """
+        Schedule `fn(*args, **kwargs)`.
+
+        Args:
+            fn: Callable to run on a worker thread
+            cost: Relative cost (see estimate_cost); cheaper jobs run sooner
+            reject_when_full: Raise SchedulerFull instead of queueing past
+                              capacity (background jobs pass False to wait)
+
+        Returns:
+            concurrent.futures.Future: Resolves to the callable's result
+
+        Raises:
+            SchedulerFull: If all workers are busy and the queue is full
+        """
+        future = Future()
+        with self._condition:
+            if reject_when_full and self._running + len(self._queue) >= self.max_workers + self.max_queued:
+                metrics.increment('smartrisk_scheduler_rejected_total')
+                raise SchedulerFull(self._retry_after())
+
+            now = time.monotonic()
+            deadline = now + cost * self.cost_weight_seconds
+            heapq.heappush(self._queue, (deadline, next(self._sequence), future, fn, args, kwargs, now))
+            metrics.set_gauge('smartrisk_scheduler_queue_depth', len(self._queue))
+
+            if len(self._workers) < self.max_workers and self._running + len(self._queue) > len(self._workers):
+                worker = threading.Thread(target=self._work, name=f"scheduler-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            self._condition.notify()
+        return future
+
+    def stats(self):
+        """Current load: {'running', 'queued', 'max_workers', 'max_queued'}."""
+        with self._condition:
+            return {
+                'running': self._running,
+                'queued': len(self._queue),
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued
+            }
+
+    def _retry_after(self):
+        """Seconds until a queue slot is likely to open, from the average job time."""
+        backlog = self._running + len(self._queue)
+        estimate = self._average_seconds * backlog / self.max_workers
+        return int(min(max(math.ceil(estimate), 1), 60))
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                _, _, future, fn, args, kwargs, enqueued_at = heapq.heappop(self._queue)
+                metrics.set_gauge('smartrisk_scheduler_queue_depth', len(self._queue))
+                if not future.set_running_or_notify_cancel():
+                    continue  # Cancelled while queued (e.g. the client went away)
+                self._running += 1
+
+            started = time.monotonic()
+            metrics.observe('smartrisk_stage_duration_seconds', started - enqueued_at, stage='scheduler_wait')
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._condition:
+                    self._running -= 1
+                    self._average_seconds = 0.8 * self._average_seconds + 0.2 * elapsed
+
+
+# Global scheduler (created on first use)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Get the global simulation scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JobScheduler()
+    return _scheduler
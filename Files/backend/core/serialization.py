@@ -0,0 +1,161 @@
+"""
+Response Serialization Module
+
+Fast encoding for the large analysis payloads (percentile series, scenario
+grids, efficient frontiers), bypassing FastAPI's jsonable_encoder walk.
+
+- JSON is encoded with orjson when it is installed (numpy arrays and scalars
+  are serialized natively, NaN becomes null); otherwise with the standard
+  json module, converting numpy values through tolist()/item() and
+  non-finite floats to null.
+- Clients sending `Accept: application/msgpack` get MessagePack instead of
+  JSON when msgpack is installed.
+- Bodies of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed with
+  brotli (if installed and accepted) or gzip, per the Accept-Encoding header.
+
+orjson, msgpack and brotli are optional; without them responses are plain
+JSON (gzip still works, it is in the standard library).
+
+Configuration (environment):
+- RESPONSE_COMPRESSION_MIN_BYTES: Smallest body worth compressing (default: 1024)
+- RESPONSE_GZIP_LEVEL: gzip level 1-9 (default: 5)
+- RESPONSE_BROTLI_QUALITY: brotli quality 0-11 (default: 4)
+"""
+
+import gzip
+import json
+import math
+import os
+
+import numpy as np
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the json module
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional: MessagePack requests get JSON
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+JSON_MEDIA_TYPE = 'application/json'
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def _to_builtin(value):
+    """Convert numpy values the encoders do not handle natively."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _finite(value):
+    """Replace NaN/inf with None throughout `value`, as orjson does, for the json fallback."""
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return _finite(_to_builtin(value))
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def dumps_json(content) -> bytes:
+    """
+    Encode `content` as compact UTF-8 JSON.
+
+    Args:
+        content: dicts, lists, numbers, strings, numpy arrays and scalars
+
+    Returns:
+        bytes: JSON document
+    """
+    if orjson is not None:
+        return orjson.dumps(
+            content,
+            default=_to_builtin,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(_finite(content), default=_to_builtin, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+
+def dumps_msgpack(content) -> bytes:
+    """
+    Encode `content` as MessagePack.
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(content, default=_to_builtin, use_bin_type=True)
+
+
+def _accepts(header, token):
+    """Whether a comma-separated Accept/Accept-Encoding header lists `token` with q > 0."""
+    for item in (header or '').lower().split(','):
+        name, *params = item.split(';')
+        if name.strip() != token:
+            continue
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _compress(body, accept_encoding):
+    """Compress `body` for the client, returning (body, content encoding or None)."""
+    if len(body) < int(os.getenv('RESPONSE_COMPRESSION_MIN_BYTES', 1024)):
+        return body, None
+    if brotli is not None and _accepts(accept_encoding, 'br'):
+        quality = int(os.getenv('RESPONSE_BROTLI_QUALITY', 4))
+        return brotli.compress(body, quality=quality), 'br'
+    if _accepts(accept_encoding, 'gzip'):
+        level = int(os.getenv('RESPONSE_GZIP_LEVEL', 5))
+        return gzip.compress(body, compresslevel=level, mtime=0), 'gzip'
+    return body, None
+
+
+def encode_response(request, content, status_code=200, headers=None) -> Response:
+    """
+    Build a response for `content`, negotiated from the request's headers.
+
+    Args:
+        request: Incoming request (its Accept and Accept-Encoding headers are used)
+        content: Response payload (see dumps_json)
+        status_code: HTTP status code
+        headers: Extra response headers
+
+    Returns:
+        Response: JSON or MessagePack body, possibly compressed
+    """
+    accept = request.headers.get('accept') if request is not None else None
+    accept_encoding = request.headers.get('accept-encoding') if request is not None else None
+
+    if msgpack is not None and any(_accepts(accept, media_type) for media_type in MSGPACK_MEDIA_TYPES):
+        body, media_type = dumps_msgpack(content), MSGPACK_MEDIA_TYPES[0]
+    else:
+        body, media_type = dumps_json(content), JSON_MEDIA_TYPE
+
+    body, encoding = _compress(body, accept_encoding)
+    response_headers = {'Vary': 'Accept, Accept-Encoding'}
+    if encoding:
+        response_headers['Content-Encoding'] = encoding
+    response_headers.update(headers or {})
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=response_headers)
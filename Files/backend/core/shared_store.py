@@ -0,0 +1,279 @@
+"""
+Shared Price Matrix Store
+
+Keeps aligned price and daily-return matrices in memory-mapped files so that
+several uvicorn worker processes can share one copy.
+
+Each entry is a single file keyed by (tickers, start_date, end_date):
+- 8-byte little-endian header length
+- JSON header (tickers, dates, data sources, shape), padded to 64 bytes
+- float64 block of shape (2, days, tickers): prices, then daily returns
+  (returns[0] is NaN so both matrices share the same date axis)
+
+Files are written to a temp file and atomically renamed into place, so
+readers never observe a partial entry. Workers map files read-only; the
+operating system's page cache backs every mapping, so memory stays flat as
+workers are added and a matrix built by one worker is immediately usable by
+the others. Point SHARED_MATRIX_STORE_DIR at /dev/shm to keep entries off disk.
+
+Entries expire with the price cache TTL (CACHE_TTL_HOURS). Publishing an
+entry also sweeps expired files, at most once per PURGE_INTERVAL_SECONDS per
+process, so a store in /dev/shm does not grow with every day's window.
+
+Each worker keeps at most SHARED_MATRIX_MAX_MAPPED (default: 64) entries
+mapped, least recently used first out; the sweep also drops mappings of files
+that expired or that another worker deleted, so their space is released.
+
+Enable with SHARED_MATRIX_STORE=1.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from core.cache_manager import cache_ttl_hours
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+HEADER_ALIGNMENT = 64
+FORMAT_VERSION = 1
+PURGE_INTERVAL_SECONDS = 600  # Minimum seconds between expiry sweeps in one process
+
+
+class SharedMatrixStore:
+    """
+    Memory-mapped store of aligned price/return matrices shared across processes.
+    """
+
+    def __init__(self, store_dir=None, ttl_hours=24, max_mapped=None):
+        """
+        Initialize the store.
+
+        Args:
+            store_dir: Directory for matrix files (default: backend/cache/matrices/)
+            ttl_hours: Time-to-live in hours (default: 24)
+            max_mapped: Entries kept mapped by this process (default:
+                        SHARED_MATRIX_MAX_MAPPED or 64)
+        """
+        if store_dir is None:
+            store_dir = os.path.join(os.path.dirname(__file__), '..', 'cache', 'matrices')
+
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_hours * 3600
+        if max_mapped is None:
+            max_mapped = int(os.getenv('SHARED_MATRIX_MAX_MAPPED', 64))
+        self.max_mapped = max(1, max_mapped)
+        # Per-process mappings, least recently used first: path -> (inode, mtime_ns, entry)
+        self._mapped = OrderedDict()
+        self._mapped_lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _get_path(self, tickers, start_date, end_date):
+        """Get the file path for a ticker set and window."""
+        digest = hashlib.sha1(
+            f"{','.join(tickers)}|{start_date}|{end_date}".encode('utf-8')
+        ).hexdigest()[:24]
+        return self.store_dir / f"{digest}.mat"
+
+    def get(self, tickers, start_date, end_date):
+        """
+        Attach to a stored matrix without copying it.
+
+        Args:
+            tickers: Ticker symbols in column order
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+
+        Returns:
+            dict: {
+                'tickers': [...],
+                'dates': [...],            # YYYY-MM-DD strings
+                'prices': np.memmap,       # (days x tickers), read-only
+                'returns': np.memmap,      # (days - 1 x tickers), read-only
+                'data_sources': {...}
+            }
+            or None if the entry is missing, expired or unreadable
+        """
+        path = self._get_path(tickers, start_date, end_date)
+
+        try:
+            stat = path.stat()
+        except OSError:
+            self._unmap(path)
+            return None
+
+        if time.time() - stat.st_mtime > self.ttl_seconds:
+            self._unmap(path)
+            return None
+
+        with self._mapped_lock:
+            mapped = self._mapped.get(path)
+            if mapped and mapped[0] == stat.st_ino and mapped[1] == stat.st_mtime_ns:
+                self._mapped.move_to_end(path)
+                return mapped[2]
+
+        try:
+            with open(path, 'rb') as f:
+                (header_length,) = struct.unpack('<Q', f.read(8))
+                header = json.loads(f.read(header_length).decode('utf-8'))
+
+            if header.get('version') != FORMAT_VERSION or header.get('tickers') != list(tickers):
+                return None
+
+            days = len(header['dates'])
+            block = np.memmap(
+                path,
+                dtype='<f8',
+                mode='r',
+                offset=header['data_offset'],
+                shape=(2, days, len(tickers))
+            )
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+        entry = {
+            'tickers': header['tickers'],
+            'dates': header['dates'],
+            'prices': block[0],
+            'returns': block[1, 1:],
+            'data_sources': header.get('data_sources', {})
+        }
+        with self._mapped_lock:
+            self._mapped[path] = (stat.st_ino, stat.st_mtime_ns, entry)
+            self._mapped.move_to_end(path)
+            while len(self._mapped) > self.max_mapped:
+                self._mapped.popitem(last=False)
+        return entry
+
+    def _unmap(self, path):
+        """Drop this process's mapping of a file (the memory is released once callers let go)."""
+        with self._mapped_lock:
+            self._mapped.pop(path, None)
+
+    def set(self, tickers, start_date, end_date, dates, prices, data_sources=None):
+        """
+        Store an aligned price matrix and its daily returns.
+
+        Args:
+            tickers: Ticker symbols in column order
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            dates: Row dates as YYYY-MM-DD strings
+            prices: Array-like of shape (days x tickers)
+            data_sources: Optional per-ticker source info to serve with the matrix
+        """
+        prices = np.asarray(prices, dtype='<f8')
+        if prices.ndim != 2 or prices.shape != (len(dates), len(tickers)) or len(dates) < 2:
+            return
+
+        returns = np.full_like(prices, np.nan)
+        np.divide(prices[1:], prices[:-1], out=returns[1:])
+        returns[1:] -= 1.0
+
+        header = {
+            'version': FORMAT_VERSION,
+            'tickers': list(tickers),
+            'start_date': start_date,
+            'end_date': end_date,
+            'dates': list(dates),
+            'data_sources': data_sources or {}
+        }
+        # The data offset is part of the header, so size the header with a
+        # placeholder first and pad it to the alignment boundary
+        header['data_offset'] = 0
+        encoded = json.dumps(header).encode('utf-8')
+        data_offset = -(-(8 + len(encoded) + 16) // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+        header['data_offset'] = data_offset
+        encoded = json.dumps(header).encode('utf-8')
+        encoded += b' ' * (data_offset - 8 - len(encoded))
+
+        path = self._get_path(tickers, start_date, end_date)
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, prefix='.tmp-', suffix='.mat')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(struct.pack('<Q', len(encoded)))
+                    f.write(encoded)
+                    f.write(prices.tobytes())
+                    f.write(returns.tobytes())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning("Failed to write shared matrix for %d ticker(s): %s", len(tickers), e)
+
+        self._maybe_purge()
+
+    def _maybe_purge(self):
+        """Remove expired files and unmap dead entries, at most once per PURGE_INTERVAL_SECONDS."""
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        self.clear_expired()
+        self.prune_mappings()
+
+    def prune_mappings(self):
+        """Unmap entries whose file is gone (e.g. deleted by another worker), replaced or expired."""
+        with self._mapped_lock:
+            paths = list(self._mapped)
+        current_time = time.time()
+        for path in paths:
+            try:
+                stat = path.stat()
+            except OSError:
+                self._unmap(path)
+                continue
+            with self._mapped_lock:
+                mapped = self._mapped.get(path)
+            if mapped is None:
+                continue
+            if (current_time - stat.st_mtime > self.ttl_seconds
+                    or (mapped[0], mapped[1]) != (stat.st_ino, stat.st_mtime_ns)):
+                self._unmap(path)
+
+    def clear_expired(self):
+        """Remove expired matrix files and stale temp files."""
+        current_time = time.time()
+        for matrix_file in self.store_dir.glob("*.mat"):
+            try:
+                if current_time - matrix_file.stat().st_mtime > self.ttl_seconds:
+                    matrix_file.unlink()
+                    self._unmap(matrix_file)
+            except OSError:
+                continue
+
+
+# Global store instance (created on first use when enabled)
+_store = None
+_store_lock = threading.Lock()
+
+
+def shared_store_enabled():
+    """Whether the shared matrix store is switched on via SHARED_MATRIX_STORE."""
+    return os.getenv('SHARED_MATRIX_STORE', '').lower() in ('1', 'true', 'yes')
+
+
+def get_shared_store():
+    """Get the global shared matrix store, or None when it is disabled."""
+    global _store
+    if not shared_store_enabled():
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedMatrixStore(
+                    store_dir=os.getenv('SHARED_MATRIX_STORE_DIR') or None, ttl_hours=cache_ttl_hours()
+                )
+    return _store
@@ -0,0 +1,378 @@
+"""
+SQLite Price Cache Backend
+
+Stores cached closes in a single SQLite database instead of one JSON file per
+ticker and window:
+
+- prices(ticker, source, date, close): one row per ticker, source and trading
+  day, primary key (ticker, source, date). Windows fetched from the same source
+  share rows, so the daily move of the analysis window only adds the new days,
+  while Alpha Vantage (unadjusted) and yfinance (adjusted) closes never mix
+- fetches(ticker, start_date, end_date, source, timestamp): which windows were
+  fetched, from where and when. A window is served from its fetch's source
+  rows within [start_date, end_date]; fetches drive TTL, staleness and source
+  reporting
+
+A write replaces the source's rows inside the fetched window (so dates that
+disappeared upstream go too) and records the fetch, in one transaction, then
+sweeps fetches past the staleness bound (throttled, as for the JSON backend). The
+database runs in WAL mode so worker processes read concurrently with a writer.
+Several tickers, or a fully aligned multi-ticker panel, are read back with a
+single query.
+
+Databases in earlier layouts (rows without a source) are reset on open (the
+cache is refetchable).
+
+Select with CACHE_BACKEND=sqlite.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from core.cache_manager import CacheBackend
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    source TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL NOT NULL,
+    PRIMARY KEY (ticker, source, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS fetches (
+    ticker TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    source TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (ticker, start_date, end_date)
+);
+CREATE INDEX IF NOT EXISTS fetches_timestamp ON fetches (timestamp);
+"""
+
+
+class SqlitePriceCache(CacheBackend):
+    """
+    Price cache backend over a (ticker, source, date) SQLite table.
+    """
+
+    def __init__(self, db_path, ttl_hours=24, max_stale_hours=0):
+        """
+        Open (and create if needed) the price database.
+
+        Args:
+            db_path: Path of the SQLite file
+            ttl_hours: Time-to-live in hours (default: 24)
+            max_stale_hours: Hours past the TTL a fetch is kept and may be
+                             served as stale (default: 0)
+        """
+        self.db_path = str(db_path)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_stale_seconds = max_stale_hours * 3600
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        price_columns = {row[1] for row in conn.execute("PRAGMA table_info(prices)")}
+        legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'window_prices'").fetchone()
+        if legacy or (price_columns and 'source' not in price_columns):
+            # Earlier layouts keyed rows without their source; start over
+            conn.executescript(
+                "DROP TABLE IF EXISTS window_prices; DROP TABLE IF EXISTS prices; DROP TABLE IF EXISTS fetches;"
+            )
+        conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        """Get this thread's connection (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self):
+        return time.time() - self.ttl_seconds
+
+    def _stale_cutoff(self):
+        return time.time() - self.ttl_seconds - self.max_stale_seconds
+
+    def get(self, ticker, start_date, end_date):
+        """
+        Retrieve cached data if available and not expired.
+
+        Returns:
+            tuple: (price_data, original_source) or (None, None) if not in cache or expired
+        """
+        hit = self.get_many([ticker], start_date, end_date).get(ticker)
+        return hit if hit else (None, None)
+
+    def get_many(self, tickers, start_date, end_date):
+        """
+        Look up several tickers for one window with a single query.
+
+        Returns:
+            dict: {ticker: (price_data, original_source)} for cache hits only
+        """
+        return {
+            ticker: (data, source)
+            for ticker, (data, source, _) in self._select(tickers, start_date, end_date, self._cutoff()).items()
+        }
+
+    def get_many_allow_stale(self, tickers, start_date, end_date):
+        """
+        Look up several tickers, including fetches within max_stale_hours past the TTL.
+
+        Tickers without a fetch of the exact window fall back to their newest
+        fetch covering most of it (see _choose_windows), reported stale.
+
+        Returns:
+            dict: {ticker: (price_data, original_source, is_stale)}
+        """
+        fresh_cutoff = self._cutoff()
+        stale_cutoff = self._stale_cutoff()
+        hits = {
+            ticker: (data, source, timestamp < fresh_cutoff)
+            for ticker, (data, source, timestamp)
+            in self._select(tickers, start_date, end_date, stale_cutoff).items()
+        }
+
+        missing = [ticker for ticker in tickers if ticker not in hits]
+        if missing and self.max_stale_seconds > 0:
+            placeholders = ','.join('?' * len(missing))
+            candidates = self._connection().execute(
+                f"SELECT ticker, start_date, end_date FROM fetches "
+                f"WHERE ticker IN ({placeholders}) AND timestamp >= ? ORDER BY timestamp DESC",
+                (*missing, stale_cutoff)
+            ).fetchall()
+            by_window = {}
+            for ticker, window in self._choose_windows(candidates, start_date, end_date).items():
+                by_window.setdefault(window, []).append(ticker)
+            for window, window_tickers in by_window.items():
+                # The fallback fetch picks the source; its rows are read for the requested dates
+                for ticker, (data, source, _) in self._select(
+                    window_tickers, start_date, end_date, stale_cutoff, fetch_window=window
+                ).items():
+                    hits[ticker] = (data, source, True)
+        return hits
+
+    def _select(self, tickers, start_date, end_date, cutoff, fetch_window=None):
+        """
+        Read the prices of every ticker whose fetch of the window is newer than `cutoff`.
+
+        Args:
+            tickers: Tickers to read
+            start_date: First date to return (YYYY-MM-DD)
+            end_date: Last date to return (YYYY-MM-DD)
+            cutoff: Oldest fetch timestamp accepted
+            fetch_window: (start_date, end_date) of the fetch that selects each
+                          ticker's source (default: the requested dates)
+
+        Returns:
+            dict: {ticker: (price_data, original_source, fetch_timestamp)}
+        """
+        if not tickers:
+            return {}
+
+        fetch_start, fetch_end = fetch_window or (start_date, end_date)
+        placeholders = ','.join('?' * len(tickers))
+        rows = self._connection().execute(
+            f"""
+            SELECT p.ticker, p.date, p.close, f.source, f.timestamp
+            FROM fetches f
+            JOIN prices p ON p.ticker = f.ticker AND p.source = f.source
+            WHERE f.start_date = ? AND f.end_date = ? AND f.timestamp >= ?
+              AND f.ticker IN ({placeholders}) AND p.date BETWEEN ? AND ?
+            ORDER BY p.ticker, p.date
+            """,
+            (fetch_start, fetch_end, cutoff, *tickers, start_date, end_date)
+        ).fetchall()
+
+        hits = {}
+        for ticker, date, close, source, timestamp in rows:
+            if ticker not in hits:
+                hits[ticker] = ([], source, timestamp)
+            hits[ticker][0].append({"date": date, "close": close})
+        return hits
+
+    def get_panel(self, tickers, start_date, end_date):
+        """
+        Read an aligned multi-ticker price panel with one query.
+
+        Only dates on which every ticker has a close are kept (the same inner
+        alignment the analysis applies). Every ticker must have a fresh fetch
+        of this window; each is read from its fetch's source.
+
+        Returns:
+            dict: {'dates': [...], 'tickers': [...], 'closes': [[close per ticker], ...],
+                   'sources': {ticker: original_source}}
+            or None if any ticker is missing or expired
+        """
+        if not tickers or len(set(tickers)) != len(tickers):
+            return None
+
+        conn = self._connection()
+        placeholders = ','.join('?' * len(tickers))
+        sources = dict(conn.execute(
+            f"""
+            SELECT ticker, source FROM fetches
+            WHERE start_date = ? AND end_date = ? AND timestamp >= ? AND ticker IN ({placeholders})
+            """,
+            (start_date, end_date, self._cutoff(), *tickers)
+        ).fetchall())
+        if len(sources) != len(tickers):
+            return None
+
+        rows = conn.execute(
+            f"""
+            WITH window_rows AS (
+                SELECT p.date, p.ticker, p.close
+                FROM fetches f
+                JOIN prices p ON p.ticker = f.ticker AND p.source = f.source
+                WHERE f.start_date = ? AND f.end_date = ? AND f.ticker IN ({placeholders})
+                  AND p.date BETWEEN ? AND ?
+            )
+            SELECT date, ticker, close FROM window_rows
+            WHERE date IN (SELECT date FROM window_rows GROUP BY date HAVING COUNT(*) = ?)
+            ORDER BY date
+            """,
+            (start_date, end_date, *tickers, start_date, end_date, len(tickers))
+        ).fetchall()
+
+        column = {ticker: i for i, ticker in enumerate(tickers)}
+        dates = []
+        closes = []
+        for date, ticker, close in rows:
+            if not dates or dates[-1] != date:
+                dates.append(date)
+                closes.append([None] * len(tickers))
+            closes[-1][column[ticker]] = close
+
+        return {'dates': dates, 'tickers': list(tickers), 'closes': closes, 'sources': sources}
+
+    def set(self, ticker, start_date, end_date, data, source='unknown'):
+        """Store one ticker's price data for a window."""
+        self.set_many({ticker: data}, start_date, end_date, source=source)
+
+    def set_many(self, entries, start_date, end_date, source='unknown'):
+        """
+        Replace several tickers' rows for a window and record the fetch, in one transaction.
+
+        Rows of `source` dated within [start_date, end_date] are replaced by the
+        fetched data; rows outside the window and other sources' rows are kept.
+
+        Args:
+            entries: {ticker: [{'date': 'YYYY-MM-DD', 'close': price}, ...]}
+            start_date: Start date (YYYY-MM-DD)
+            end_date: End date (YYYY-MM-DD)
+            source: Original data provider
+        """
+        if not entries:
+            return
+
+        timestamp = time.time()
+        price_rows = [
+            (ticker, source, point['date'], float(point['close']))
+            for ticker, data in entries.items()
+            for point in data
+        ]
+        fetch_rows = [(ticker, start_date, end_date, source, timestamp) for ticker in entries]
+
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "DELETE FROM prices WHERE ticker = ? AND source = ? AND date BETWEEN ? AND ?",
+                    [(ticker, source, start_date, end_date) for ticker in entries]
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO prices (ticker, source, date, close) VALUES (?, ?, ?, ?)",
+                    price_rows
+                )
+                conn.executemany(
+                    "INSERT OR REPLACE INTO fetches (ticker, start_date, end_date, source, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    fetch_rows
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning("Failed to write cache for %d ticker(s): %s", len(entries), e)
+            return
+
+        self._maybe_sweep()
+
+    def clear_expired(self):
+        """Remove fetch records past the staleness bound and the prices no remaining fetch covers."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM fetches WHERE timestamp < ?", (self._stale_cutoff(),))
+            conn.execute(
+                """
+                DELETE FROM prices WHERE NOT EXISTS (
+                    SELECT 1 FROM fetches f
+                    WHERE f.ticker = prices.ticker AND f.source = prices.source
+                      AND prices.date BETWEEN f.start_date AND f.end_date
+                )
+                """
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear_all(self):
+        """Remove all cached data."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM fetches")
+            conn.execute("DELETE FROM prices")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        """
+        Cache statistics.
+
+        Returns:
+            dict: {
+                'entries', 'price_rows', 'total_bytes', 'expired_entries',
+                'oldest_timestamp', 'newest_timestamp',
+                'by_source': {source: {'entries'}}
+            }
+        """
+        conn = self._connection()
+        entries, oldest, newest = conn.execute(
+            "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM fetches"
+        ).fetchone()
+        expired = conn.execute("SELECT COUNT(*) FROM fetches WHERE timestamp < ?", (self._cutoff(),)).fetchone()[0]
+        price_rows = conn.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+        by_source = {
+            source: {'entries': count}
+            for source, count in conn.execute("SELECT source, COUNT(*) FROM fetches GROUP BY source")
+        }
+        try:
+            total_bytes = os.path.getsize(self.db_path)
+        except OSError:
+            total_bytes = 0
+
+        return {
+            'entries': entries,
+            'price_rows': price_rows,
+            'total_bytes': total_bytes,
+            'expired_entries': expired,
+            'oldest_timestamp': oldest,
+            'newest_timestamp': newest,
+            'by_source': by_source
+        }
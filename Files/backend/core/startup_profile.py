@@ -0,0 +1,107 @@
+"""
+Startup Profile Module
+
+Measures how long the backend takes to import and which modules dominate,
+using CPython's -X importtime report in a fresh interpreter (so modules
+already loaded by the caller do not hide their cost).
+
+Usage:
+    python -m core.startup_profile            # profile `import main`
+    python -m core.startup_profile --top 30   # show more modules
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _run_import(module, extra_args=()):
+    """Import `module` in a fresh interpreter rooted at the backend directory."""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    return subprocess.run(
+        [sys.executable, *extra_args, '-c', f'import {module}'],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+
+def measure_import_seconds(module='main', runs=3):
+    """
+    Wall-clock import time of `module` in a fresh interpreter.
+
+    Interpreter start-up is measured separately and subtracted, and the best
+    of `runs` attempts is reported to damp scheduling noise.
+
+    Returns:
+        float: Seconds spent importing the module
+    """
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        _run_import('sys')
+        baseline = time.perf_counter() - started
+
+        started = time.perf_counter()
+        _run_import(module)
+        best = min(best, time.perf_counter() - started - baseline)
+    return max(best, 0.0)
+
+
+def profile_imports(module='main'):
+    """
+    Per-module import times from -X importtime.
+
+    Returns:
+        list: [{'module', 'self_ms', 'cumulative_ms', 'depth'}, ...] sorted by
+              cumulative time, slowest first
+    """
+    result = _run_import(module, extra_args=('-X', 'importtime'))
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000.0,
+            'cumulative_ms': int(cumulative_us) / 1000.0,
+            'depth': (len(name) - len(name.lstrip(' ')) - 1) // 2
+        })
+
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows
+
+
+def format_report(rows, total_seconds, top=20):
+    """Render the slowest imports as a plain-text table."""
+    lines = [
+        f"Import time: {total_seconds * 1000:.0f} ms",
+        "",
+        f"{'cumulative ms':>14} {'self ms':>9}  module",
+    ]
+    for row in rows[:top]:
+        indent = '  ' * row['depth']
+        lines.append(f"{row['cumulative_ms']:>14.1f} {row['self_ms']:>9.1f}  {indent}{row['module']}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile backend import time")
+    parser.add_argument('--module', default='main', help="Module to import (default: main)")
+    parser.add_argument('--top', type=int, default=20, help="Number of modules to list (default: 20)")
+    args = parser.parse_args()
+
+    total = measure_import_seconds(args.module)
+    print(format_report(profile_imports(args.module), total, top=args.top))
+
+
+if __name__ == '__main__':
+    main()
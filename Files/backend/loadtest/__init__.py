@@ -0,0 +1,5 @@
+"""
+End-to-end load testing: fake Yahoo and Alpha Vantage servers
+(fake_upstreams), an app entry point wired to them (app) and a traffic
+generator reporting throughput and latency percentiles per endpoint (run).
+"""
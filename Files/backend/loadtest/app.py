@@ -0,0 +1,17 @@
+"""
+ASGI entry point for load tests: the regular app, with the 'yfinance' source
+replaced by loadtest.yahoo_provider so Yahoo traffic reaches
+YAHOO_CHART_BASE_URL (a fake_upstreams server) instead of Yahoo itself.
+Alpha Vantage needs no replacement; ALPHAVANTAGE_BASE_URL points it at the
+fake server.
+
+    python -m uvicorn loadtest.app:app --workers 2
+"""
+
+from core.data_adapter import register_provider
+
+register_provider('yfinance', 'loadtest.yahoo_provider')
+
+from main import app  # noqa: E402
+
+__all__ = ['app']
@@ -0,0 +1,312 @@
+"""
+Fake Upstream Servers
+
+Local HTTP stand-ins for the two live price APIs, so the backend can be load
+tested without network access or upstream rate limits:
+
+- Yahoo: GET /v8/finance/chart/<SYMBOL>?period1=<unix>&period2=<unix>&interval=1d
+  answers with Yahoo's chart JSON (timestamps, OHLCV quote and adjclose
+  arrays). Unknown symbols get Yahoo's 404 "No data found" error body, and a
+  configurable share of requests gets 429 "Too Many Requests".
+- Alpha Vantage: GET /query?function=TIME_SERIES_DAILY&symbol=...&apikey=...&outputsize=...
+  answers with the TIME_SERIES_DAILY JSON (newest day first; 'compact' is the
+  latest 100 days). Each API key may make `av_calls_per_minute` calls per
+  sliding minute; further calls get the HTTP 200 {"Note": ...} rate-limit
+  reply, exactly like the real free tier. Unknown symbols get the
+  {"Error Message": ...} reply.
+
+Prices are a deterministic random walk per symbol (same symbol, same
+history), covering FAKE_HISTORY_YEARS of business days up to today. Symbols
+starting with UNKNOWN_PREFIX ('ZZ') do not exist.
+
+Every response waits latency_ms plus exponentially distributed jitter
+(mean jitter_ms). GET /__stats on either server returns request counters.
+
+Run standalone (e.g. for a server started by hand):
+    python -m loadtest.fake_upstreams --latency-ms 150 --av-calls-per-minute 5
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+FAKE_HISTORY_YEARS = 5
+UNKNOWN_PREFIX = 'ZZ'
+COMPACT_DATA_POINTS = 100
+AV_RATE_LIMIT_NOTE = (
+    "Thank you for using Alpha Vantage! Our standard API call frequency is 5 calls per minute "
+    "and 500 calls per day. Please visit https://www.alphavantage.co/premium/ if you would like "
+    "to target a higher API call frequency."
+)
+AV_INVALID_SYMBOL = (
+    "Invalid API call. Please retry or visit the documentation "
+    "(https://www.alphavantage.co/documentation/) for TIME_SERIES_DAILY."
+)
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def price_history(symbol):
+    """
+    Deterministic daily history of a symbol.
+
+    Returns:
+        tuple: (dates as np.datetime64[D] array, closes array), oldest first
+    """
+    today = date.today()
+    with _histories_lock:
+        cached = _histories.get(symbol)
+        if cached is not None and cached[0] == today:
+            return cached[1], cached[2]
+
+    days = pd.bdate_range(end=today, periods=FAKE_HISTORY_YEARS * 252).values.astype('datetime64[D]')
+    rng = np.random.default_rng(zlib.crc32(symbol.encode('utf-8')))
+    drift = rng.uniform(-0.0002, 0.0008)
+    volatility = rng.uniform(0.008, 0.03)
+    closes = rng.uniform(20, 400) * np.cumprod(1 + rng.normal(drift, volatility, len(days)))
+
+    with _histories_lock:
+        _histories[symbol] = (today, days, closes)
+    return days, closes
+
+
+class _LatencyModel:
+    """Fixed delay plus exponential jitter, shared by one server's handler threads."""
+
+    def __init__(self, latency_ms, jitter_ms, seed=0):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self):
+        with self._lock:
+            extra = self._rng.expovariate(1.0 / self.jitter) if self.jitter > 0 else 0.0
+        if self.latency + extra > 0:
+            time.sleep(self.latency + extra)
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+    def log_message(self, format, *args):  # Silence per-request logging
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, name):
+        stats = self.server.stats
+        with self.server.stats_lock:
+            stats[name] = stats.get(name, 0) + 1
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/__stats':
+            with self.server.stats_lock:
+                self._send_json(200, dict(self.server.stats))
+            return
+        self._count('requests')
+        self.server.latency.sleep()
+        self.handle_api(url.path, {key: values[-1] for key, values in parse_qs(url.query).items()})
+
+
+class _YahooHandler(_FakeHandler):
+    def handle_api(self, path, params):
+        prefix = '/v8/finance/chart/'
+        if not path.startswith(prefix):
+            self._send_json(404, {'error': 'not found'})
+            return
+        symbol = path[len(prefix):].upper()
+
+        if self.server.error_rate and self.server.rng_random() < self.server.error_rate:
+            self._count('throttled')
+            body = b'Too Many Requests'
+            self.send_response(429)
+            self.send_header('Content-Type', 'text/plain')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if symbol.startswith(UNKNOWN_PREFIX):
+            self._count('unknown_symbol')
+            self._send_json(404, {'chart': {'result': None, 'error': {
+                'code': 'Not Found', 'description': 'No data found, symbol may be delisted'}}})
+            return
+
+        days, closes = price_history(symbol)
+        seconds = (days.astype('datetime64[s]').astype(np.int64) + 13 * 3600 + 1800)  # 09:30 New York
+        period1 = int(params.get('period1', 0))
+        period2 = int(params.get('period2', 2 ** 31))
+        mask = (seconds >= period1) & (seconds < period2)
+        close = np.round(closes[mask], 4).tolist()
+        self._send_json(200, {'chart': {'result': [{
+            'meta': {'currency': 'USD', 'symbol': symbol, 'exchangeName': 'NMS', 'dataGranularity': '1d'},
+            'timestamp': seconds[mask].tolist(),
+            'indicators': {
+                'quote': [{'open': close, 'high': close, 'low': close, 'close': close,
+                           'volume': [1_000_000] * len(close)}],
+                'adjclose': [{'adjclose': close}]
+            }
+        }], 'error': None}})
+
+
+class _AlphaVantageHandler(_FakeHandler):
+    def handle_api(self, path, params):
+        if params.get('function') != 'TIME_SERIES_DAILY':
+            self._send_json(200, {'Error Message': AV_INVALID_SYMBOL})
+            return
+        api_key = params.get('apikey')
+        if not api_key:
+            self._send_json(200, {'Error Message': 'the parameter apikey is invalid or missing.'})
+            return
+        if not self.server.allow_call(api_key):
+            self._count('rate_limit_notes')
+            self._send_json(200, {'Note': AV_RATE_LIMIT_NOTE})
+            return
+
+        symbol = params.get('symbol', '').upper()
+        if not symbol or symbol.startswith(UNKNOWN_PREFIX):
+            self._count('unknown_symbol')
+            self._send_json(200, {'Error Message': AV_INVALID_SYMBOL})
+            return
+
+        days, closes = price_history(symbol)
+        if params.get('outputsize', 'compact') == 'compact':
+            days, closes = days[-COMPACT_DATA_POINTS:], closes[-COMPACT_DATA_POINTS:]
+        series = {}
+        for day, close in zip(days[::-1].astype(str).tolist(), closes[::-1].tolist()):
+            value = f"{close:.4f}"
+            series[day] = {'1. open': value, '2. high': value, '3. low': value,
+                           '4. close': value, '5. volume': '1000000'}
+        self._send_json(200, {
+            'Meta Data': {
+                '1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+                '2. Symbol': symbol,
+                '3. Last Refreshed': str(days[-1]),
+                '4. Output Size': 'Compact' if params.get('outputsize', 'compact') == 'compact' else 'Full size',
+                '5. Time Zone': 'US/Eastern'
+            },
+            'Time Series (Daily)': series
+        })
+
+
+class FakeServer(ThreadingHTTPServer):
+    """
+    Threaded fake upstream bound to 127.0.0.1 (port 0 picks a free port).
+    """
+
+    daemon_threads = True
+    # Clients dropping idle keep-alive connections is routine under load
+    quiet_errors = (ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, handler, port=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 av_calls_per_minute=None, seed=0):
+        super().__init__(('127.0.0.1', port), handler)
+        self.latency = _LatencyModel(latency_ms, jitter_ms, seed)
+        self.error_rate = error_rate
+        self.av_calls_per_minute = av_calls_per_minute
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+        self._rng = random.Random(seed + 1)
+        self._calls = {}  # API key -> deque of call times
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], self.quiet_errors):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def rng_random(self):
+        with self.stats_lock:
+            return self._rng.random()
+
+    def allow_call(self, api_key):
+        """Sliding-minute call budget per API key (always allowed without a limit)."""
+        if not self.av_calls_per_minute:
+            return True
+        now = time.monotonic()
+        with self.stats_lock:
+            calls = self._calls.setdefault(api_key, deque())
+            while calls and now - calls[0] >= 60.0:
+                calls.popleft()
+            if len(calls) >= self.av_calls_per_minute:
+                return False
+            calls.append(now)
+            return True
+
+    def start(self):
+        """Serve on a daemon thread; returns self."""
+        self._thread = threading.Thread(target=self.serve_forever, name='fake-upstream', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def snapshot(self):
+        with self.stats_lock:
+            return dict(self.stats)
+
+
+def start_fake_yahoo(**options):
+    """Start a fake Yahoo chart API (options: see FakeServer)."""
+    return FakeServer(_YahooHandler, **options).start()
+
+
+def start_fake_alpha_vantage(**options):
+    """Start a fake Alpha Vantage API (options: see FakeServer)."""
+    return FakeServer(_AlphaVantageHandler, **options).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Yahoo and Alpha Vantage servers.")
+    parser.add_argument('--yahoo-port', type=int, default=8701)
+    parser.add_argument('--av-port', type=int, default=8702)
+    parser.add_argument('--latency-ms', type=float, default=100.0, help="Fixed delay per response")
+    parser.add_argument('--jitter-ms', type=float, default=50.0, help="Mean of the added exponential delay")
+    parser.add_argument('--yahoo-error-rate', type=float, default=0.0, help="Share of Yahoo requests answered 429")
+    parser.add_argument('--av-calls-per-minute', type=int, default=5,
+                        help="Calls per API key per minute before 'Note' replies (0 = unlimited)")
+    args = parser.parse_args()
+
+    yahoo = start_fake_yahoo(port=args.yahoo_port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                             error_rate=args.yahoo_error_rate)
+    alpha_vantage = start_fake_alpha_vantage(port=args.av_port, latency_ms=args.latency_ms,
+                                             jitter_ms=args.jitter_ms,
+                                             av_calls_per_minute=args.av_calls_per_minute)
+    print("Fake upstreams running; start the backend with:")
+    print(f"  YAHOO_CHART_BASE_URL={yahoo.url} ALPHAVANTAGE_BASE_URL={alpha_vantage.url}/query \\")
+    print("  python -m uvicorn loadtest.app:app")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        yahoo.stop()
+        alpha_vantage.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+Load Test Runner
+
+Drives concurrent traffic through the running API and reports throughput and
+latency percentiles per endpoint.
+
+By default the runner is self-contained:
+1. starts the fake Yahoo and Alpha Vantage servers (loadtest.fake_upstreams)
+   with the requested latency, Yahoo 429 share and Alpha Vantage per-minute
+   call budget;
+2. starts `uvicorn loadtest.app:app` in a subprocess, pointed at the fakes,
+   with an empty price cache, job store and correlation snapshot in a
+   temporary directory;
+3. runs --concurrency closed-loop clients (each sends its next request as
+   soon as the previous one answers) for --warmup + --duration seconds,
+   drawing endpoints from a traffic mix;
+4. prints count, errors, 503s, successful req/s and p50/p95/p99/max
+   latency per endpoint for the measured period (warmup excluded), plus the
+   fakes' request counters.
+
+Each response is classified as ok, rejected (503: the simulation scheduler
+shed the request because its queue was full) or error (any other 4xx/5xx,
+connection failures, or the API's {"error": ...} reply, e.g. a portfolio
+whose tickers all failed).
+
+Usage (from the backend directory):
+    python -m loadtest.run                                  # default mix, 8 clients, 30s
+    python -m loadtest.run --mix compute_heavy --concurrency 16 --workers 2
+    python -m loadtest.run --latency-ms 300 --alpha-vantage-share 0.2 --av-calls-per-minute 5
+    python -m loadtest.run --target http://127.0.0.1:8000   # existing server, no fakes started
+    python -m loadtest.run --json report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import requests
+
+from loadtest.fake_upstreams import UNKNOWN_PREFIX, start_fake_alpha_vantage, start_fake_yahoo
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+POPULAR_STOCKS_PATH = BACKEND_DIR / 'data' / 'popular_stocks.json'
+READY_TIMEOUT_SECONDS = 60
+
+# Endpoint -> share of requests
+MIXES = {
+    'default': {'analyze': 0.35, 'scenarios': 0.15, 'optimize': 0.1, 'backtest': 0.15, 'popular': 0.25},
+    'read_heavy': {'popular': 0.6, 'analyze': 0.25, 'backtest': 0.15},
+    'compute_heavy': {'analyze': 0.4, 'scenarios': 0.3, 'optimize': 0.15, 'backtest': 0.15},
+}
+
+
+def load_universe(size):
+    """The first `size` stock tickers of the curated list (the fakes price any symbol)."""
+    with open(POPULAR_STOCKS_PATH, 'r') as f:
+        stocks = json.load(f)
+    tickers = [stock['ticker'] for stock in stocks if stock.get('assetClass') == 'Stock']
+    return tickers[:size]
+
+
+def _portfolio(rng, universe, unknown_share):
+    tickers = rng.sample(universe, rng.randint(2, min(8, len(universe))))
+    if rng.random() < unknown_share:
+        tickers[-1] = f"{UNKNOWN_PREFIX}{rng.randint(0, 999):03d}"
+    weights = [rng.random() + 0.05 for _ in tickers]
+    total = sum(weights)
+    weights = [round(w / total, 6) for w in weights]
+    weights[-1] = round(1.0 - sum(weights[:-1]), 6)
+    return tickers, weights
+
+
+def build_request(endpoint, rng, universe, options):
+    """
+    One request for an endpoint of the mix.
+
+    Returns:
+        tuple: (method, path, json body or None, headers)
+    """
+    headers = {}
+    if endpoint != 'popular' and rng.random() < options['alpha_vantage_share']:
+        headers = {'X-Data-Source': 'alpha_vantage', 'X-AlphaVantage-Key': f"loadtest-{rng.randint(0, 2)}"}
+    tickers, weights = _portfolio(rng, universe, options['unknown_share'])
+
+    if endpoint == 'popular':
+        return 'GET', f"/popular_stocks?page={rng.randint(1, 3)}&limit=60", None, headers
+    if endpoint == 'analyze':
+        body = {'tickers': tickers, 'weights': weights, 'num_paths': options['num_paths']}
+        return 'POST', '/analyze_portfolio', body, headers
+    if endpoint == 'scenarios':
+        body = {'tickers': tickers, 'weights': weights, 'num_paths': options['num_paths'],
+                'initial_investments': [10000, 50000], 'monthly_contributions': [0, 500]}
+        return 'POST', '/portfolio_scenarios', body, headers
+    if endpoint == 'optimize':
+        return 'POST', '/optimize_portfolio', {'tickers': tickers, 'num_points': 20}, headers
+    if endpoint == 'backtest':
+        weight_sets = [weights, [round(1.0 / len(tickers), 6)] * len(tickers)]
+        body = {'tickers': tickers, 'weights': weight_sets, 'rebalance_frequency': 'monthly',
+                'include_curves': False}
+        return 'POST', '/backtest', body, headers
+    raise ValueError(f"Unknown endpoint '{endpoint}'")
+
+
+def classify(status_code, body):
+    """Outcome of a response: 'ok', 'rejected' (503 backpressure) or 'error'."""
+    if status_code == 503:
+        return 'rejected'
+    if status_code >= 400 or body.lstrip().startswith(b'{"error"'):
+        return 'error'
+    return 'ok'
+
+
+def percentile_report(samples, elapsed_seconds):
+    """
+    Summarize request samples per endpoint.
+
+    Args:
+        samples: Iterable of (endpoint, latency_seconds, outcome) with outcome
+                 'ok', 'rejected' or 'error'
+        elapsed_seconds: Length of the measured period
+
+    Returns:
+        dict: {endpoint: {'count', 'errors', 'rejected', 'rps', 'p50_ms', 'p95_ms',
+                          'p99_ms', 'max_ms'}}, including an 'all' row; latencies
+              cover every response, rps counts only 'ok' ones
+    """
+    grouped = {}
+    for endpoint, latency, outcome in samples:
+        grouped.setdefault(endpoint, []).append((latency, outcome))
+    grouped['all'] = [sample for endpoint in list(grouped) for sample in grouped[endpoint]]
+
+    report = {}
+    for endpoint, rows in grouped.items():
+        if not rows:
+            continue
+        latencies = np.array([latency for latency, _ in rows]) * 1000.0
+        ok = sum(1 for _, outcome in rows if outcome == 'ok')
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        report[endpoint] = {
+            'count': len(rows),
+            'errors': sum(1 for _, outcome in rows if outcome == 'error'),
+            'rejected': sum(1 for _, outcome in rows if outcome == 'rejected'),
+            'rps': ok / elapsed_seconds if elapsed_seconds > 0 else 0.0,
+            'p50_ms': float(p50),
+            'p95_ms': float(p95),
+            'p99_ms': float(p99),
+            'max_ms': float(latencies.max())
+        }
+    return report
+
+
+def format_report(report):
+    """Render a percentile report as a fixed-width table ('all' last)."""
+    lines = [f"{'endpoint':<12}{'count':>8}{'errors':>8}{'503s':>8}{'ok/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for endpoint in sorted(report, key=lambda name: (name == 'all', name)):
+        row = report[endpoint]
+        lines.append(
+            f"{endpoint:<12}{row['count']:>8}{row['errors']:>8}{row['rejected']:>8}{row['rps']:>9.2f}"
+            f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}"
+        )
+    return '\n'.join(lines)
+
+
+def _client(base_url, mix, universe, options, seed, deadline, samples, lock):
+    """Closed-loop client: send, wait for the answer, repeat until the deadline."""
+    rng = random.Random(seed)
+    endpoints, shares = zip(*mix.items())
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        endpoint = rng.choices(endpoints, shares)[0]
+        method, path, body, headers = build_request(endpoint, rng, universe, options)
+        started = time.monotonic()
+        try:
+            response = session.request(method, base_url + path, json=body, headers=headers, timeout=120)
+            outcome = classify(response.status_code, response.content)
+        except requests.exceptions.RequestException:
+            outcome = 'error'
+        with lock:
+            samples.append((started, endpoint, time.monotonic() - started, outcome))
+
+
+def drive_load(base_url, mix, universe, options, concurrency, duration, warmup, seed=0):
+    """
+    Run closed-loop clients against base_url.
+
+    Returns:
+        tuple: (samples started after the warmup as (endpoint, latency, outcome),
+                measured seconds)
+    """
+    samples = []
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    clients = [
+        threading.Thread(target=_client, args=(base_url, mix, universe, options, seed + i, deadline, samples, lock),
+                         daemon=True)
+        for i in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    # Requests still running at the deadline finish late; measure until the last one returned
+    measured = [(endpoint, latency, outcome) for began, endpoint, latency, outcome in samples if began >= measure_from]
+    elapsed = max([duration] + [began + latency - measure_from for began, _, latency, _ in samples
+                                if began >= measure_from])
+    return measured, elapsed
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(port, workers, yahoo_url, alpha_vantage_url, work_dir, av_rate_limit_wait, show_logs):
+    """Start uvicorn on the load-test app with an isolated cache; returns the process."""
+    env = dict(os.environ)
+    env.update({
+        'DATA_SOURCE': 'yfinance',
+        'YAHOO_CHART_BASE_URL': yahoo_url,
+        'ALPHAVANTAGE_BASE_URL': f"{alpha_vantage_url}/query",
+        # The fake enforces the upstream limit; the backend's own limiter must not hide it
+        'ALPHAVANTAGE_CALLS_PER_MINUTE': '100000',
+        'ALPHAVANTAGE_RATE_LIMIT_WAIT': str(av_rate_limit_wait),
+        'CACHE_DIR': str(Path(work_dir) / 'cache'),
+        'JOBS_DIR': str(Path(work_dir) / 'jobs'),
+        'CORRELATION_STORE_PATH': str(Path(work_dir) / 'universe.corr'),
+    })
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    output = None if show_logs else subprocess.DEVNULL
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'loadtest.app:app', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers), '--no-access-log'],
+        cwd=BACKEND_DIR, env=env, stdout=output, stderr=output
+    )
+
+
+def wait_until_ready(base_url, process=None, timeout=READY_TIMEOUT_SECONDS):
+    """Poll GET /popular_stocks until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} during startup")
+        try:
+            if requests.get(f"{base_url}/popular_stocks?limit=1", timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"Server at {base_url} not ready after {timeout}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end load test with fake upstream APIs.")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='default', help="Traffic mix")
+    parser.add_argument('--concurrency', type=int, default=8, help="Closed-loop clients")
+    parser.add_argument('--duration', type=float, default=30.0, help="Measured seconds")
+    parser.add_argument('--warmup', type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument('--universe', type=int, default=40, help="Distinct tickers portfolios draw from")
+    parser.add_argument('--num-paths', type=int, choices=[5000, 10000, 20000], default=5000,
+                        help="Monte Carlo paths per simulation")
+    parser.add_argument('--alpha-vantage-share', type=float, default=0.0,
+                        help="Share of requests sent with X-Data-Source: alpha_vantage")
+    parser.add_argument('--unknown-share', type=float, default=0.05,
+                        help="Share of portfolios holding a ticker the upstreams do not know")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="Also write the report as JSON")
+
+    upstream = parser.add_argument_group('fake upstreams')
+    upstream.add_argument('--latency-ms', type=float, default=100.0, help="Fixed upstream delay")
+    upstream.add_argument('--jitter-ms', type=float, default=50.0, help="Mean extra (exponential) delay")
+    upstream.add_argument('--yahoo-error-rate', type=float, default=0.0, help="Share of Yahoo calls answered 429")
+    upstream.add_argument('--av-calls-per-minute', type=int, default=5,
+                          help="Alpha Vantage calls per key per minute before 'Note' replies (0 = unlimited)")
+    upstream.add_argument('--av-rate-limit-wait', type=float, default=1.0,
+                          help="Backend wait before retrying after a 'Note' (ALPHAVANTAGE_RATE_LIMIT_WAIT)")
+
+    server = parser.add_argument_group('server')
+    server.add_argument('--target', help="Base URL of an already running server (no fakes or server started)")
+    server.add_argument('--workers', type=int, default=1, help="uvicorn workers")
+    server.add_argument('--port', type=int, help="Server port (default: a free port)")
+    server.add_argument('--server-logs', action='store_true', help="Show the server's output")
+    args = parser.parse_args(argv)
+
+    options = {
+        'num_paths': args.num_paths,
+        'alpha_vantage_share': args.alpha_vantage_share,
+        'unknown_share': args.unknown_share
+    }
+    universe = load_universe(args.universe)
+    fakes = []
+    process = None
+
+    with tempfile.TemporaryDirectory(prefix='smartrisk-loadtest-') as work_dir:
+        try:
+            if args.target:
+                base_url = args.target.rstrip('/')
+            else:
+                yahoo = start_fake_yahoo(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                         error_rate=args.yahoo_error_rate, seed=args.seed)
+                alpha_vantage = start_fake_alpha_vantage(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                                         av_calls_per_minute=args.av_calls_per_minute,
+                                                         seed=args.seed)
+                fakes = [('yahoo', yahoo), ('alpha_vantage', alpha_vantage)]
+                port = args.port or _free_port()
+                base_url = f"http://127.0.0.1:{port}"
+                process = start_backend(port, args.workers, yahoo.url, alpha_vantage.url, work_dir,
+                                        args.av_rate_limit_wait, args.server_logs)
+            wait_until_ready(base_url, process)
+
+            print(f"Load test: mix={args.mix} concurrency={args.concurrency} "
+                  f"duration={args.duration:.0f}s (+{args.warmup:.0f}s warmup) against {base_url}")
+            samples, elapsed = drive_load(base_url, MIXES[args.mix], universe, options,
+                                          args.concurrency, args.duration, args.warmup, args.seed)
+        finally:
+            if process is not None:
+                process.terminate()
+                try:
+                    process.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            upstream_stats = {name: fake.snapshot() for name, fake in fakes}
+            for _, fake in fakes:
+                fake.stop()
+
+    report = percentile_report(samples, elapsed)
+    print(format_report(report))
+    for name, stats in upstream_stats.items():
+        print(f"{name} upstream: " + ', '.join(f"{key}={value}" for key, value in sorted(stats.items())))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'elapsed_seconds': elapsed, 'endpoints': report,
+                       'upstreams': upstream_stats}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
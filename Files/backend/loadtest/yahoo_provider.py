@@ -0,0 +1,139 @@
+"""
+Yahoo Chart Source (load tests)
+
+Drop-in replacement for sources.yfinance_source that calls a Yahoo-style
+chart API directly over HTTP. yfinance hard-codes Yahoo's hosts, so this is
+how the backend is pointed at loadtest.fake_upstreams; it is registered over
+the 'yfinance' source by loadtest.app.
+
+Each ticker is one GET <YAHOO_CHART_BASE_URL>/v8/finance/chart/<SYMBOL>
+(the chart API takes one symbol per call), issued concurrently from a pooled
+session. Tickers that fail are retried once, like the yfinance source does.
+
+Configuration (environment):
+- YAHOO_CHART_BASE_URL: Chart API host (default: http://127.0.0.1:8701)
+- YAHOO_CHART_CONCURRENCY: Requests in flight at once (default: 8)
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_BASE_URL = 'http://127.0.0.1:8701'
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _max_concurrency():
+    return max(1, int(os.getenv('YAHOO_CHART_CONCURRENCY', 8)))
+
+
+def _get_session():
+    """Get the shared HTTP session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_max_concurrency(), max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def _to_unix(day: str) -> int:
+    return int(datetime.strptime(day, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp())
+
+
+def parse_chart(payload: dict) -> list:
+    """
+    Convert a chart API response to [{'date', 'close'}, ...] (adjusted closes).
+
+    Returns:
+        list: Price points, empty if the response carries no data
+    """
+    results = (payload.get('chart') or {}).get('result') or []
+    if not results:
+        return []
+    result = results[0]
+    timestamps = result.get('timestamp') or []
+    indicators = result.get('indicators') or {}
+    adjclose = (indicators.get('adjclose') or [{}])[0].get('adjclose')
+    if adjclose is None:
+        adjclose = (indicators.get('quote') or [{}])[0].get('close') or []
+    if not timestamps or len(adjclose) != len(timestamps):
+        return []
+
+    closes = np.array([np.nan if value is None else value for value in adjclose], dtype=float)
+    dates = np.asarray(timestamps, dtype='int64').astype('datetime64[s]').astype('datetime64[D]').astype(str)
+    valid = ~np.isnan(closes)
+    return [
+        {"date": day, "close": close}
+        for day, close in zip(dates[valid].tolist(), closes[valid].tolist())
+    ]
+
+
+def _fetch_one(yahoo_ticker: str, start: str, end: str) -> list:
+    """Fetch one ticker; failures are logged and return no data."""
+    base_url = os.getenv('YAHOO_CHART_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+    try:
+        r = _get_session().get(
+            f"{base_url}/v8/finance/chart/{yahoo_ticker}",
+            params={'period1': _to_unix(start), 'period2': _to_unix(end), 'interval': '1d'},
+            timeout=(5, 30)
+        )
+        if r.status_code == 404:
+            return []
+        r.raise_for_status()
+        return parse_chart(r.json())
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.warning("Error fetching %s from the chart API: %s", yahoo_ticker, e)
+        return []
+
+
+def fetch_prices(tickers: list[str], start: str, end: str) -> dict:
+    """
+    Fetches historical price data from the chart API.
+
+    Args:
+        tickers: A list of stock tickers.
+        start: The start date in YYYY-MM-DD format.
+        end: The end date in YYYY-MM-DD format (exclusive, like yfinance).
+
+    Returns:
+        A dictionary where keys are tickers and values are lists of dicts
+        with 'date' and 'close' price.
+    """
+    if not tickers:
+        return {}
+
+    # Yahoo uses hyphens instead of periods (e.g., 'BRK.B' becomes 'BRK-B')
+    ticker_map = {ticker: ticker.replace('.', '-') for ticker in tickers}
+    yahoo_tickers = list(dict.fromkeys(ticker_map.values()))
+
+    downloaded = {}
+    with ThreadPoolExecutor(max_workers=min(_max_concurrency(), len(yahoo_tickers))) as executor:
+        for attempt in range(2):  # One retry for tickers that failed
+            pending = [ticker for ticker in yahoo_tickers if ticker not in downloaded]
+            if not pending:
+                break
+            for ticker, points in zip(pending, executor.map(lambda t: _fetch_one(t, start, end), pending)):
+                if points:
+                    downloaded[ticker] = points
+
+    prices = {
+        original: downloaded[yahoo] for original, yahoo in ticker_map.items() if yahoo in downloaded
+    }
+    logger.info("Fetched data for %d/%d ticker(s) from the chart API", len(prices), len(tickers))
+    return prices
@@ -17,23 +17,56 @@ Key Features:
 Endpoints:
 - GET /popular_stocks: Paginated list of curated stocks, ETFs, and crypto
 - POST /analyze_portfolio: Comprehensive portfolio analysis with projections
+- POST /jobs/analyze_portfolio, GET /jobs/{id}, GET /jobs/{id}/result: The same
+  analysis as a background job (submit, poll, fetch)
+- POST /portfolio_scenarios: Cash-flow scenario grid priced from one simulation
+- POST /optimize_portfolio: Minimum-variance, maximum-Sharpe and efficient-frontier weights
+- POST /backtest: Historical buy-and-hold / rebalanced backtests of many weight vectors at once
+- GET /correlations: Correlations, clusters and redundant pairs from the nightly universe snapshot
 - GET /search_assets: Live ticker lookup via yfinance
+- GET /metrics: Prometheus metrics (stage timings, cache, providers, simulation throughput)
 """
 
-import yfinance as yf
 import numpy as np
 import pandas as pd
+import asyncio
 import re
+import time
+from itertools import product
 from datetime import datetime, timedelta
-from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
-import uvicorn
 import os
 import json
-from core.monte_carlo import run_monte_carlo_simulation, calculate_portfolio_historical_cagr
+from dotenv import load_dotenv
+
+# Load .env before any core module reads its settings (logging, metrics, cache)
+load_dotenv()
+
+from core.monte_carlo import (
+    DEFAULT_REBALANCE_THRESHOLD,
+    REBALANCE_FREQUENCIES,
+    calculate_portfolio_historical_cagr,
+    run_monte_carlo_simulation,
+    run_scenario_sweep,
+)
+from core.optimizer import optimize_portfolio as compute_optimal_portfolios
+from core.backtest import DEFAULT_ROLLING_WINDOW, run_backtest
 from core.cache_manager import get_cache
+from core.shared_store import get_shared_store
+from core import metrics
+from core.scheduler import SchedulerFull, estimate_cost, get_scheduler
+from core.jobs import get_job_store
+from core.serialization import encode_response
+from core.rolling_stats import get_rolling_stats
+from core.correlation import build_snapshot, get_correlation_store, slice_correlations
+from core.logger import get_logger, new_request_id, request_id_var, sampled_debug
+
+logger = get_logger(__name__)
 
 # Constants - Financial calculations
 RISK_FREE_RATE = 0.04  # 4% annual risk-free rate (US Treasury baseline)
@@ -45,6 +78,9 @@ LOOKBACK_DAYS = 365  # Historical data window for analysis
 # Constants - File paths and configuration
 POPULAR_STOCKS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'popular_stocks.json')
 ALLOWED_PATH_COUNTS = [5000, 10000, 20000]  # Valid Monte Carlo simulation path counts
+MAX_SWEEP_SCENARIOS = 60  # Maximum cash-flow combinations priced by one scenario sweep
+MAX_FRONTIER_POINTS = 200  # Maximum efficient-frontier points per optimization request
+MAX_BACKTEST_STRATEGIES = 500  # Maximum weight vectors evaluated by one backtest request
 
 # Constants - Security
 MAX_PORTFOLIO_SIZE = 50  # Maximum number of assets in a portfolio
@@ -61,6 +97,9 @@ class Portfolio(BaseModel):
         tickers: List of stock ticker symbols (e.g., ['AAPL', 'MSFT', 'GOOG'])
         weights: List of portfolio weights (must sum to 1.0)
         num_paths: Optional Monte Carlo path count (default: 5000)
+        rebalance_frequency: How the simulation restores target weights (default: "daily",
+                             constant weights); see REBALANCE_FREQUENCIES
+        rebalance_threshold: Weight drift that triggers a "threshold" rebalance (default: 0.05)
     """
     tickers: List[str]
     weights: List[float]
@@ -68,6 +107,70 @@ class Portfolio(BaseModel):
     initial_investment: Optional[float] = 10000.0
     monthly_contribution: Optional[float] = 0.0
     contribution_frequency: Optional[str] = "monthly"  # "monthly", "quarterly", "annually"
+    rebalance_frequency: Optional[str] = "daily"  # "daily", "monthly", "quarterly", "annually", "threshold", "never"
+    rebalance_threshold: Optional[float] = DEFAULT_REBALANCE_THRESHOLD
+
+
+class ScenarioSweep(BaseModel):
+    """
+    Scenario sweep input model: one portfolio, many cash-flow variants.
+
+    Every combination of the listed initial investments, contributions and
+    frequencies is priced from a single Monte Carlo simulation.
+
+    Attributes:
+        tickers: List of stock ticker symbols
+        weights: List of portfolio weights (must sum to 1.0)
+        num_paths: Optional Monte Carlo path count (default: 5000)
+        initial_investments: Initial investment amounts to evaluate
+        monthly_contributions: Periodic contribution amounts to evaluate
+        contribution_frequencies: Contribution frequencies to evaluate
+    """
+    tickers: List[str]
+    weights: List[float]
+    num_paths: Optional[int] = None
+    initial_investments: List[float] = [10000.0]
+    monthly_contributions: List[float] = [0.0]
+    contribution_frequencies: List[str] = ["monthly"]
+
+
+class OptimizationRequest(BaseModel):
+    """
+    Weight optimization input model.
+
+    Attributes:
+        tickers: List of stock ticker symbols to allocate across
+        num_points: Number of efficient-frontier portfolios to return (default: 50)
+    """
+    tickers: List[str]
+    num_points: Optional[int] = 50
+
+
+class BacktestRequest(BaseModel):
+    """
+    Historical backtest input model: one ticker set, one or more weight vectors.
+
+    Attributes:
+        tickers: List of stock ticker symbols
+        weights: Weight vectors to evaluate (each matches `tickers` and sums to 1.0)
+        initial_investment: Amount invested on the first day (default: 10000)
+        monthly_contribution: Periodic contribution amount (default: 0)
+        contribution_frequency: "monthly", "quarterly" or "annually" (default: "monthly")
+        rebalance_frequency: "never" (buy and hold, default), "daily", "monthly",
+                             "quarterly", "annually" or "threshold"
+        rebalance_threshold: Weight drift that triggers a "threshold" rebalance (default: 0.05)
+        rolling_window: Trading days per rolling volatility window (default: 63)
+        include_curves: Return equity and rolling volatility series (default: True)
+    """
+    tickers: List[str]
+    weights: List[List[float]]
+    initial_investment: Optional[float] = 10000.0
+    monthly_contribution: Optional[float] = 0.0
+    contribution_frequency: Optional[str] = "monthly"
+    rebalance_frequency: Optional[str] = "never"
+    rebalance_threshold: Optional[float] = DEFAULT_REBALANCE_THRESHOLD
+    rolling_window: Optional[int] = DEFAULT_ROLLING_WINDOW
+    include_curves: Optional[bool] = True
 
 
 # FastAPI App Initialization
@@ -127,13 +230,61 @@ async def add_security_headers(request, call_next):
     return response
 
 
+# Request Metrics Middleware
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """
+    Record per-route request latency when METRICS_ENABLED is set.
+
+    Routes are labelled with their path template (e.g. /search_assets), not
+    the raw URL, so label cardinality stays bounded.
+    """
+    if not metrics.metrics_enabled():
+        return await call_next(request)
+
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get('route')
+    metrics.observe(
+        'smartrisk_http_request_duration_seconds',
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, 'path', 'unmatched'),
+        status=response.status_code
+    )
+    return response
+
+
+# Request ID Middleware
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """
+    Tag the request with an id for log correlation.
+
+    Reuses a well-formed incoming X-Request-ID header (e.g. from a proxy) or
+    generates one, makes it available to every log line written while the
+    request is handled, and echoes it in the response headers.
+    """
+    request_id = new_request_id(request.headers.get("X-Request-ID"))
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
 # ========== Helper Functions ==========
-def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_source='yfinance', api_key=None):
+def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_source='yfinance', api_key=None,
+                                       refresh=False):
     """
     Intelligent data fetching with caching and hybrid source strategy.
 
     Strategy:
-    1. Check cache for all tickers first
+    1. Check cache for all tickers first. Entries past their TTL but within
+       CACHE_MAX_STALE_HOURS are served as they are (flagged "stale") and
+       refreshed on a background thread
     2. For uncached tickers:
        - If Alpha Vantage: fetch first 5, use yfinance for rest (rate limit workaround)
        - If yfinance: fetch all remaining
@@ -144,40 +295,48 @@ def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_so
         tickers: List of ticker symbols
         start_date: Start date (YYYY-MM-DD)
         end_date: End date (YYYY-MM-DD)
-        primary_source: 'yfinance' or 'alpha_vantage'
+        primary_source: Registered data source name ('yfinance', 'alpha_vantage', 'local', ...)
         api_key: Alpha Vantage API key (if needed)
+        refresh: Skip the cache lookup and fetch every ticker (results are still cached)
 
     Returns:
-        dict: {ticker: [{"date": "YYYY-MM-DD", "close": price}, ...]}
+        tuple: ({ticker: [{"date": "YYYY-MM-DD", "close": price}, ...]},
+                {ticker: {"source", "cached"[, "stale"]}})
     """
-    from core.data_adapter import DataProvider
+    from core.data_adapter import DataProvider, is_offline_provider
+
+    # Offline sources (local files) must not reach out to yfinance as a fallback
+    allow_yfinance_fallback = primary_source != 'yfinance' and not is_offline_provider(primary_source)
 
     cache = get_cache()
     prices_data = {}
     source_info = {}  # Track data source for each ticker
     uncached_tickers = []
 
-    # Step 1: Check cache
-    print(f"Checking cache for {len(tickers)} ticker(s)...")
+    # Step 1: Check cache (one lookup for all tickers)
+    logger.debug("Checking cache for %d ticker(s)", len(tickers))
+    cache_hits, stale_tickers = cache.lookup(tickers, start_date, end_date) if not refresh else ({}, set())
     for ticker in tickers:
-        cached_data, original_source = cache.get(ticker, start_date, end_date)
-        if cached_data:
+        if ticker in cache_hits:
+            cached_data, original_source = cache_hits[ticker]
             prices_data[ticker] = cached_data
             # Format source as "OriginalSource (Cached)"
             display_source = f"{original_source} (cached)" if original_source != 'unknown' else "cache"
             source_info[ticker] = {"source": display_source, "cached": True}
-            print(f"  ✓ {ticker}: Found in cache (original source: {original_source})")
+            if ticker in stale_tickers:
+                source_info[ticker]["stale"] = True
+            sampled_debug(logger, "%s: found in cache (original source: %s)", ticker, original_source)
         else:
             uncached_tickers.append(ticker)
-            print(f"  ✗ {ticker}: Not in cache")
+            sampled_debug(logger, "%s: not in cache", ticker)
 
     # Step 2: Fetch uncached data
     if uncached_tickers:
-        print(f"Fetching {len(uncached_tickers)} uncached ticker(s)...")
+        logger.info("Fetching %d uncached ticker(s) from %s", len(uncached_tickers), primary_source)
 
         if primary_source == 'alpha_vantage' and len(uncached_tickers) > 5:
             # Hybrid approach for Alpha Vantage rate limits
-            print(f"⚠ Alpha Vantage rate limit: Fetching first 5 with AV, rest with yfinance")
+            logger.info("Alpha Vantage rate limit: fetching first 5 with Alpha Vantage, rest with yfinance")
 
             # Fetch first 5 with Alpha Vantage
             av_tickers = uncached_tickers[:5]
@@ -189,12 +348,12 @@ def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_so
                 prices_data.update(av_data)
 
                 # Cache Alpha Vantage data
-                for ticker, data in av_data.items():
-                    cache.set(ticker, start_date, end_date, data, source='alpha_vantage')
+                cache.set_many(av_data, start_date, end_date, source='alpha_vantage')
+                for ticker in av_data:
                     source_info[ticker] = {"source": "alpha_vantage", "cached": False}
-                    print(f"  ✓ {ticker}: Fetched from Alpha Vantage & cached")
+                    sampled_debug(logger, "%s: fetched from Alpha Vantage and cached", ticker)
             except Exception as e:
-                print(f"  ✗ Alpha Vantage fetch failed: {e}")
+                logger.warning("Alpha Vantage fetch failed: %s", e)
                 # Add AV tickers back to yfinance fallback list
                 yf_tickers = uncached_tickers
 
@@ -206,12 +365,12 @@ def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_so
                     prices_data.update(yf_data)
 
                     # Cache yfinance data
-                    for ticker, data in yf_data.items():
-                        cache.set(ticker, start_date, end_date, data, source='yfinance')
+                    cache.set_many(yf_data, start_date, end_date, source='yfinance')
+                    for ticker in yf_data:
                         source_info[ticker] = {"source": "yfinance", "cached": False}
-                        print(f"  ✓ {ticker}: Fetched from yfinance & cached")
+                        sampled_debug(logger, "%s: fetched from yfinance and cached", ticker)
                 except Exception as e:
-                    print(f"  ✗ yfinance fallback failed: {e}")
+                    logger.warning("yfinance fallback failed: %s", e)
 
         else:
             # Use primary source for all (no rate limit issues)
@@ -221,47 +380,118 @@ def fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_so
                 prices_data.update(new_data)
 
                 # Cache fetched data
-                for ticker, data in new_data.items():
-                    cache.set(ticker, start_date, end_date, data, source=primary_source)
+                cache.set_many(new_data, start_date, end_date, source=primary_source)
+                for ticker in new_data:
                     source_info[ticker] = {"source": primary_source, "cached": False}
-                    print(f"  ✓ {ticker}: Fetched from {primary_source} & cached")
+                    sampled_debug(logger, "%s: fetched from %s and cached", ticker, primary_source)
             except Exception as e:
-                print(f"  ✗ {primary_source} fetch failed: {e}")
+                logger.warning("%s fetch failed: %s", primary_source, e)
 
                 # Fallback to yfinance if primary failed
-                if primary_source != 'yfinance':
+                if allow_yfinance_fallback:
                     try:
                         yf_provider = DataProvider(source='yfinance')
                         yf_data = yf_provider.get_prices(uncached_tickers, start_date, end_date)
                         prices_data.update(yf_data)
 
-                        for ticker, data in yf_data.items():
-                            cache.set(ticker, start_date, end_date, data, source='yfinance')
+                        cache.set_many(yf_data, start_date, end_date, source='yfinance')
+                        for ticker in yf_data:
                             source_info[ticker] = {"source": "yfinance (fallback)", "cached": False}
-                            print(f"  ✓ {ticker}: Fetched from yfinance (fallback) & cached")
+                            sampled_debug(logger, "%s: fetched from yfinance (fallback) and cached", ticker)
                     except Exception as e2:
-                        print(f"  ✗ yfinance fallback also failed: {e2}")
+                        logger.warning("yfinance fallback also failed: %s", e2)
 
     # Final check: if any tickers are still missing, try fetching them with yfinance
     missing_tickers = [t for t in tickers if t not in prices_data]
-    if missing_tickers and primary_source != 'yfinance':
-        print(f"\n⚠ {len(missing_tickers)} ticker(s) still missing after primary fetch. Attempting yfinance fallback...")
+    if missing_tickers and allow_yfinance_fallback:
+        logger.info("%d ticker(s) still missing after primary fetch, attempting yfinance fallback", len(missing_tickers))
         try:
             yf_provider = DataProvider(source='yfinance')
             yf_data = yf_provider.get_prices(missing_tickers, start_date, end_date)
 
-            for ticker, data in yf_data.items():
-                prices_data[ticker] = data
-                cache.set(ticker, start_date, end_date, data, source='yfinance')
+            prices_data.update(yf_data)
+            cache.set_many(yf_data, start_date, end_date, source='yfinance')
+            for ticker in yf_data:
                 source_info[ticker] = {"source": "yfinance (rate limit fallback)", "cached": False}
-                print(f"  ✓ {ticker}: Fetched from yfinance (rate limit fallback) & cached")
+                sampled_debug(logger, "%s: fetched from yfinance (rate limit fallback) and cached", ticker)
         except Exception as e:
-            print(f"  ✗ yfinance fallback failed: {e}")
+            logger.warning("yfinance fallback failed: %s", e)
+
+    # Step 3: Replace stale entries off the request path (one refresh per entry at a time)
+    if stale_tickers:
+        refreshing = cache.revalidate(
+            [ticker for ticker in tickers if ticker in stale_tickers],
+            start_date,
+            end_date,
+            lambda stale: fetch_prices_with_cache_and_hybrid(
+                stale, start_date, end_date, primary_source, api_key, refresh=True
+            )
+        )
+        logger.info(
+            "Serving %d stale ticker(s) from cache; refreshing %d in the background",
+            len(stale_tickers), len(refreshing)
+        )
 
-    print(f"Final result: {len(prices_data)}/{len(tickers)} tickers successfully fetched")
+    logger.info(
+        "Prices ready for %d/%d ticker(s) (%d from cache)",
+        len(prices_data), len(tickers), len(tickers) - len(uncached_tickers)
+    )
     return prices_data, source_info
 
 
+def submit_simulation(fn, reject_when_full=True, **kwargs):
+    """
+    Queue a simulation on the bounded scheduler.
+
+    Cheaper simulations are queued ahead of expensive ones; the cost is taken
+    from the simulation's own num_paths, num_years and weights arguments.
+
+    Args:
+        fn: Simulation function (run_monte_carlo_simulation or run_scenario_sweep)
+        reject_when_full: Raise SchedulerFull instead of waiting when the queue is full
+        **kwargs: Arguments for `fn`
+
+    Returns:
+        concurrent.futures.Future: Resolves to the simulation result
+
+    Raises:
+        SchedulerFull: If every worker is busy and the queue is full
+    """
+    paths = kwargs.get('num_paths') or int(os.getenv('MC_PATH_COUNT', 5000))
+    cost = estimate_cost(paths, kwargs.get('num_years', 10), len(kwargs['weights']))
+    return get_scheduler().submit(fn, cost=cost, reject_when_full=reject_when_full, **kwargs)
+
+
+def scheduler_busy(error: SchedulerFull) -> HTTPException:
+    """503 response for a simulation rejected by the scheduler."""
+    return HTTPException(
+        status_code=503,
+        detail="The server is busy running other simulations. Please retry shortly.",
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+async def run_simulation(fn, **kwargs):
+    """
+    Run a simulation on the bounded scheduler without blocking the event loop.
+
+    Args:
+        fn: Simulation function (run_monte_carlo_simulation or run_scenario_sweep)
+        **kwargs: Arguments for `fn`
+
+    Returns:
+        The simulation result
+
+    Raises:
+        HTTPException: 503 with a Retry-After header when the scheduler is full
+    """
+    try:
+        future = submit_simulation(fn, **kwargs)
+    except SchedulerFull as e:
+        raise scheduler_busy(e)
+    return await asyncio.wrap_future(future)
+
+
 def validate_portfolio_inputs(tickers: List[str], weights: List[float], initial_investment: float = 10000.0,
                             monthly_contribution: float = 0.0, contribution_frequency: str = "monthly") -> None:
     """
@@ -348,6 +578,248 @@ def validate_portfolio_inputs(tickers: List[str], weights: List[float], initial_
         raise ValueError(f"Contribution frequency must be one of {valid_frequencies}.")
 
 
+def analysis_window():
+    """
+    Price history window used by every analysis: the last LOOKBACK_DAYS days.
+
+    Returns:
+        tuple: (start_date, end_date) as YYYY-MM-DD strings
+    """
+    now = datetime.now()
+    return (now - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')
+
+
+def fetch_aligned_prices(tickers: List[str], weights: List[float], start_date: str, end_date: str,
+                         primary_source: str, api_key: Optional[str]) -> tuple:
+    """
+    Fetch prices ticker by ticker and align them on their common dates.
+
+    Missing tickers are dropped and the remaining weights re-normalized.
+
+    Returns:
+        tuple: (aligned price DataFrame, data_sources, tickers, weights, warning or None)
+
+    Raises:
+        ValueError: If no usable price data could be fetched
+    """
+    # Use intelligent caching and hybrid fetching
+    with metrics.span('fetch_prices'):
+        prices_data, source_info = fetch_prices_with_cache_and_hybrid(
+            tickers=tickers,
+            start_date=start_date,
+            end_date=end_date,
+            primary_source=primary_source,
+            api_key=api_key
+        )
+
+    # Check if we got data for all tickers
+    if not prices_data or len(prices_data) == 0:
+        error_msg = f"Could not download data from any source. Please check ticker symbols ({', '.join(tickers)}) and try again."
+        if primary_source == 'alpha_vantage':
+            error_msg += " Note: Alpha Vantage has a limit of 25 API calls per day. You may have exceeded this limit. Try using Yahoo Finance instead."
+        raise ValueError(error_msg)
+
+    # Handle partial failures - proceed with available tickers
+    warning_message = None
+    adjusted_tickers = list(tickers)
+    adjusted_weights = list(weights)
+
+    if len(prices_data) != len(tickers):
+        missing_tickers = [t for t in tickers if t not in prices_data]
+        available_tickers = [t for t in tickers if t in prices_data]
+
+        # Calculate adjusted weights (normalize remaining weights to sum to 1.0)
+        available_indices = [i for i, t in enumerate(tickers) if t in prices_data]
+        original_weights_sum = sum(weights[i] for i in available_indices)
+
+        if original_weights_sum > 0:
+            adjusted_weights = [weights[i] / original_weights_sum for i in available_indices]
+            adjusted_tickers = available_tickers
+
+            warning_message = f"⚠️ Could not fetch data for: {', '.join(missing_tickers)}. Analysis proceeds with remaining {len(available_tickers)} asset(s). Weights have been adjusted proportionally."
+            if primary_source == 'alpha_vantage':
+                warning_message += " This may be due to Alpha Vantage rate limits or invalid ticker symbols."
+
+            logger.warning(
+                "Missing tickers %s; proceeding with %d ticker(s) %s, adjusted weights %s",
+                missing_tickers, len(available_tickers), available_tickers, adjusted_weights
+            )
+        else:
+            error_msg = f"Could not fetch data for tickers: {', '.join(missing_tickers)}. Cannot proceed with analysis."
+            raise ValueError(error_msg)
+
+    # Convert to DataFrame, keeping columns in ticker order so they line up with the weights
+    with metrics.span('align'):
+        df_list = []
+        for ticker in adjusted_tickers:
+            df = pd.DataFrame(prices_data[ticker])
+            df['date'] = pd.to_datetime(df['date'])
+            df = df.set_index('date')
+            df.rename(columns={'close': ticker}, inplace=True)
+            df_list.append(df)
+
+        data = pd.concat(df_list, axis=1).dropna()
+
+    return data, source_info, adjusted_tickers, adjusted_weights, warning_message
+
+
+def load_portfolio_returns(tickers: List[str], weights: List[float], x_data_source: Optional[str] = None,
+                           x_alphavantage_key: Optional[str] = None) -> dict:
+    """
+    Fetch aligned price history and daily returns for a validated portfolio.
+
+    Resolves the primary data source (request headers first, then environment),
+    fetches prices through the cache/hybrid strategy and handles partial
+    failures by dropping missing tickers and re-normalizing their weights.
+    A fully cached portfolio is read as one aligned panel when the cache
+    backend supports it (CACHE_BACKEND=sqlite).
+
+    Args:
+        tickers: Validated list of ticker symbols
+        weights: Portfolio weights matching `tickers`
+        x_data_source: Optional data source override from the request headers
+        x_alphavantage_key: Optional Alpha Vantage API key from the request headers
+
+    Returns:
+        dict: {
+            'prices': Aligned price DataFrame (rows=dates, cols=adjusted tickers)
+            'returns': Daily returns DataFrame with the same column order
+            'tickers': Tickers with usable data
+            'weights': Weights for those tickers (normalized if some failed)
+            'data_sources': Cache/source info for each ticker
+            'warning': Partial failure message, or None
+            'stats': WindowStats (mean, cov, count) of the daily returns,
+                     maintained incrementally per ticker set (core.rolling_stats)
+        }
+
+    Raises:
+        ValueError: If no usable data could be fetched
+    """
+    # Fetch data with caching and hybrid source strategy
+    start_date, end_date = analysis_window()
+
+    # Determine primary data source
+    if x_data_source:
+        primary_source = x_data_source
+        api_key = x_alphavantage_key
+    else:
+        from core.data_adapter import get_provider_from_env
+        provider = get_provider_from_env()
+        primary_source = provider.source_name
+        api_key = os.getenv("ALPHAVANTAGE_API_KEY") if primary_source == 'alpha_vantage' else None
+
+    logger.debug("Using primary data source: %s", primary_source)
+
+    # Shared matrix store: attach to an aligned matrix another worker already built
+    shared_store = get_shared_store()
+    if shared_store is not None:
+        shared = shared_store.get(tickers, start_date, end_date)
+        if shared is not None:
+            logger.debug("Aligned matrix for %d ticker(s) found in shared store", len(tickers))
+            dates = pd.to_datetime(shared['dates'])
+            source_info = {}
+            for ticker, info in shared['data_sources'].items():
+                source = info.get('source', 'unknown')
+                if not info.get('cached'):
+                    source = f"{source} (cached)"
+                source_info[ticker] = {"source": source, "cached": True}
+            returns = pd.DataFrame(shared['returns'], index=dates[1:], columns=list(tickers), copy=False)
+            return {
+                'prices': pd.DataFrame(shared['prices'], index=dates, columns=list(tickers), copy=False),
+                'returns': returns,
+                'tickers': list(tickers),
+                'weights': list(weights),
+                'data_sources': source_info,
+                'warning': None,
+                'stats': get_rolling_stats().update(tuple(tickers), returns)
+            }
+
+    # Aligned panel: a backend with a panel query (SQLite) answers a fully
+    # cached portfolio in one read, skipping per-ticker lookups and alignment
+    panel = get_cache().get_panel(tickers, start_date, end_date)
+    if panel is not None:
+        dates = pd.DatetimeIndex(pd.to_datetime(panel['dates']), name='date')
+        data = pd.DataFrame(panel['closes'], index=dates, columns=list(tickers), dtype=float)
+        source_info = {
+            ticker: {"source": f"{panel['sources'][ticker]} (cached)", "cached": True} for ticker in tickers
+        }
+        adjusted_tickers, adjusted_weights, warning_message = list(tickers), list(weights), None
+    else:
+        data, source_info, adjusted_tickers, adjusted_weights, warning_message = fetch_aligned_prices(
+            tickers, weights, start_date, end_date, primary_source, api_key
+        )
+
+    # Calculate daily returns
+    with metrics.span('align'):
+        returns = data.pct_change().dropna()
+
+    # Publish complete, fresh matrices so other workers can attach instead of re-fetching
+    # (stale prices are about to be refreshed, so they are not worth sharing)
+    is_fresh = not any(info.get('stale') for info in source_info.values())
+    if shared_store is not None and warning_message is None and is_fresh:
+        shared_store.set(
+            adjusted_tickers,
+            start_date,
+            end_date,
+            data.index.strftime('%Y-%m-%d').tolist(),
+            data.values,
+            data_sources=source_info
+        )
+
+    return {
+        'prices': data,
+        'returns': returns,
+        'tickers': adjusted_tickers,
+        'weights': adjusted_weights,
+        'data_sources': source_info,
+        'warning': warning_message,
+        'stats': get_rolling_stats().update(tuple(adjusted_tickers), returns)
+    }
+
+
+def refresh_correlations() -> Optional[dict]:
+    """
+    Rebuild the universe correlation snapshot (core.correlation).
+
+    Fetches the curated universe (POPULAR_STOCKS_PATH) over the analysis window
+    through the cached, multi-source fetch path using the environment's data
+    source, then correlates, clusters and saves it.
+
+    Only one process rebuilds at a time: if another holds the store's rebuild
+    lock, this call returns without fetching anything.
+
+    Returns:
+        dict: The snapshot written (see build_snapshot), or None if another
+              process is already rebuilding it
+
+    Raises:
+        ValueError: If no price history could be fetched
+    """
+    from core.data_adapter import get_provider_from_env
+
+    with open(POPULAR_STOCKS_PATH, 'r') as f:
+        tickers = list(dict.fromkeys(stock['ticker'] for stock in json.load(f)))
+
+    start_date, end_date = analysis_window()
+    primary_source = get_provider_from_env().source_name
+    api_key = os.getenv("ALPHAVANTAGE_API_KEY") if primary_source == 'alpha_vantage' else None
+
+    store = get_correlation_store()
+    with store.rebuild_lock() as acquired:
+        if not acquired:
+            logger.info("Correlation snapshot rebuild already running in another process; skipped")
+            return None
+        with metrics.span('correlation_refresh'):
+            prices_data, _ = fetch_prices_with_cache_and_hybrid(tickers, start_date, end_date, primary_source, api_key)
+            if not prices_data:
+                raise ValueError("Could not fetch price history for the correlation universe.")
+            snapshot = build_snapshot(prices_data, start_date, end_date)
+            store.save(snapshot)
+
+    logger.info("Correlation snapshot rebuilt: %d of %d asset(s)", len(snapshot['tickers']), len(tickers))
+    return snapshot
+
+
 # ========== API Endpoints ==========
 
 @app.get("/popular_stocks")
@@ -420,50 +892,13 @@ async def get_popular_stocks(
         return {"error": f"An error occurred: {e}"}
 
 
-@app.post("/analyze_portfolio")
-async def analyze_portfolio(
-    portfolio: Portfolio,
-    x_data_source: str = Header(None, alias="X-Data-Source"),
-    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
-):
+def portfolio_input_error(portfolio: Portfolio) -> Optional[str]:
     """
-    Perform comprehensive portfolio risk analysis with Monte Carlo projections.
-
-    This is the primary analysis endpoint that:
-    1. Fetches 1 year of historical price data (with intelligent caching)
-    2. Calculates risk/return metrics for each asset and the portfolio
-    3. Generates Monte Carlo simulations for probabilistic projections
-    4. Provides AI-generated natural language summary
-    5. Handles partial failures gracefully (adjusts weights if some tickers fail)
-
-    Request Body:
-        portfolio: {
-            'tickers': List of ticker symbols (e.g., ['AAPL', 'MSFT'])
-            'weights': List of weights summing to 1.0 (e.g., [0.6, 0.4])
-            'num_paths': Optional Monte Carlo path count (5000/10000/20000)
-        }
-
-    Headers (Optional):
-        X-Data-Source: 'yfinance' or 'alpha_vantage' (default: yfinance)
-        X-AlphaVantage-Key: API key if using Alpha Vantage
+    Validate an analysis request.
 
     Returns:
-        dict: {
-            'individual_metrics': Per-ticker risk/return stats
-            'portfolio_metrics': Aggregated portfolio stats
-            'projections': Monte Carlo percentile projections (P10/P50/P90)
-            'summary': Natural language analysis
-            'data_sources': Cache/source info for each ticker
-            'warning': Optional message for partial failures
-            'tickers': Final ticker list (may differ if failures occurred)
-            'weights': Final weights (normalized if failures occurred)
-        }
-
-    Error Responses:
-        400: Invalid input (weights don't sum to 1.0, etc.)
-        500: Data fetch failures, calculation errors
+        str: Error message for invalid input, or None if the request is valid
     """
-    # Validate inputs
     try:
         validate_portfolio_inputs(
             portfolio.tickers,
@@ -473,126 +908,92 @@ async def analyze_portfolio(
             portfolio.contribution_frequency
         )
     except ValueError as e:
-        return {"error": str(e)}
+        return str(e)
 
-    simulation_paths = portfolio.num_paths
-    if simulation_paths is not None and simulation_paths not in ALLOWED_PATH_COUNTS:
-        return {"error": f"num_paths must be one of {ALLOWED_PATH_COUNTS}. Received {simulation_paths}."}
+    if portfolio.num_paths is not None and portfolio.num_paths not in ALLOWED_PATH_COUNTS:
+        return f"num_paths must be one of {ALLOWED_PATH_COUNTS}. Received {portfolio.num_paths}."
+    if portfolio.rebalance_frequency not in REBALANCE_FREQUENCIES:
+        return f"rebalance_frequency must be one of {REBALANCE_FREQUENCIES}. Received {portfolio.rebalance_frequency}."
+    if not 0 < portfolio.rebalance_threshold < 1:
+        return f"rebalance_threshold must be between 0 and 1. Received {portfolio.rebalance_threshold}."
+    return None
 
-    # Fetch data with caching and hybrid source strategy
-    end_date = datetime.now().strftime('%Y-%m-%d')
-    start_date = (datetime.now() - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
 
-    try:
-        # Determine primary data source
-        if x_data_source:
-            primary_source = x_data_source
-            api_key = x_alphavantage_key
-        else:
-            from core.data_adapter import get_provider_from_env
-            provider = get_provider_from_env()
-            primary_source = provider.source_name
-            api_key = os.getenv("ALPHAVANTAGE_API_KEY") if primary_source == 'alpha_vantage' else None
+def run_portfolio_analysis(portfolio: Portfolio, x_data_source: str = None, x_alphavantage_key: str = None,
+                           reject_when_full: bool = True) -> dict:
+    """
+    Run the full portfolio analysis synchronously (see /analyze_portfolio).
 
-        print(f"Using primary data source: {primary_source}")
+    Shared by the /analyze_portfolio endpoint, which runs it on a worker
+    thread, and background jobs (/jobs/analyze_portfolio).
 
-        # Use intelligent caching and hybrid fetching
-        prices_data, source_info = fetch_prices_with_cache_and_hybrid(
-            tickers=portfolio.tickers,
-            start_date=start_date,
-            end_date=end_date,
-            primary_source=primary_source,
-            api_key=api_key
-        )
+    Args:
+        portfolio: Portfolio request
+        x_data_source: Data source override
+        x_alphavantage_key: Alpha Vantage API key
+        reject_when_full: Raise SchedulerFull instead of waiting for a
+                          simulation slot (background jobs wait)
 
-        # Check if we got data for all tickers
-        if not prices_data or len(prices_data) == 0:
-            error_msg = f"Could not download data from any source. Please check ticker symbols ({', '.join(portfolio.tickers)}) and try again."
-            if primary_source == 'alpha_vantage':
-                error_msg += " Note: Alpha Vantage has a limit of 25 API calls per day. You may have exceeded this limit. Try using Yahoo Finance instead."
-            return {"error": error_msg}
-
-        # Handle partial failures - proceed with available tickers
-        warning_message = None
-        adjusted_tickers = portfolio.tickers
-        adjusted_weights = portfolio.weights
-
-        if len(prices_data) != len(portfolio.tickers):
-            missing_tickers = [t for t in portfolio.tickers if t not in prices_data]
-            available_tickers = [t for t in portfolio.tickers if t in prices_data]
-
-            # Calculate adjusted weights (normalize remaining weights to sum to 1.0)
-            available_indices = [i for i, t in enumerate(portfolio.tickers) if t in prices_data]
-            original_weights_sum = sum(portfolio.weights[i] for i in available_indices)
-
-            if original_weights_sum > 0:
-                adjusted_weights = [portfolio.weights[i] / original_weights_sum for i in available_indices]
-                adjusted_tickers = available_tickers
-
-                warning_message = f"⚠️ Could not fetch data for: {', '.join(missing_tickers)}. Analysis proceeds with remaining {len(available_tickers)} asset(s). Weights have been adjusted proportionally."
-                if primary_source == 'alpha_vantage':
-                    warning_message += " This may be due to Alpha Vantage rate limits or invalid ticker symbols."
-
-                print(f"\n⚠️ WARNING: Missing tickers: {missing_tickers}")
-                print(f"Proceeding with {len(available_tickers)} tickers: {available_tickers}")
-                print(f"Adjusted weights: {adjusted_weights}")
-            else:
-                error_msg = f"Could not fetch data for tickers: {', '.join(missing_tickers)}. Cannot proceed with analysis."
-                return {"error": error_msg}
-
-        # Convert to DataFrame
-        df_list = []
-        for ticker, values in prices_data.items():
-            df = pd.DataFrame(values)
-            df['date'] = pd.to_datetime(df['date'])
-            df = df.set_index('date')
-            df.rename(columns={'close': ticker}, inplace=True)
-            df_list.append(df)
-        
-        data = pd.concat(df_list, axis=1).dropna()
+    Returns:
+        dict: Analysis response, or {'error': message} for invalid input
+              and data failures
 
+    Raises:
+        SchedulerFull: If the simulation scheduler is full and reject_when_full is set
+    """
+    # Validate inputs
+    input_error = portfolio_input_error(portfolio)
+    if input_error:
+        return {"error": input_error}
+    simulation_paths = portfolio.num_paths
+
+    try:
+        portfolio_data = load_portfolio_returns(
+            portfolio.tickers,
+            portfolio.weights,
+            x_data_source=x_data_source,
+            x_alphavantage_key=x_alphavantage_key
+        )
     except ValueError as e:
         return {"error": str(e)}
     except Exception as e:
         return {"error": f"An unexpected error occurred: {e}"}
 
-
-    # Calculate daily returns
-    returns = data.pct_change().dropna()
-
-    # Individual metrics
-    individual_metrics = {}
-    for ticker in adjusted_tickers:
-        if len(adjusted_tickers) > 1:
-            ticker_returns = returns[ticker]
+    data = portfolio_data['prices']
+    returns = portfolio_data['returns']
+    adjusted_tickers = portfolio_data['tickers']
+    adjusted_weights = portfolio_data['weights']
+    source_info = portfolio_data['data_sources']
+    warning_message = portfolio_data['warning']
+
+    stats = portfolio_data['stats']
+
+    with metrics.span('portfolio_metrics'):
+        # Individual metrics from the window's mean vector and covariance diagonal
+        annual_means = stats.mean * DAYS_IN_YEAR
+        annual_volatilities = np.sqrt(np.diag(stats.cov) * DAYS_IN_YEAR)
+        individual_metrics = {}
+        for i, ticker in enumerate(adjusted_tickers):
+            expected_return = float(annual_means[i])
+            volatility = float(annual_volatilities[i])
+            sharpe_ratio = (expected_return - RISK_FREE_RATE) / volatility if volatility != 0 else 0
+            individual_metrics[ticker] = {
+                "expected_annual_return": expected_return,
+                "annual_volatility": volatility,
+                "sharpe_ratio": sharpe_ratio
+            }
+
+        # Portfolio metrics
+        if len(adjusted_tickers) == 1:
+            # Single stock: use the stock's metrics directly
+            portfolio_return = individual_metrics[adjusted_tickers[0]]["expected_annual_return"]
+            portfolio_volatility = individual_metrics[adjusted_tickers[0]]["annual_volatility"]
         else:
-            # Single stock: returns is already a Series for that one stock
-            ticker_returns = returns[adjusted_tickers[0]]
-
-        expected_return = float(ticker_returns.mean() * DAYS_IN_YEAR)
-        volatility = float(ticker_returns.std() * np.sqrt(DAYS_IN_YEAR))
-        sharpe_ratio = (expected_return - RISK_FREE_RATE) / volatility if volatility != 0 else 0
-        individual_metrics[ticker] = {
-            "expected_annual_return": expected_return,
-            "annual_volatility": volatility,
-            "sharpe_ratio": sharpe_ratio
-        }
-
-    # Portfolio metrics
-    if len(adjusted_tickers) == 1:
-        # Single stock: use the stock's metrics directly
-        portfolio_return = individual_metrics[adjusted_tickers[0]]["expected_annual_return"]
-        portfolio_volatility = individual_metrics[adjusted_tickers[0]]["annual_volatility"]
-    else:
-        # Multiple stocks: calculate weighted portfolio metrics
-        portfolio_return = np.sum(returns.mean() * adjusted_weights) * DAYS_IN_YEAR
-        portfolio_volatility = np.sqrt(
-            np.dot(
-                np.array(adjusted_weights).T,
-                np.dot(returns.cov() * DAYS_IN_YEAR, adjusted_weights)
-            )
-        )
-    portfolio_sharpe_ratio = (portfolio_return - RISK_FREE_RATE) / portfolio_volatility if portfolio_volatility != 0 else 0
+            # Multiple stocks: calculate weighted portfolio metrics
+            weights_array = np.array(adjusted_weights)
+            portfolio_return = float(annual_means @ weights_array)
+            portfolio_volatility = float(np.sqrt(weights_array @ (stats.cov * DAYS_IN_YEAR) @ weights_array))
+        portfolio_sharpe_ratio = (portfolio_return - RISK_FREE_RATE) / portfolio_volatility if portfolio_volatility != 0 else 0
 
     # Generate summary
     portfolio_metrics_dict = {
@@ -614,22 +1015,31 @@ async def analyze_portfolio(
     historical_cagr = calculate_portfolio_historical_cagr(data, adjusted_weights)
 
     # Run Monte Carlo simulation for probabilistic projections
-    mc_results = run_monte_carlo_simulation(
-        daily_returns=returns,
-        weights=adjusted_weights,
-        num_years=10,
-        initial_value=portfolio.initial_investment,
-        periodic_contribution=portfolio.monthly_contribution,
-        contribution_frequency=portfolio.contribution_frequency,
-        num_paths=simulation_paths
-    )
+    with metrics.span('monte_carlo'):
+        mc_results = submit_simulation(
+            run_monte_carlo_simulation,
+            reject_when_full=reject_when_full,
+            daily_returns=returns,
+            weights=adjusted_weights,
+            moments=(stats.mean, stats.cov),
+            num_years=10,
+            initial_value=portfolio.initial_investment,
+            periodic_contribution=portfolio.monthly_contribution,
+            contribution_frequency=portfolio.contribution_frequency,
+            num_paths=simulation_paths,
+            rebalance_frequency=portfolio.rebalance_frequency,
+            rebalance_threshold=portfolio.rebalance_threshold
+        ).result()
 
     # Build projections object with CAGR and Monte Carlo results
     projections = {
         "cagr": historical_cagr,
         "years": mc_results['years'],
-        "percentiles": mc_results['percentiles']
+        "percentiles": mc_results['percentiles'],
+        "risk_metrics": mc_results['risk_metrics']
     }
+    if 'rebalancing' in mc_results:
+        projections["rebalancing"] = mc_results['rebalancing']
 
     response = {
         "individual_metrics": individual_metrics,
@@ -656,6 +1066,585 @@ async def analyze_portfolio(
 
     return response
 
+
+@app.post("/analyze_portfolio")
+async def analyze_portfolio(
+    http_request: Request,
+    portfolio: Portfolio,
+    x_data_source: str = Header(None, alias="X-Data-Source"),
+    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
+):
+    """
+    Perform comprehensive portfolio risk analysis with Monte Carlo projections.
+
+    This is the primary analysis endpoint that:
+    1. Fetches 1 year of historical price data (with intelligent caching)
+    2. Calculates risk/return metrics for each asset and the portfolio
+    3. Generates Monte Carlo simulations for probabilistic projections
+    4. Provides AI-generated natural language summary
+    5. Handles partial failures gracefully (adjusts weights if some tickers fail)
+
+    Request Body:
+        portfolio: {
+            'tickers': List of ticker symbols (e.g., ['AAPL', 'MSFT'])
+            'weights': List of weights summing to 1.0 (e.g., [0.6, 0.4])
+            'num_paths': Optional Monte Carlo path count (5000/10000/20000)
+            'rebalance_frequency': Optional 'daily' (default, constant weights),
+                                   'monthly', 'quarterly', 'annually', 'threshold' or 'never'
+            'rebalance_threshold': Optional drift for 'threshold' rebalancing (default: 0.05)
+        }
+
+    Headers (Optional):
+        X-Data-Source: 'yfinance', 'alpha_vantage' or 'local' (default: yfinance)
+        X-AlphaVantage-Key: API key if using Alpha Vantage
+
+    Returns:
+        dict: {
+            'individual_metrics': Per-ticker risk/return stats
+            'portfolio_metrics': Aggregated portfolio stats
+            'projections': Monte Carlo percentile projections (P10/P50/P90),
+                           simulated risk metrics (VaR, CVaR, max drawdown) and,
+                           when rebalancing is simulated, rebalance statistics
+            'summary': Natural language analysis
+            'data_sources': Cache/source info for each ticker ("stale": true when an
+                            expired cache entry was served while it is refreshed)
+            'warning': Optional message for partial failures
+            'tickers': Final ticker list (may differ if failures occurred)
+            'weights': Final weights (normalized if failures occurred)
+        }
+
+    Error Responses:
+        400: Invalid input (weights don't sum to 1.0, etc.)
+        500: Data fetch failures, calculation errors
+        503: Simulation capacity exhausted (retry after the Retry-After seconds)
+    """
+    try:
+        result = await run_in_threadpool(run_portfolio_analysis, portfolio, x_data_source, x_alphavantage_key)
+    except SchedulerFull as e:
+        raise scheduler_busy(e)
+    return encode_response(http_request, result)
+
+
+@app.post("/jobs/analyze_portfolio")
+async def submit_analysis_job(
+    portfolio: Portfolio,
+    x_data_source: str = Header(None, alias="X-Data-Source"),
+    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
+):
+    """
+    Start /analyze_portfolio as a background job and return its id immediately.
+
+    Use this when the analysis may outlive proxy timeouts (e.g. Alpha Vantage
+    with many tickers). Submitting the same portfolio and data source again
+    returns the existing job while it is running or its result is retained.
+    The Alpha Vantage key is used to run the job but never stored.
+
+    Request Body / Headers: Same as /analyze_portfolio
+
+    Returns:
+        dict: {
+            'job_id': Id for the status and result endpoints
+            'status': 'queued', 'running', 'succeeded' or 'failed'
+            'status_url': GET for the job status
+            'result_url': GET for the analysis once the job succeeded
+        }
+    """
+    input_error = portfolio_input_error(portfolio)
+    if input_error:
+        return {"error": input_error}
+
+    # Dedupe key: the request and the analysis date (the price window moves daily)
+    payload = {
+        "portfolio": portfolio.model_dump(),
+        "data_source": x_data_source or "default",
+        "as_of": datetime.now().strftime('%Y-%m-%d')
+    }
+    job = get_job_store().submit(
+        'analyze_portfolio',
+        payload,
+        lambda: run_portfolio_analysis(portfolio, x_data_source, x_alphavantage_key, reject_when_full=False)
+    )
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "status_url": f"/jobs/{job['id']}",
+        "result_url": f"/jobs/{job['id']}/result"
+    }
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """
+    Get the status of a background job.
+
+    Returns:
+        dict: {'id', 'kind', 'status', 'submitted_at', 'started_at',
+               'finished_at', 'expires_at', 'error'} (times are Unix seconds)
+
+    Error Responses:
+        404: Unknown or expired job
+    """
+    job = get_job_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, http_request: Request):
+    """
+    Get the result of a finished background job.
+
+    Returns:
+        dict: The /analyze_portfolio response for a succeeded job, or
+              {'error': message} for a failed one
+
+    Error Responses:
+        404: Unknown or expired job
+        409: Job has not finished yet (poll /jobs/{job_id})
+    """
+    job = get_job_store().get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    if job['status'] == 'failed':
+        return {"error": job['error']}
+    if job['status'] != 'succeeded':
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; poll /jobs/{job_id} until it finishes.")
+    return encode_response(http_request, job['result'])
+
+
+@app.post("/portfolio_scenarios")
+async def portfolio_scenarios(
+    http_request: Request,
+    sweep: ScenarioSweep,
+    x_data_source: str = Header(None, alias="X-Data-Source"),
+    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
+):
+    """
+    Project a grid of cash-flow scenarios for one portfolio.
+
+    Terminal value along a simulated path is linear in the initial investment
+    and the contributions, so the data fetch and the simulation run once and
+    every (initial, contribution, frequency) combination is priced from the
+    same paths.
+
+    Request Body:
+        sweep: {
+            'tickers': List of ticker symbols
+            'weights': List of weights summing to 1.0
+            'num_paths': Optional Monte Carlo path count (5000/10000/20000)
+            'initial_investments': e.g. [5000, 10000]
+            'monthly_contributions': e.g. [0, 250, 500]
+            'contribution_frequencies': e.g. ['monthly', 'quarterly']
+        }
+
+    Returns:
+        dict: {
+            'years': [1, ..., 10]
+            'scenarios': List of {initial_investment, periodic_contribution,
+                                  contribution_frequency, percentiles}
+            'tickers', 'weights', 'data_sources', 'warning' (as in /analyze_portfolio)
+        }
+    """
+    combinations = list(product(
+        dict.fromkeys(sweep.initial_investments),
+        dict.fromkeys(sweep.monthly_contributions),
+        dict.fromkeys(sweep.contribution_frequencies)
+    ))
+    if not combinations:
+        return {"error": "At least one initial investment, contribution and frequency is required."}
+    if len(combinations) > MAX_SWEEP_SCENARIOS:
+        return {"error": f"Too many scenarios ({len(combinations)}). Maximum {MAX_SWEEP_SCENARIOS} combinations allowed."}
+
+    try:
+        for initial_investment, contribution, frequency in combinations:
+            validate_portfolio_inputs(sweep.tickers, sweep.weights, initial_investment, contribution, frequency)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    if sweep.num_paths is not None and sweep.num_paths not in ALLOWED_PATH_COUNTS:
+        return {"error": f"num_paths must be one of {ALLOWED_PATH_COUNTS}. Received {sweep.num_paths}."}
+
+    try:
+        portfolio_data = await run_in_threadpool(
+            load_portfolio_returns,
+            sweep.tickers,
+            sweep.weights,
+            x_data_source=x_data_source,
+            x_alphavantage_key=x_alphavantage_key
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e}"}
+
+    sweep_results = await run_simulation(
+        run_scenario_sweep,
+        daily_returns=portfolio_data['returns'],
+        weights=portfolio_data['weights'],
+        moments=(portfolio_data['stats'].mean, portfolio_data['stats'].cov),
+        scenarios=[
+            {
+                "initial_value": initial_investment,
+                "periodic_contribution": contribution,
+                "contribution_frequency": frequency
+            }
+            for initial_investment, contribution, frequency in combinations
+        ],
+        num_years=10,
+        num_paths=sweep.num_paths
+    )
+
+    response = {
+        "years": sweep_results['years'],
+        "scenarios": [
+            {
+                "initial_investment": scenario['initial_value'],
+                "periodic_contribution": scenario['periodic_contribution'],
+                "contribution_frequency": scenario['contribution_frequency'],
+                "percentiles": scenario['percentiles']
+            }
+            for scenario in sweep_results['scenarios']
+        ],
+        "tickers": portfolio_data['tickers'],
+        "weights": portfolio_data['weights'],
+        "data_sources": portfolio_data['data_sources']
+    }
+
+    if portfolio_data['warning']:
+        response["warning"] = portfolio_data['warning']
+
+    return encode_response(http_request, response)
+
+@app.post("/optimize_portfolio")
+async def optimize_portfolio(
+    http_request: Request,
+    request: OptimizationRequest,
+    x_data_source: str = Header(None, alias="X-Data-Source"),
+    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
+):
+    """
+    Suggest long-only allocations for a set of tickers.
+
+    Uses the same 1-year mean/covariance estimates as /analyze_portfolio to
+    compute the minimum-variance portfolio, the maximum-Sharpe portfolio and a
+    sampled efficient frontier.
+
+    Request Body:
+        request: {
+            'tickers': List of ticker symbols (up to MAX_PORTFOLIO_SIZE)
+            'num_points': Optional number of frontier points (default: 50, max: 200)
+        }
+
+    Returns:
+        dict: {
+            'tickers': Tickers with usable data (weights follow this order)
+            'min_variance': {weights, expected_annual_return, annual_volatility, sharpe_ratio}
+            'max_sharpe': {...same fields...}
+            'frontier': List of portfolios sorted by increasing volatility
+            'data_sources': Cache/source info for each ticker
+            'warning': Optional message for partial failures
+        }
+    """
+    tickers = request.tickers or []
+    equal_weights = [1.0 / len(tickers)] * len(tickers) if tickers else []
+
+    try:
+        validate_portfolio_inputs(tickers, equal_weights)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    num_points = request.num_points if request.num_points is not None else 50
+    if num_points < 2 or num_points > MAX_FRONTIER_POINTS:
+        return {"error": f"num_points must be between 2 and {MAX_FRONTIER_POINTS}."}
+
+    try:
+        portfolio_data = await run_in_threadpool(
+            load_portfolio_returns,
+            tickers,
+            equal_weights,
+            x_data_source=x_data_source,
+            x_alphavantage_key=x_alphavantage_key
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e}"}
+
+    returns = portfolio_data['returns']
+    if len(returns) < 2:
+        return {"error": "Not enough overlapping price history to estimate covariances."}
+
+    cache_key = (
+        tuple(portfolio_data['tickers']),
+        returns.index[0].strftime('%Y-%m-%d'),
+        returns.index[-1].strftime('%Y-%m-%d')
+    )
+    response = await run_in_threadpool(
+        compute_optimal_portfolios,
+        returns,
+        risk_free_rate=RISK_FREE_RATE,
+        num_points=num_points,
+        cache_key=cache_key,
+        moments=(portfolio_data['stats'].mean, portfolio_data['stats'].cov)
+    )
+    response["data_sources"] = portfolio_data['data_sources']
+
+    if portfolio_data['warning']:
+        response["warning"] = portfolio_data['warning']
+
+    return encode_response(http_request, response)
+
+def backtest_input_error(request: BacktestRequest) -> Optional[str]:
+    """
+    Validate a backtest request.
+
+    Returns:
+        str: Error message for invalid input, or None if the request is valid
+    """
+    if not request.weights:
+        return "At least one weight vector is required."
+    if len(request.weights) > MAX_BACKTEST_STRATEGIES:
+        return f"Too many weight vectors. Maximum allowed: {MAX_BACKTEST_STRATEGIES}"
+
+    for i, weights in enumerate(request.weights):
+        try:
+            validate_portfolio_inputs(
+                request.tickers,
+                weights,
+                request.initial_investment,
+                request.monthly_contribution,
+                request.contribution_frequency
+            )
+        except ValueError as e:
+            return f"Weight vector {i + 1}: {e}" if len(request.weights) > 1 else str(e)
+
+    if request.rebalance_frequency not in REBALANCE_FREQUENCIES:
+        return f"rebalance_frequency must be one of {REBALANCE_FREQUENCIES}. Received {request.rebalance_frequency}."
+    if not 0 < request.rebalance_threshold < 1:
+        return f"rebalance_threshold must be between 0 and 1. Received {request.rebalance_threshold}."
+    if request.rolling_window < 2 or request.rolling_window > DAYS_IN_YEAR:
+        return f"rolling_window must be between 2 and {DAYS_IN_YEAR} trading days."
+    return None
+
+
+def run_backtest_analysis(request: BacktestRequest, x_data_source: str = None,
+                          x_alphavantage_key: str = None) -> dict:
+    """
+    Backtest every weight vector of a validated request over the analysis window.
+
+    Fetches the aligned price history once (same window and sources as
+    /analyze_portfolio). Tickers without data are dropped and each weight
+    vector is re-normalized over the remaining ones.
+
+    Returns:
+        dict: Response for /backtest, or {'error': ...}
+    """
+    try:
+        portfolio_data = load_portfolio_returns(
+            request.tickers,
+            request.weights[0],
+            x_data_source=x_data_source,
+            x_alphavantage_key=x_alphavantage_key
+        )
+    except ValueError as e:
+        return {"error": str(e)}
+    except Exception as e:
+        return {"error": f"An unexpected error occurred: {e}"}
+
+    prices = portfolio_data['prices']
+    if len(prices) < 2:
+        return {"error": "Not enough overlapping price history to run a backtest."}
+
+    # Keep the columns of tickers with data, in the price panel's order
+    columns = [request.tickers.index(ticker) for ticker in portfolio_data['tickers']]
+    weight_sets = np.asarray(request.weights, dtype=np.float64)[:, columns]
+    totals = weight_sets.sum(axis=1)
+    if np.any(totals <= 0):
+        empty = int(np.flatnonzero(totals <= 0)[0]) + 1
+        return {"error": f"Weight vector {empty} has no weight on tickers with available data."}
+    weight_sets /= totals[:, None]
+
+    result = run_backtest(
+        prices,
+        weight_sets,
+        initial_value=request.initial_investment,
+        periodic_contribution=request.monthly_contribution,
+        contribution_frequency=request.contribution_frequency,
+        rebalance_frequency=request.rebalance_frequency,
+        rebalance_threshold=request.rebalance_threshold,
+        rolling_window=request.rolling_window
+    )
+
+    equity = result['equity']
+    strategies = []
+    for i in range(len(weight_sets)):
+        strategy = {
+            "weights": np.round(weight_sets[i], 6),
+            "final_value": round(float(equity[-1, i]), 2),
+            "cagr": float(result['cagr'][i]),
+            "max_drawdown": float(result['max_drawdown'][i]),
+            "annual_volatility": float(result['annual_volatility'][i]),
+            "rebalance_count": int(result['rebalance_counts'][i])
+        }
+        if request.include_curves:
+            strategy["equity_curve"] = np.round(equity[:, i], 2)
+            strategy["rolling_volatility"] = np.round(result['rolling_volatility'][:, i], 6)
+        strategies.append(strategy)
+
+    dates = prices.index.strftime('%Y-%m-%d').tolist()
+    response = {
+        "tickers": portfolio_data['tickers'],
+        "start_date": dates[0],
+        "end_date": dates[-1],
+        "total_contributed": round(float(result['contributed'][-1]), 2),
+        "settings": {
+            "initial_investment": request.initial_investment,
+            "periodic_contribution": request.monthly_contribution,
+            "contribution_frequency": request.contribution_frequency,
+            "rebalance_frequency": request.rebalance_frequency,
+            "rebalance_threshold": request.rebalance_threshold,
+            "rolling_window": request.rolling_window
+        },
+        "strategies": strategies,
+        "data_sources": portfolio_data['data_sources']
+    }
+    if request.include_curves:
+        response["dates"] = dates
+        response["contributed"] = np.round(result['contributed'], 2)
+        response["rolling_volatility_dates"] = dates[request.rolling_window:]
+
+    if portfolio_data['warning']:
+        response["warning"] = portfolio_data['warning']
+    return response
+
+
+@app.post("/backtest")
+async def backtest(
+    http_request: Request,
+    request: BacktestRequest,
+    x_data_source: str = Header(None, alias="X-Data-Source"),
+    x_alphavantage_key: str = Header(None, alias="X-AlphaVantage-Key")
+):
+    """
+    Replay one or more allocations over the last year of prices.
+
+    All weight vectors share one price fetch and are evaluated together
+    (core.backtest), so comparing hundreds of allocations costs about as
+    much as backtesting one.
+
+    Request Body:
+        request: {
+            'tickers': List of ticker symbols (up to MAX_PORTFOLIO_SIZE)
+            'weights': List of weight vectors (up to MAX_BACKTEST_STRATEGIES), each summing to 1.0
+            'initial_investment', 'monthly_contribution', 'contribution_frequency': As for /analyze_portfolio
+            'rebalance_frequency': 'never' (buy and hold, default), 'daily', 'monthly',
+                                   'quarterly', 'annually' or 'threshold'
+            'rebalance_threshold': Optional drift for 'threshold' rebalancing (default: 0.05)
+            'rolling_window': Trading days per rolling volatility window (default: 63)
+            'include_curves': Return the daily series (default: true)
+        }
+
+    Returns:
+        dict: {
+            'tickers': Tickers with usable data (weights follow this order)
+            'start_date', 'end_date': Backtest window
+            'total_contributed': Capital invested by the last day
+            'strategies': One entry per weight vector: {weights, final_value, cagr,
+                          max_drawdown, annual_volatility, rebalance_count,
+                          equity_curve, rolling_volatility}
+            'dates', 'contributed', 'rolling_volatility_dates': Series axes (with include_curves)
+            'data_sources': Cache/source info for each ticker
+            'warning': Optional message for partial failures
+        }
+
+    CAGR, drawdown and volatility are time-weighted (contributions are not counted as returns).
+    """
+    error = backtest_input_error(request)
+    if error:
+        return {"error": error}
+
+    result = await run_in_threadpool(run_backtest_analysis, request, x_data_source, x_alphavantage_key)
+    if "error" in result:
+        return result
+    return encode_response(http_request, result)
+
+
+@app.get("/correlations")
+async def get_correlations(http_request: Request, tickers: Optional[str] = None):
+    """
+    Correlations, clustering and redundant pairs for a set of curated assets.
+
+    Served from the precomputed universe snapshot (core.correlation): the
+    requested tickers are sliced out of the stored matrix and returned in the
+    universe's hierarchical-clustering order, so no prices are fetched per
+    request. A snapshot older than CORRELATION_MAX_AGE_HOURS is still served
+    while a rebuild runs in the background.
+
+    Query Parameters:
+        tickers: Comma-separated tickers (e.g., 'AAPL,MSFT,QQQ'); omit for the whole universe
+
+    Returns:
+        dict: {
+            'tickers': Requested tickers found in the universe, in clustered order
+            'correlations': Correlation matrix rows in that order (null where the
+                            assets share fewer than CORRELATION_MIN_OVERLAP trading days)
+            'clusters': Groups of requested tickers that move together
+            'redundant_pairs': Pairs correlated at or above CORRELATION_REDUNDANCY_THRESHOLD
+            'missing': Requested tickers outside the curated universe
+            'as_of': {'start_date', 'end_date'} of the return window
+            'built_at': Snapshot build time (Unix seconds)
+            'stale': True if a newer snapshot is being built
+        }
+    """
+    requested = None
+    if tickers is not None:
+        requested = [t.strip().upper() for t in tickers.split(',') if t.strip()]
+        if not requested:
+            return {"error": "Provide at least one ticker."}
+        if len(requested) > MAX_PORTFOLIO_SIZE:
+            return {"error": f"Too many tickers. Maximum allowed: {MAX_PORTFOLIO_SIZE}"}
+        invalid = [t for t in requested if not TICKER_PATTERN.match(t)]
+        if invalid:
+            return {"error": f"Invalid ticker format: {', '.join(invalid)}"}
+
+    store = get_correlation_store()
+    entry = store.load()
+    if entry is None:
+        store.refresh_in_background(refresh_correlations)
+        return {"error": "Correlation data is being prepared. Please try again in a few minutes."}
+
+    stale = store.is_stale(entry)
+    if stale:
+        store.refresh_in_background(refresh_correlations)
+
+    result = slice_correlations(entry, requested)
+    if not result['tickers']:
+        return {"error": "None of the requested tickers are in the curated universe.",
+                "missing": result['missing']}
+
+    # NaN (too little overlapping history) is not valid JSON
+    matrix = result['matrix']
+    correlations = [
+        [None if np.isnan(value) else round(float(value), 4) for value in row]
+        for row in matrix
+    ]
+
+    return encode_response(http_request, {
+        "tickers": result['tickers'],
+        "correlations": correlations,
+        "clusters": result['clusters'],
+        "redundant_pairs": [
+            {"tickers": pair['tickers'], "correlation": round(pair['correlation'], 4)}
+            for pair in result['redundant_pairs']
+        ],
+        "missing": result['missing'],
+        "as_of": {"start_date": entry['start_date'], "end_date": entry['end_date']},
+        "built_at": entry['built_at'],
+        "stale": stale
+    })
+
+
 @app.get("/search_assets")
 async def search_assets(query: str):
     """
@@ -697,12 +1686,14 @@ async def search_assets(query: str):
         raise HTTPException(status_code=400, detail="Ticker too long (maximum 10 characters).")
 
     try:
-        # Fetch ticker metadata from yfinance
+        # Fetch ticker metadata from yfinance (imported here: it is the slowest
+        # import in the app and most workers never search assets)
+        import yfinance as yf
         yf_ticker = yf.Ticker(ticker)
         info = yf_ticker.info or {}
     except Exception as exc:
         # Log exception but don't expose internal details to user
-        print(f"yfinance error for ticker '{ticker}': {exc}")
+        logger.warning("yfinance error for ticker '%s': %s", ticker, exc)
         raise HTTPException(status_code=404, detail=f"Ticker '{ticker}' not found.")
 
     if not info:
@@ -730,6 +1721,21 @@ async def search_assets(query: str):
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expose pipeline metrics in the Prometheus text format.
+
+    Series are only recorded when METRICS_ENABLED is set; otherwise the
+    response lists the metric families without samples. Values are per
+    worker process.
+
+    Returns:
+        PlainTextResponse: Prometheus exposition text (version 0.0.4)
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def generate_summary(metrics: dict, portfolio) -> str:
     """
     Generate a natural language portfolio analysis summary.
@@ -824,4 +1830,5 @@ def generate_summary(metrics: dict, portfolio) -> str:
 
 # 5. Main execution block
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -17,20 +17,249 @@ Key Features:
 - Good for smaller portfolios or testing
 
 Rate Limit Strategy:
-- Automatic pauses every 5 requests to respect rate limits
+- Process-wide sliding-window limiter (5 calls/minute by default) shared by
+  every request, including retries
 - Single retry with 60-second wait for rate limit errors
 - Detailed error logging and status reporting
 
+Transport:
+- One pooled requests.Session reused across calls (keep-alive, gzip)
+- Exponential-backoff retries for connection errors, timeouts, 429 and 5xx,
+  honouring Retry-After; every attempt goes through the rate limiter
+- outputsize=compact (last 100 trading days) when the window fits, instead of
+  downloading decades of history
+- Responses are parsed incrementally: the date-descending time series is
+  streamed entry by entry and the download stops once it passes the start
+  date, so full-history responses are never held in memory
+
 Recommended Usage:
 - Use for < 5 ticker portfolios to stay within rate limits
 - Enable caching to minimize repeat requests
 - Consider yfinance for larger portfolios or frequent analysis
 """
 
-import requests
+import codecs
+import json
+import os
+import re
+import threading
 import time
+from collections import deque
+from datetime import date, datetime, timedelta
 from typing import List, Dict
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from core.logger import get_logger, sampled_debug
+
+logger = get_logger(__name__)
+
+DEFAULT_BASE_URL = 'https://www.alphavantage.co/query'  # Override with ALPHAVANTAGE_BASE_URL
+COMPACT_DATA_POINTS = 100  # outputsize=compact returns the latest 100 trading days
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+STREAM_CHUNK_BYTES = 64 * 1024
+SERIES_KEY = '"Time Series (Daily)"'
+
+# One series entry: "YYYY-MM-DD": { flat object of string fields }
+_SERIES_ENTRY = re.compile(r'\s*,?\s*"(\d{4}-\d{2}-\d{2})"\s*:\s*\{([^{}]*)\}')
+_SERIES_END = re.compile(r'\s*\}')
+_SERIES_OPEN = re.compile(r'\s*:\s*\{')
+_CLOSE_FIELD = re.compile(r'"4\. close"\s*:\s*"([^"]*)"')
+
+
+class _RateLimiter:
+    """
+    Sliding-window rate limiter shared by all Alpha Vantage calls in the process.
+    """
+
+    def __init__(self, calls, period_seconds):
+        self.calls = calls
+        self.period_seconds = period_seconds
+        self._timestamps = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._timestamps and now - self._timestamps[0] >= self.period_seconds:
+                    self._timestamps.popleft()
+                if len(self._timestamps) < self.calls:
+                    self._timestamps.append(now)
+                    return
+                wait = self.period_seconds - (now - self._timestamps[0])
+
+            logger.info("Rate limit pause: %d calls in the last %.0fs, waiting %.1f seconds", self.calls, self.period_seconds, wait)
+            time.sleep(wait)
+
+
+_rate_limiter = _RateLimiter(int(os.getenv('ALPHAVANTAGE_CALLS_PER_MINUTE', 5)), 60.0)
+_session = None
+_session_lock = threading.Lock()
+
+
+def _get_session():
+    """Get the shared HTTP session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = int(os.getenv('ALPHAVANTAGE_POOL_SIZE', 8))
+                session = requests.Session()
+                # Retries are handled in _request so that each attempt is rate limited
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive'})
+                _session = session
+    return _session
+
+
+def _request(params, max_attempts=None, stream=False):
+    """
+    Perform a rate-limited GET against Alpha Vantage with backoff retries.
+
+    Args:
+        params: Query parameters
+        max_attempts: Attempts before giving up (default: ALPHAVANTAGE_MAX_ATTEMPTS or 3)
+        stream: Return before downloading the body (read it with iter_content)
+
+    Returns:
+        requests.Response: Successful (2xx) response
+
+    Raises:
+        requests.exceptions.RequestException: If every attempt fails
+    """
+    if max_attempts is None:
+        max_attempts = int(os.getenv('ALPHAVANTAGE_MAX_ATTEMPTS', 3))
+    timeout = (
+        float(os.getenv('ALPHAVANTAGE_CONNECT_TIMEOUT', 5)),
+        float(os.getenv('ALPHAVANTAGE_READ_TIMEOUT', 30))
+    )
+
+    for attempt in range(1, max_attempts + 1):
+        _rate_limiter.acquire()
+        retry_after = None
+        try:
+            base_url = os.getenv('ALPHAVANTAGE_BASE_URL', DEFAULT_BASE_URL)
+            r = _get_session().get(base_url, params=params, timeout=timeout, stream=stream)
+            if r.status_code not in RETRY_STATUS_CODES or attempt == max_attempts:
+                r.raise_for_status()  # Raise exception for HTTP errors (4xx, 5xx)
+                return r
+            retry_after = r.headers.get('Retry-After')
+            r.close()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_attempts:
+                raise
+
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = min(2 ** (attempt - 1), 30)
+        logger.warning("Alpha Vantage request failed (attempt %d/%d), retrying in %.1fs", attempt, max_attempts, delay)
+        time.sleep(delay)
+
+
+def _read_daily_series(response, start: str, end: str):
+    """
+    Incrementally parse a TIME_SERIES_DAILY response, keeping only [start, end].
+
+    Alpha Vantage lists the series newest first, so reading stops (and the
+    connection is released) at the first entry older than `start`. Responses
+    without a time series (errors, rate-limit notes) are small and are
+    returned parsed so the caller can inspect them.
+
+    Args:
+        response: Streaming requests.Response
+        start: Start date (YYYY-MM-DD), inclusive
+        end: End date (YYYY-MM-DD), inclusive
+
+    Returns:
+        tuple: (prices, None) where prices is a date-ascending list of
+               {'date', 'close'} dicts, or (None, payload) when the response
+               holds no time series
+
+    Raises:
+        ValueError: If the response is truncated or malformed
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    chunks = response.iter_content(chunk_size=STREAM_CHUNK_BYTES)
+    buffer = ''
+    position = None  # Offset just inside the series object once located
+    prices = []
+
+    try:
+        for chunk in chunks:
+            buffer += decoder.decode(chunk)
+
+            if position is None:
+                key_index = buffer.find(SERIES_KEY)
+                if key_index < 0:
+                    continue
+                opening = _SERIES_OPEN.match(buffer, key_index + len(SERIES_KEY))
+                if opening is None:
+                    continue
+                position = opening.end()
+
+            while True:
+                entry = _SERIES_ENTRY.match(buffer, position)
+                if entry is None:
+                    if _SERIES_END.match(buffer, position):
+                        return _ascending(prices), None
+                    break
+
+                date = entry.group(1)
+                position = entry.end()
+                if date > end:
+                    continue
+                if date < start:
+                    return _ascending(prices), None
+
+                close = _CLOSE_FIELD.search(entry.group(2))
+                if close is None:
+                    raise KeyError("4. close")
+                prices.append({"date": date, "close": float(close.group(1))})
+
+            # Drop consumed text so memory stays bounded by one chunk
+            buffer = buffer[position:]
+            position = 0
+
+        buffer += decoder.decode(b'', final=True)
+        if position is None:
+            return None, json.loads(buffer)
+        raise ValueError("Truncated time series in Alpha Vantage response")
+    finally:
+        response.close()
+
+
+def _ascending(prices):
+    """Reverse a newest-first price list (sorting only if the order was unexpected)."""
+    prices.reverse()
+    if any(prices[i]['date'] > prices[i + 1]['date'] for i in range(len(prices) - 1)):
+        prices.sort(key=lambda x: x['date'])
+    return prices
+
+
+def _output_size(start: str) -> str:
+    """
+    Pick 'compact' when the latest 100 trading days cover the window, else 'full'.
+
+    Counts weekdays from `start` to today; holidays only reduce the number of
+    trading days, so the check is conservative.
+    """
+    start_day = datetime.strptime(start, '%Y-%m-%d').date()
+    today = date.today()
+    if (today - start_day).days > COMPACT_DATA_POINTS * 7 // 5 + 7:
+        return 'full'
+
+    weekdays = sum(
+        1 for offset in range((today - start_day).days + 1)
+        if (start_day + timedelta(days=offset)).weekday() < 5
+    )
+    return 'compact' if weekdays <= COMPACT_DATA_POINTS else 'full'
+
 
 def fetch_prices(tickers: List[str], start: str, end: str, api_key: str) -> Dict:
     """
@@ -48,90 +277,83 @@ def fetch_prices(tickers: List[str], start: str, end: str, api_key: str) -> Dict
     """
     prices = {}
     failed_tickers = []
+    output_size = _output_size(start)
 
     for i, ticker in enumerate(tickers):
-        # Rate limiting: Alpha Vantage free tier allows 5 requests/minute
-        # After every 5 tickers, pause for 60 seconds to reset the rate limit window
-        if i > 0 and i % 5 == 0:
-            print(f"Rate limit pause: processed {i} tickers, waiting 60 seconds...")
-            time.sleep(60)
+        # Rate limiting: Alpha Vantage free tier allows 5 requests/minute;
+        # _request waits on the shared limiter before every call
+        sampled_debug(logger, "Fetching data for %s (%d/%d)", ticker, i + 1, len(tickers))
 
-        print(f"Fetching data for {ticker} ({i+1}/{len(tickers)})...")
-
-        # Construct API URL
+        # Query parameters
         # - TIME_SERIES_DAILY: Free tier endpoint (premium = TIME_SERIES_DAILY_ADJUSTED)
-        # - outputsize=full: Get complete history (default is last 100 days)
+        # - outputsize: 'compact' (last 100 days) when it covers the window, else 'full'
         # - Free tier uses "4. close" field (not "5. adjusted close")
-        url = f'https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&apikey={api_key}&outputsize=full'
-        
+        params = {
+            'function': 'TIME_SERIES_DAILY',
+            'symbol': ticker,
+            'apikey': api_key,
+            'outputsize': output_size
+        }
+
         try:
-            r = requests.get(url, timeout=10)
-            r.raise_for_status()  # Raise exception for HTTP errors (4xx, 5xx)
-            data = r.json()
+            ticker_prices, data = _read_daily_series(_request(params, stream=True), start, end)
 
             # Check for API-specific error responses
             # Alpha Vantage returns errors as JSON fields, not HTTP status codes
 
             # Error Message: Invalid ticker or malformed request
-            if "Error Message" in data:
-                print(f"Alpha Vantage error for {ticker}: {data['Error Message']}")
+            if ticker_prices is None and "Error Message" in data:
+                logger.warning("Alpha Vantage error for %s: %s", ticker, data['Error Message'])
                 failed_tickers.append(ticker)
                 continue
 
             # Note: Rate limit exceeded - attempt single retry
-            if "Note" in data:
-                print(f"Alpha Vantage rate limit message for {ticker}: {data['Note']}")
-                print("Waiting 60 seconds before retry...")
-                time.sleep(60)
-                r = requests.get(url, timeout=10)
-                data = r.json()
-
-            if "Time Series (Daily)" not in data:
+            if ticker_prices is None and "Note" in data:
+                wait_seconds = float(os.getenv('ALPHAVANTAGE_RATE_LIMIT_WAIT', 60))
+                logger.warning(
+                    "Alpha Vantage rate limit message for %s: %s; waiting %.0f seconds before retry",
+                    ticker, data['Note'], wait_seconds
+                )
+                time.sleep(wait_seconds)
+                ticker_prices, data = _read_daily_series(_request(params, stream=True), start, end)
+
+            if ticker_prices is None:
                 error_msg = data.get('Note') or data.get('Error Message') or data.get('Information') or f'Unknown error - Response keys: {list(data.keys())}'
-                print(f"Could not fetch data for {ticker} from Alpha Vantage: {error_msg}")
+                logger.warning("Could not fetch data for %s from Alpha Vantage: %s", ticker, error_msg)
 
                 # Check for common API key issues
                 if "Invalid API call" in str(data) or "premium endpoint" in str(data).lower():
-                    print(f"API Key issue detected. Verify your Alpha Vantage API key is valid and has the required permissions.")
+                    logger.warning("API key issue detected. Verify your Alpha Vantage API key is valid and has the required permissions.")
 
                 failed_tickers.append(ticker)
                 continue
 
-            # Extract price data from time series
-            ticker_prices = []
-            for date, values in data["Time Series (Daily)"].items():
-                # Filter to requested date range (Alpha Vantage returns full history)
-                if start <= date <= end:
-                    # Use "4. close" for free tier
-                    # Premium tier would use "5. adjusted close" (accounts for splits/dividends)
-                    ticker_prices.append({
-                        "date": date,
-                        "close": float(values["4. close"])
-                    })
-            
+            # Price data was extracted while streaming: filtered to the requested
+            # range using "4. close" for free tier
+            # (premium tier would use "5. adjusted close", which accounts for splits/dividends)
             if not ticker_prices:
-                print(f"No data found for {ticker} in the specified date range")
+                logger.info("No data found for %s in the specified date range", ticker)
                 failed_tickers.append(ticker)
                 continue
-                
-            prices[ticker] = sorted(ticker_prices, key=lambda x: x['date'])
-            print(f"Successfully fetched {len(ticker_prices)} data points for {ticker}")
+
+            prices[ticker] = ticker_prices
+            sampled_debug(logger, "Fetched %d data points for %s", len(ticker_prices), ticker)
 
         except requests.exceptions.Timeout:
-            print(f"Request timed out for {ticker}")
+            logger.warning("Request timed out for %s", ticker)
             failed_tickers.append(ticker)
         except requests.exceptions.RequestException as e:
-            print(f"Request failed for {ticker}: {e}")
+            logger.warning("Request failed for %s: %s", ticker, e)
             failed_tickers.append(ticker)
         except (KeyError, ValueError) as e:
-            print(f"Data parsing error for {ticker}: {e}")
+            logger.warning("Data parsing error for %s: %s", ticker, e)
             failed_tickers.append(ticker)
         except Exception as e:
-            print(f"Unexpected error for {ticker}: {e}")
+            logger.exception("Unexpected error for %s: %s", ticker, e)
             failed_tickers.append(ticker)
 
     if failed_tickers:
-        print(f"Failed to fetch data for: {', '.join(failed_tickers)}")
-    
-    print(f"Successfully fetched data for {len(prices)}/{len(tickers)} tickers")
+        logger.warning("Failed to fetch data for: %s", ', '.join(failed_tickers))
+
+    logger.info("Fetched data for %d/%d ticker(s) from Alpha Vantage", len(prices), len(tickers))
     return prices
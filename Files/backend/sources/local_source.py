@@ -0,0 +1,139 @@
+"""
+local_source.py
+
+Local File Data Source Module
+
+Serves historical prices from a directory of per-ticker CSV or Parquet files,
+with no network access. Intended for load tests, benchmarks and air-gapped
+deployments where a fast, deterministic source is needed.
+
+File layout (LOCAL_DATA_DIR, default: backend/data/prices/):
+- One file per ticker named <TICKER>.csv or <TICKER>.parquet
+  (e.g. AAPL.csv, BRK-B.parquet; '.' in a ticker may also be written as '-')
+- A date column ('date' or 'Date') and a close column
+  ('adj_close', 'Adj Close', 'close' or 'Close', first match wins)
+
+Files are read with memory-mapped I/O and parsed once per process; the parsed
+arrays are reused until the file's size or modification time changes, so
+repeated requests only slice the cached arrays.
+
+Limitations:
+- Parquet files require pyarrow (CSV works with pandas alone)
+- Windows follow yfinance semantics: start inclusive, end exclusive
+"""
+
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.logger import get_logger, sampled_debug
+
+logger = get_logger(__name__)
+
+DATE_COLUMNS = ('date', 'Date')
+CLOSE_COLUMNS = ('adj_close', 'Adj Close', 'close', 'Close')
+FILE_EXTENSIONS = ('.parquet', '.csv')
+
+# Parsed files: path -> (size, mtime_ns, dates, closes)
+_parsed = {}
+_parsed_lock = threading.Lock()
+
+
+def _data_dir() -> Path:
+    default = os.path.join(os.path.dirname(__file__), '..', 'data', 'prices')
+    return Path(os.getenv('LOCAL_DATA_DIR') or default)
+
+
+def _find_file(ticker: str):
+    """Locate the file for a ticker, trying the symbol as given and with '.' -> '-'."""
+    data_dir = _data_dir()
+    for name in dict.fromkeys([ticker, ticker.upper(), ticker.replace('.', '-'), ticker.upper().replace('.', '-')]):
+        for extension in FILE_EXTENSIONS:
+            path = data_dir / f"{name}{extension}"
+            if path.is_file():
+                return path
+    return None
+
+
+def _read_file(path: Path):
+    """
+    Parse a price file into sorted arrays.
+
+    Returns:
+        tuple: (dates, closes) where dates are 'YYYY-MM-DD' strings ascending
+    """
+    if path.suffix == '.parquet':
+        frame = pd.read_parquet(path, memory_map=True)
+    else:
+        frame = pd.read_csv(path, memory_map=True)
+
+    date_column = next((c for c in DATE_COLUMNS if c in frame.columns), None)
+    close_column = next((c for c in CLOSE_COLUMNS if c in frame.columns), None)
+    if date_column is None or close_column is None:
+        raise ValueError(f"{path.name} needs a date column and a close column")
+
+    dates = pd.to_datetime(frame[date_column]).dt.strftime('%Y-%m-%d').to_numpy(dtype=str)
+    closes = pd.to_numeric(frame[close_column], errors='coerce').to_numpy(dtype=float)
+
+    valid = ~np.isnan(closes)
+    dates = dates[valid]
+    closes = closes[valid]
+    order = np.argsort(dates, kind='stable')
+    return dates[order], closes[order]
+
+
+def _load(path: Path):
+    """Get a file's parsed arrays, re-reading it only when it changed on disk."""
+    stat = path.stat()
+    with _parsed_lock:
+        cached = _parsed.get(path)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2], cached[3]
+
+    dates, closes = _read_file(path)
+    with _parsed_lock:
+        _parsed[path] = (stat.st_size, stat.st_mtime_ns, dates, closes)
+    return dates, closes
+
+
+def fetch_prices(tickers: list[str], start: str, end: str) -> dict:
+    """
+    Fetches historical price data from local files.
+
+    Args:
+        tickers: A list of stock tickers.
+        start: The start date in YYYY-MM-DD format (inclusive).
+        end: The end date in YYYY-MM-DD format (exclusive).
+
+    Returns:
+        A dictionary where keys are tickers and values are lists of dicts
+        with 'date' and 'close' price.
+    """
+    prices = {}
+    for ticker in tickers:
+        path = _find_file(ticker)
+        if path is None:
+            logger.info("No local price file for %s", ticker)
+            continue
+
+        try:
+            dates, closes = _load(path)
+        except Exception as e:
+            logger.warning("Error reading local prices for %s: %s", ticker, e)
+            continue
+
+        # ISO dates sort lexicographically, so the window is two binary searches
+        lo = np.searchsorted(dates, start, side='left')
+        hi = np.searchsorted(dates, end, side='left')
+        if hi > lo:
+            prices[ticker] = [
+                {"date": day, "close": close}
+                for day, close in zip(dates[lo:hi].tolist(), closes[lo:hi].tolist())
+            ]
+        else:
+            sampled_debug(logger, "No local prices for %s between %s and %s", ticker, start, end)
+
+    return prices
@@ -12,6 +12,18 @@ Key Features:
 - No rate limits
 - Comprehensive coverage (stocks, ETFs, crypto)
 - Automatically handles ticker format variations (e.g., . vs -)
+- Universes larger than YF_BATCH_SIZE are split into batches; tickers
+  missing from a batch are retried individually
+
+Download calls are serialized process-wide: yfinance 0.2.x keeps the state
+of a download in module globals (shared._DFS / shared._ERRORS) that every
+call resets, so concurrent yf.download() calls overwrite each other's
+results. Within one call, yfinance fetches the tickers in parallel itself
+(threads=True).
+
+Configuration (environment):
+- YF_BATCH_SIZE: Maximum tickers per download call (default: 20)
+- YF_RETRY_ATTEMPTS: Individual retries for tickers a batch missed (default: 1)
 
 Limitations:
 - Data quality can vary for less-liquid securities
@@ -19,8 +31,93 @@ Limitations:
 - No SLA or guarantees
 """
 
-import yfinance as yf
+import os
+import threading
+
+import numpy as np
 import pandas as pd
+import yfinance as yf
+
+from core.logger import get_logger, sampled_debug
+
+logger = get_logger(__name__)
+
+# yf.download() is not safe to call concurrently (see module docstring)
+_download_lock = threading.Lock()
+
+
+def _batch_size():
+    return max(1, int(os.getenv('YF_BATCH_SIZE', 20)))
+
+
+def _retry_attempts():
+    return max(0, int(os.getenv('YF_RETRY_ATTEMPTS', 1)))
+
+
+def _plan_batches(yahoo_tickers: list[str]) -> list[list[str]]:
+    """
+    Split tickers into download batches of at most YF_BATCH_SIZE.
+
+    A universe that fits in one batch is downloaded with a single call.
+    """
+    size = _batch_size()
+    return [yahoo_tickers[i:i + size] for i in range(0, len(yahoo_tickers), size)]
+
+
+def _download_batch(yahoo_tickers: list[str], start: str, end: str) -> pd.DataFrame:
+    """
+    Download adjusted closes for one batch as a DataFrame (one column per ticker).
+
+    Failures are logged and returned as an empty frame so the batch's
+    tickers go to the individual retry pass.
+    """
+    try:
+        # - progress=False: Suppress yfinance download bar for cleaner logs
+        # - auto_adjust=False: Get 'Adj Close' column explicitly (yfinance v0.2.0+ changed defaults)
+        # - threads=True: yfinance fetches the batch's tickers in parallel within this call
+        with _download_lock:
+            data = yf.download(
+                yahoo_tickers, start=start, end=end, progress=False, auto_adjust=False, threads=True
+            )['Adj Close']
+    except Exception as e:
+        logger.warning("Error downloading %d ticker(s) from Yahoo Finance: %s", len(yahoo_tickers), e)
+        return pd.DataFrame()
+
+    # Older yfinance versions return a Series for single tickers
+    if isinstance(data, pd.Series):
+        data = data.to_frame(name=yahoo_tickers[0])
+    return data
+
+
+def _frame_to_prices(data: pd.DataFrame) -> dict:
+    """
+    Convert a downloaded frame to {yahoo_ticker: [{'date', 'close'}, ...]}.
+
+    Dates are formatted once per frame and each column is filtered with a
+    NaN mask on its NumPy array instead of per-row strftime calls.
+    """
+    if data.empty:
+        return {}
+
+    dates = np.asarray(data.index.strftime('%Y-%m-%d'))
+    prices = {}
+    for column in data.columns:
+        values = data[column].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        if valid.any():
+            prices[column] = [
+                {"date": day, "close": close}
+                for day, close in zip(dates[valid].tolist(), values[valid].tolist())
+            ]
+    return prices
+
+
+def _download_all(batches: list[list[str]], start: str, end: str) -> dict:
+    """Download the batches one after another and merge the results."""
+    merged = {}
+    for batch in batches:
+        merged.update(_frame_to_prices(_download_batch(batch, start, end)))
+    return merged
 
 
 def fetch_prices(tickers: list[str], start: str, end: str) -> dict:
@@ -36,68 +133,40 @@ def fetch_prices(tickers: list[str], start: str, end: str) -> dict:
         A dictionary where keys are tickers and values are lists of dicts
         with 'date' and 'close' price.
     """
+    if not tickers:
+        return {}
+
     try:
-        print(f"Fetching data for {len(tickers)} ticker(s) from Yahoo Finance...")
+        logger.debug("Fetching data for %d ticker(s) from Yahoo Finance", len(tickers))
 
         # Yahoo Finance uses hyphens instead of periods in ticker symbols
         # (e.g., 'BRK.B' becomes 'BRK-B'). Create bidirectional mapping
         # to preserve original ticker format in response.
         ticker_map = {ticker: ticker.replace('.', '-') for ticker in tickers}
-        yahoo_tickers = list(ticker_map.values())
+        yahoo_tickers = list(dict.fromkeys(ticker_map.values()))
 
-        # Download historical data
-        # - progress=False: Suppress yfinance download bar for cleaner logs
-        # - auto_adjust=False: Get 'Adj Close' column explicitly (yfinance v0.2.0+ changed defaults)
-        # - ['Adj Close']: Use adjusted close prices (accounts for splits and dividends)
-        data = yf.download(yahoo_tickers, start=start, end=end, progress=False, auto_adjust=False)['Adj Close']
-        
-        if data.empty:
-            print("No data returned from Yahoo Finance")
-            return {}
+        downloaded = _download_all(_plan_batches(yahoo_tickers), start, end)
 
-        prices = {}
+        # Retry tickers a batch dropped one at a time, so one bad symbol
+        # or a transient failure does not lose its neighbours
+        for attempt in range(_retry_attempts()):
+            missing = [ticker for ticker in yahoo_tickers if ticker not in downloaded]
+            if not missing:
+                break
+            logger.info("Retrying %d ticker(s) individually (attempt %d)", len(missing), attempt + 1)
+            downloaded.update(_download_all([[ticker] for ticker in missing], start, end))
 
-        # Process yfinance response
-        # Modern yfinance (v0.2.0+) always returns DataFrame, even for single tickers
-        # Older versions returned Series for single tickers - we handle both cases
-        if isinstance(data, pd.DataFrame):
-            # Multiple tickers: DataFrame with one column per ticker
-            for original_ticker in tickers:
-                yahoo_ticker = ticker_map[original_ticker]
-
-                # Check if ticker column exists in response
-                if yahoo_ticker in data.columns:
-                    ticker_data = data[yahoo_ticker].dropna()  # Remove NaN values
-
-                    if len(ticker_data) > 0:
-                        # Convert to standardized format using original ticker symbol
-                        prices[original_ticker] = [
-                            {"date": index.strftime('%Y-%m-%d'), "close": float(value)}
-                            for index, value in ticker_data.items()
-                        ]
-                        print(f"Fetched {len(ticker_data)} data points for {original_ticker}")
-                    else:
-                        print(f"No valid data for {original_ticker}")
-                else:
-                    print(f"Ticker {original_ticker} not found in response")
-        else:
-            # Single ticker fallback: Series format (legacy yfinance behavior)
-            # Unlikely with modern yfinance but kept for backward compatibility
-            original_ticker = tickers[0]
-            ticker_data = data.dropna()
-
-            if len(ticker_data) > 0:
-                prices[original_ticker] = [
-                    {"date": index.strftime('%Y-%m-%d'), "close": float(value)}
-                    for index, value in ticker_data.items()
-                ]
-                print(f"Fetched {len(ticker_data)} data points for {original_ticker}")
+        prices = {}
+        for original_ticker in tickers:
+            ticker_prices = downloaded.get(ticker_map[original_ticker])
+            if ticker_prices:
+                prices[original_ticker] = ticker_prices
             else:
-                print(f"No valid data for {original_ticker}")
+                sampled_debug(logger, "No valid data for %s", original_ticker)
 
-        print(f"Successfully fetched data for {len(prices)}/{len(tickers)} ticker(s)")
+        logger.info("Fetched data for %d/%d ticker(s) from Yahoo Finance", len(prices), len(tickers))
         return prices
-        
+
     except Exception as e:
-        print(f"Error fetching data from Yahoo Finance: {e}")
+        logger.exception("Error fetching data from Yahoo Finance: %s", e)
         return {}
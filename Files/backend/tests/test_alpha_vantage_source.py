@@ -0,0 +1,151 @@
+import json
+from datetime import date, timedelta
+
+import requests
+
+from sources import alpha_vantage_source as av
+
+
+class _FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None, chunk_bytes=7):
+        self.status_code = status_code
+        self._body = json.dumps(payload or {}, indent=4).encode('utf-8')
+        self.headers = headers or {}
+        self.chunk_bytes = chunk_bytes
+        self.chunks_read = 0
+        self.closed = False
+
+    def json(self):
+        return json.loads(self._body)
+
+    def iter_content(self, chunk_size=None):
+        for offset in range(0, len(self._body), self.chunk_bytes):
+            self.chunks_read += 1
+            yield self._body[offset:offset + self.chunk_bytes]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} error")
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls.append(params)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def _series(days):
+    return {
+        "Meta Data": {"1. Information": "Daily Prices", "2. Symbol": "AAA"},
+        "Time Series (Daily)": {
+            day: {"1. open": "1.0", "4. close": f"{100 + i}.5"}
+            for i, day in enumerate(days)
+        }
+    }
+
+
+def test_output_size_uses_compact_for_short_windows():
+    recent = (date.today() - timedelta(days=30)).strftime('%Y-%m-%d')
+    old = (date.today() - timedelta(days=365)).strftime('%Y-%m-%d')
+
+    assert av._output_size(recent) == 'compact'
+    assert av._output_size(old) == 'full'
+
+
+def test_request_retries_transient_errors_through_the_limiter(monkeypatch):
+    session = _FakeSession([
+        requests.exceptions.ConnectionError("reset"),
+        _FakeResponse(503, headers={"Retry-After": "0"}),
+        _FakeResponse(200, _series(["2024-01-03"])),
+    ])
+    acquired = []
+    monkeypatch.setattr(av, "_get_session", lambda: session)
+    monkeypatch.setattr(av._rate_limiter, "acquire", lambda: acquired.append(1))
+    monkeypatch.setattr(av.time, "sleep", lambda seconds: None)
+
+    response = av._request({"symbol": "AAA"}, max_attempts=3)
+
+    assert response.status_code == 200
+    assert len(session.calls) == 3
+    assert len(acquired) == 3
+
+
+def test_fetch_prices_filters_window_and_sorts(monkeypatch):
+    session = _FakeSession([_FakeResponse(200, _series(["2024-01-05", "2024-01-04", "2024-01-03", "2023-12-29"]))])
+    monkeypatch.setattr(av, "_get_session", lambda: session)
+    monkeypatch.setattr(av._rate_limiter, "acquire", lambda: None)
+
+    prices = av.fetch_prices(["AAA"], "2024-01-01", "2024-01-04", api_key="demo")
+
+    assert prices == {"AAA": [
+        {"date": "2024-01-03", "close": 102.5},
+        {"date": "2024-01-04", "close": 101.5},
+    ]}
+    assert session.calls[0]["outputsize"] == "full"
+    assert session.calls[0]["apikey"] == "demo"
+
+
+def test_rate_limiter_waits_for_window(monkeypatch):
+    clock = [0.0]
+    sleeps = []
+    monkeypatch.setattr(av.time, "monotonic", lambda: clock[0])
+
+    def fake_sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(av.time, "sleep", fake_sleep)
+    limiter = av._RateLimiter(2, 60.0)
+
+    for _ in range(3):
+        limiter.acquire()
+
+    assert sleeps == [60.0]
+
+
+def test_streaming_parser_stops_at_start_date():
+    days = [f"2024-01-{day:02d}" for day in range(31, 0, -1)] + [f"2023-12-{day:02d}" for day in range(31, 0, -1)]
+    response = _FakeResponse(200, _series(days), chunk_bytes=64)
+    total_chunks = len(list(_FakeResponse(200, _series(days), chunk_bytes=64).iter_content()))
+
+    prices, payload = av._read_daily_series(response, "2024-01-10", "2024-01-12")
+
+    assert payload is None
+    assert [p['date'] for p in prices] == ["2024-01-10", "2024-01-11", "2024-01-12"]
+    assert prices[0]['close'] == 100 + days.index("2024-01-10") + 0.5
+    assert response.closed
+    assert response.chunks_read < total_chunks / 2
+
+
+def test_streaming_parser_returns_error_payloads():
+    response = _FakeResponse(200, {"Note": "Thank you for using Alpha Vantage!"})
+
+    prices, payload = av._read_daily_series(response, "2024-01-01", "2024-01-31")
+
+    assert prices is None
+    assert payload == {"Note": "Thank you for using Alpha Vantage!"}
+
+
+def test_rate_limit_note_is_retried_once(monkeypatch):
+    session = _FakeSession([
+        _FakeResponse(200, {"Note": "Thank you for using Alpha Vantage!"}),
+        _FakeResponse(200, _series(["2024-01-03"])),
+    ])
+    monkeypatch.setattr(av, "_get_session", lambda: session)
+    monkeypatch.setattr(av._rate_limiter, "acquire", lambda: None)
+    monkeypatch.setattr(av.time, "sleep", lambda seconds: None)
+
+    prices = av.fetch_prices(["AAA"], "2024-01-01", "2024-01-31", api_key="demo")
+
+    assert prices == {"AAA": [{"date": "2024-01-03", "close": 100.5}]}
+    assert len(session.calls) == 2
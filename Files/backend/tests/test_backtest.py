@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.backtest import run_backtest
+
+
+def _prices(days=300, assets=4, seed=11):
+    rng = np.random.default_rng(seed)
+    return 100 * np.cumprod(1 + rng.normal(0.0004, 0.012, size=(days, assets)), axis=0)
+
+
+def _weights(count, assets=4, seed=5):
+    return np.random.default_rng(seed).dirichlet(np.ones(assets), count)
+
+
+def _replay(prices, weights, initial, contribution, interval):
+    """Day-by-day reference: grow holdings, add contributions, rebalance when due."""
+    holdings = weights * initial
+    values = [initial]
+    for day in range(1, len(prices)):
+        holdings = holdings * prices[day] / prices[day - 1]
+        if contribution and day % 21 == 0:
+            holdings = holdings + weights * contribution
+        if interval and day % interval == 0:
+            holdings = weights * holdings.sum()
+        values.append(holdings.sum())
+    return np.array(values)
+
+
+@pytest.mark.parametrize('frequency,interval', [('never', None), ('daily', 1), ('monthly', 21), ('annually', 252)])
+def test_vectorized_strategies_match_a_daily_replay(frequency, interval):
+    prices, weights = _prices(), _weights(6)
+    result = run_backtest(prices, weights, initial_value=5000, periodic_contribution=250,
+                          rebalance_frequency=frequency)
+
+    for i, w in enumerate(weights):
+        np.testing.assert_allclose(result['equity'][:, i], _replay(prices, w, 5000, 250, interval), rtol=1e-10)
+    assert result['contributed'][-1] == 5000 + 250 * (299 // 21)
+
+
+def test_buy_and_hold_without_contributions_is_the_weighted_price_index():
+    frame = pd.DataFrame(_prices())
+    weights = _weights(1)[0]
+    result = run_backtest(frame, weights)
+
+    expected = 10000 * (frame / frame.iloc[0]).dot(weights).to_numpy()
+    np.testing.assert_allclose(result['equity'][:, 0], expected, rtol=1e-12)
+    assert result['rebalance_counts'][0] == 0
+    assert result['cagr'][0] == pytest.approx((expected[-1] / 10000) ** (252 / 299) - 1)
+
+
+def test_contributions_do_not_count_as_returns():
+    prices, weights = _prices(), _weights(3)
+    plain = run_backtest(prices, weights, rebalance_frequency='daily')
+    funded = run_backtest(prices, weights, periodic_contribution=1000, rebalance_frequency='daily')
+
+    assert np.all(funded['equity'][-1] > plain['equity'][-1])
+    np.testing.assert_allclose(funded['cagr'], plain['cagr'], rtol=1e-9)
+    np.testing.assert_allclose(funded['max_drawdown'], plain['max_drawdown'], rtol=1e-9)
+
+
+def test_risk_metrics_and_rolling_volatility():
+    prices = _prices()
+    result = run_backtest(prices, _weights(2), rebalance_frequency='daily', rolling_window=20)
+
+    returns = pd.DataFrame(result['equity']).pct_change().iloc[1:]
+    np.testing.assert_allclose(result['annual_volatility'], returns.std().to_numpy() * np.sqrt(252), rtol=1e-9)
+    expected_rolling = returns.rolling(20).std().iloc[19:].to_numpy() * np.sqrt(252)
+    assert result['rolling_volatility'].shape == (300 - 20, 2)
+    np.testing.assert_allclose(result['rolling_volatility'], expected_rolling, rtol=1e-6)
+
+    index = result['equity'] / result['equity'][0]
+    expected_drawdown = np.max(1 - index / np.maximum.accumulate(index, axis=0), axis=0)
+    np.testing.assert_allclose(result['max_drawdown'], expected_drawdown, rtol=1e-9)
+
+
+def test_threshold_rebalances_only_drifted_strategies():
+    prices = np.column_stack([np.linspace(100, 300, 120), np.full(120, 100.0)])
+    weights = np.array([[0.5, 0.5], [1.0, 0.0]])
+    result = run_backtest(prices, weights, rebalance_frequency='threshold', rebalance_threshold=0.05)
+
+    assert result['rebalance_counts'][0] > 0
+    assert result['rebalance_counts'][1] == 0  # A single holding never drifts
+    np.testing.assert_allclose(result['equity'][:, 1], 10000 * prices[:, 0] / 100)
+
+
+def test_rejects_inconsistent_inputs():
+    with pytest.raises(ValueError):
+        run_backtest(_prices(), _weights(2, assets=3))
+    with pytest.raises(ValueError):
+        run_backtest(_prices(), _weights(1), rebalance_frequency='weekly')
+    with pytest.raises(ValueError):
+        run_backtest(np.zeros((10, 4)), _weights(1))
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+import batch
+from benchmarks import fixtures
+from core import cache_manager
+
+
+@pytest.fixture
+def stub_source(tmp_path, monkeypatch):
+    fixtures.register_stub_provider()
+    monkeypatch.setattr(cache_manager, '_cache', cache_manager.StockDataCache(cache_dir=tmp_path / 'cache'))
+    monkeypatch.setenv('MC_PATH_COUNT', '500')
+    return fixtures.STUB_PROVIDER
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_reads_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / 'portfolios.csv'
+    csv_path.write_text("id,tickers,weights,monthly_contribution\na,aapl;MSFT,0.6;0.4,250\n,SPY,1,\n")
+    rows = list(batch.read_portfolios(csv_path))
+    assert rows[0] == ('a', {'tickers': ['AAPL', 'MSFT'], 'weights': [0.6, 0.4], 'monthly_contribution': 250.0}, None)
+    assert rows[1] == ('2', {'tickers': ['SPY'], 'weights': [1.0]}, None)
+
+    jsonl_path = tmp_path / 'portfolios.jsonl'
+    jsonl_path.write_text('{"id": 7, "tickers": ["SPY"], "weights": [1]}\n\n[1]\n')
+    rows = list(batch.read_portfolios(jsonl_path))
+    assert rows[0] == ('7', {'tickers': ['SPY'], 'weights': [1.0]}, None)
+    assert rows[1][0] == '3' and rows[1][1] is None and 'line 3' in rows[1][2]
+
+    with pytest.raises(ValueError):
+        list(batch.read_portfolios(tmp_path / 'portfolios.xlsx'))
+
+
+def test_completed_ids_repairs_an_interrupted_line(tmp_path):
+    output = tmp_path / 'scores.jsonl'
+    output.write_text('{"id": "a", "status": "ok"}\n{"id": "b", "status": "error"}\n{"id": "c", "sta')
+
+    assert batch.completed_ids(output) == {'a', 'b'}
+    assert output.read_text().endswith('"error"}\n')
+    assert batch.completed_ids(output, retry_errors=True) == {'a'}
+
+
+def test_scores_and_resumes(tmp_path, stub_source):
+    tickers = fixtures.stub_tickers(3)
+    source = tmp_path / 'portfolios.jsonl'
+    source.write_text('\n'.join(json.dumps(row) for row in [
+        {'id': 'p1', 'tickers': tickers, 'weights': [0.5, 0.3, 0.2]},
+        {'id': 'p2', 'tickers': tickers[:1], 'weights': [1.0], 'rebalance_frequency': 'never'},
+        {'id': 'bad', 'tickers': tickers[:2], 'weights': [0.9, 0.9]},
+        {'id': 'p1', 'tickers': tickers[:1], 'weights': [1.0]},
+    ]) + '\n')
+    output = tmp_path / 'scores.jsonl'
+
+    summary = batch.run_batch(source, output, workers=1, source=stub_source)
+    assert (summary['scored'], summary['errors'], summary['skipped']) == (2, 2, 0)
+    results = {(r['id'], r['status']): r for r in _lines(output)}
+    assert set(results) == {('p1', 'ok'), ('p2', 'ok'), ('bad', 'error'), ('p1', 'error')}
+    assert results[('p1', 'error')]['error'] == "Duplicate id 'p1'"
+    scored = results[('p1', 'ok')]
+    assert scored['tickers'] == tickers and scored['projection_years'] == 10
+    assert scored['final_value_p10'] <= scored['final_value_p50'] <= scored['final_value_p90']
+
+    summary = batch.run_batch(source, output, workers=1, source=stub_source)
+    assert (summary['scored'], summary['errors'], summary['skipped']) == (0, 0, 4)
+    assert len(_lines(output)) == 4
@@ -0,0 +1,53 @@
+import logging
+
+from benchmarks import fixtures
+from benchmarks.harness import append_history, find_regressions, load_history, measure
+
+
+def test_measure_reports_timed_runs_only():
+    calls = []
+
+    stats = measure(lambda value: calls.append(value), repeat=4, warmup=2, setup=lambda: 'fresh')
+
+    assert calls == ['fresh'] * 6
+    assert stats['runs'] == 4
+    assert stats['min_ms'] <= stats['median_ms'] <= stats['p95_ms']
+
+
+def test_regressions_compare_against_recent_history(tmp_path):
+    history_path = tmp_path / "history.jsonl"
+    for median in (10.0, 11.0, 9.0):
+        append_history({'case/a': {'median_ms': median}, 'case/b': {'median_ms': 5.0}}, 'quick', path=history_path)
+
+    history = load_history(history_path)
+    regressions = find_regressions(
+        {'case/a': {'median_ms': 10.5}, 'case/b': {'median_ms': 7.0}, 'case/new': {'median_ms': 1.0}},
+        history
+    )
+
+    assert len(history) == 3
+    assert [r['case'] for r in regressions] == ['case/b']
+    assert regressions[0]['baseline_ms'] == 5.0
+
+
+def test_stub_provider_is_deterministic():
+    first = fixtures.fetch_prices(['BM00', 'BM01'], '2024-01-01', '2024-02-01')
+    second = fixtures.fetch_prices(['BM00'], '2024-01-01', '2024-02-01')
+
+    assert first['BM00'] == second['BM00']
+    assert first['BM00'] != first['BM01']
+    assert first['BM00'][0]['date'] == '2024-01-01'
+
+
+def test_quiet_silences_pipeline_logging_for_the_call():
+    from benchmarks.run import _quiet
+    from core.logger import ROOT_LOGGER, get_logger
+
+    logger = get_logger('benchmarks.test')
+    root = logging.getLogger(ROOT_LOGGER)
+    level = root.level
+
+    enabled = _quiet(lambda: logger.isEnabledFor(logging.ERROR))()
+
+    assert not enabled
+    assert root.level == level
@@ -0,0 +1,390 @@
+import json
+import threading
+import time
+
+import pytest
+
+from core.cache_manager import StockDataCache
+
+
+def _prices(count, offset=0.0):
+    return [{"date": f"2024-01-{day + 1:02d}", "close": 100.0 + day + offset} for day in range(count)]
+
+
+def test_round_trip_leaves_no_temp_files(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path)
+
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(5), source="yfinance")
+    data, source = cache.get("AAA", "2024-01-01", "2024-01-31")
+
+    assert data == _prices(5)
+    assert source == "yfinance"
+    assert [p.name for p in tmp_path.glob("*.json")] == ["AAA_2024-01-01_2024-01-31.json"]
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_expired_and_corrupted_entries_are_removed(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=0)
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(5))
+    (tmp_path / "BBB_2024-01-01_2024-01-31.json").write_text('{"timestamp": 1')
+
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (None, None)
+    assert cache.get("BBB", "2024-01-01", "2024-01-31") == (None, None)
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_concurrent_writes_never_expose_partial_entries(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path)
+    cache.set("AAA", "2024-01-01", "2024-12-31", _prices(28))
+    misses = []
+    stop = threading.Event()
+
+    def writer(offset):
+        while not stop.is_set():
+            cache.set("AAA", "2024-01-01", "2024-12-31", _prices(28, offset))
+
+    def reader():
+        for _ in range(300):
+            data, _ = cache.get("AAA", "2024-01-01", "2024-12-31")
+            if data is None or len(data) != 28:
+                misses.append(data)
+
+    writers = [threading.Thread(target=writer, args=(offset,)) for offset in (0.0, 0.5)]
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in writers + readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    stop.set()
+    for thread in writers:
+        thread.join()
+
+    assert misses == []
+    entry = json.loads((tmp_path / "AAA_2024-01-01_2024-12-31.json").read_text())
+    assert len(entry['data']) == 28
+
+
+def test_index_drives_expiry_eviction_and_stats(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1)
+    for ticker in ["AAA", "BBB", "CCC"]:
+        cache.set(ticker, "2024-01-01", "2024-01-31", _prices(10), source="yfinance")
+
+    # Age one entry in the index only: the sweep must not need its payload
+    cache.backend.index.record("AAA_2024-01-01_2024-01-31", "AAA", "2024-01-01", "2024-01-31",
+                       "yfinance", time.time() - 7200, 10)
+    stats = cache.stats()
+    assert stats['entries'] == 3
+    assert stats['expired_entries'] == 1
+    assert stats['by_source']['yfinance']['entries'] == 3
+
+    cache.clear_expired()
+    assert not (tmp_path / "AAA_2024-01-01_2024-01-31.json").exists()
+    assert cache.stats()['entries'] == 2
+
+    # BBB is least recently used once CCC is touched
+    cache.backend.index.touch("CCC_2024-01-01_2024-01-31", when=time.time() + 3600)
+    entry_size = (tmp_path / "CCC_2024-01-01_2024-01-31.json").stat().st_size
+    assert cache.backend.evict_to_size(entry_size) == 1
+    assert cache.get("BBB", "2024-01-01", "2024-01-31") == (None, None)
+    assert cache.get("CCC", "2024-01-01", "2024-01-31")[0] == _prices(10)
+
+
+def test_writes_sweep_expired_windows_periodically(tmp_path, monkeypatch):
+    from core import cache_manager
+
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1)
+    cache.set_many({"AAA": _prices(3)}, "2024-01-01", "2024-01-31", source="yfinance")
+    cache.backend.index.record("AAA_2024-01-01_2024-01-31", "AAA", "2024-01-01", "2024-01-31",
+                               "yfinance", time.time() - 7200, 10)
+
+    # The first write swept already; the next sweep waits for the interval
+    cache.set_many({"AAA": _prices(3)}, "2024-01-02", "2024-02-01", source="yfinance")
+    assert (tmp_path / "AAA_2024-01-01_2024-01-31.json").exists()
+
+    monkeypatch.setattr(cache_manager, 'SWEEP_INTERVAL_SECONDS', 0)
+    cache.set_many({"AAA": _prices(3)}, "2024-01-03", "2024-02-02", source="yfinance")
+    assert not (tmp_path / "AAA_2024-01-01_2024-01-31.json").exists()
+    assert cache.stats()['entries'] == 2
+
+
+def test_index_is_rebuilt_from_existing_files(tmp_path):
+    entry = {"timestamp": time.time(), "ticker": "AAA", "start_date": "2024-01-01",
+             "end_date": "2024-01-31", "source": "alpha_vantage", "data": _prices(3)}
+    (tmp_path / "AAA_2024-01-01_2024-01-31.json").write_text(json.dumps(entry))
+
+    stats = StockDataCache(cache_dir=tmp_path).stats()
+
+    assert stats['entries'] == 1
+    assert stats['by_source'] == {"alpha_vantage": {"entries": 1, "bytes": stats['total_bytes']}}
+
+
+def test_failed_index_rebuild_keeps_the_previous_index(tmp_path):
+    import sqlite3
+
+    cache = StockDataCache(cache_dir=tmp_path)
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(3), source="yfinance")
+
+    good = ("BBB_2024-01-01_2024-01-31", "BBB", "2024-01-01", "2024-01-31", "yfinance", time.time(), 10)
+    bad = ("CCC_2024-01-01_2024-01-31", None, "2024-01-01", "2024-01-31", "yfinance", time.time(), 10)
+    with pytest.raises(sqlite3.IntegrityError):
+        cache.backend.index.replace_all([good, bad])
+
+    # The clear and the inserts roll back together
+    assert cache.stats()['entries'] == 1
+    assert cache.backend.index.timestamp("AAA_2024-01-01_2024-01-31") is not None
+
+
+def test_sqlite_backend_round_trip(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    cache.set_many(
+        {"AAA": _prices(5), "BBB": _prices(4, offset=1.0)},
+        "2024-01-01", "2024-01-31", source="yfinance"
+    )
+
+    hits = cache.get_many(["AAA", "BBB", "CCC"], "2024-01-01", "2024-01-31")
+    assert set(hits) == {"AAA", "BBB"}
+    assert hits["AAA"] == (_prices(5), "yfinance")
+    assert cache.get("BBB", "2024-01-01", "2024-01-31") == (_prices(4, offset=1.0), "yfinance")
+    assert cache.get("AAA", "2024-01-01", "2024-02-29") == (None, None)
+
+
+def test_sqlite_backend_keeps_windows_and_sources_apart(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(5), source="yfinance")
+    # An overlapping window from another source (e.g. unadjusted closes) leaves the first intact
+    cache.set("AAA", "2024-01-01", "2024-01-30", _prices(5, offset=50.0), source="alpha_vantage")
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (_prices(5), "yfinance")
+    assert cache.get("AAA", "2024-01-01", "2024-01-30") == (_prices(5, offset=50.0), "alpha_vantage")
+
+    # A refetch replaces the source's rows in the window, dropping dates that disappeared upstream
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(3), source="yfinance")
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (_prices(3), "yfinance")
+    assert cache.stats()['price_rows'] == 8
+
+
+def test_sqlite_backend_shares_rows_between_daily_windows(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    cache.set("AAA", "2024-01-01", "2024-01-05", _prices(5), source="yfinance")
+    cache.set("AAA", "2024-01-02", "2024-01-06", _prices(6)[1:], source="yfinance")
+
+    # The moved window only adds its new day
+    assert cache.stats()['price_rows'] == 6
+    assert cache.get("AAA", "2024-01-01", "2024-01-05") == (_prices(5), "yfinance")
+    assert cache.get("AAA", "2024-01-02", "2024-01-06") == (_prices(6)[1:], "yfinance")
+
+
+def test_sqlite_panel_aligns_tickers_in_one_read(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    cache.set_many({"AAA": _prices(5), "BBB": _prices(4, offset=1.0)}, "2024-01-01", "2024-01-31",
+                   source="yfinance")
+    cache.set("CCC", "2024-01-01", "2024-01-31", _prices(5, offset=2.0), source="alpha_vantage")
+
+    panel = cache.get_panel(["CCC", "AAA", "BBB"], "2024-01-01", "2024-01-31")
+    assert panel['tickers'] == ["CCC", "AAA", "BBB"]
+    assert panel['dates'] == [point['date'] for point in _prices(4)]
+    assert panel['closes'][0] == [102.0, 100.0, 101.0]
+    assert panel['sources'] == {"AAA": "yfinance", "BBB": "yfinance", "CCC": "alpha_vantage"}
+
+    assert cache.get_panel(["AAA", "DDD"], "2024-01-01", "2024-01-31") is None
+    # Backends without a panel query leave alignment to the caller
+    assert StockDataCache(cache_dir=tmp_path / "json").get_panel(["AAA"], "2024-01-01", "2024-01-31") is None
+
+
+def test_sqlite_backend_resets_earlier_layouts(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / 'prices.sqlite3')
+    conn.executescript(
+        "CREATE TABLE prices (ticker TEXT, date TEXT, close REAL, PRIMARY KEY (ticker, date));"
+        "CREATE TABLE fetches (ticker TEXT, start_date TEXT, end_date TEXT, source TEXT, timestamp REAL,"
+        " PRIMARY KEY (ticker, start_date, end_date));"
+        f"INSERT INTO fetches VALUES ('AAA', '2024-01-01', '2024-01-31', 'yfinance', {time.time()});"
+    )
+    conn.close()
+
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    assert cache.stats()['entries'] == 0
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(2), source="yfinance")
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (_prices(2), "yfinance")
+
+
+def test_sqlite_backend_expiry(tmp_path, monkeypatch):
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1, backend='sqlite')
+    cache.set("AAA", "2024-01-01", "2024-01-31", _prices(5), source="alpha_vantage")
+    written = time.time()
+
+    monkeypatch.setattr(time, 'time', lambda: written + 3700)
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (None, None)
+    assert cache.stats()['expired_entries'] == 1
+
+    cache.clear_expired()
+    stats = cache.stats()
+    assert stats['entries'] == 0
+    assert stats['price_rows'] == 0
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_expired_entries_are_served_stale_until_the_bound(tmp_path, monkeypatch, backend):
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1, max_stale_hours=1, backend=backend)
+    cache.set_many({"AAA": _prices(5), "BBB": _prices(3)}, "2024-01-01", "2024-01-31", source="yfinance")
+    written = time.time()
+
+    monkeypatch.setattr(time, 'time', lambda: written + 1800)
+    hits, stale = cache.lookup(["AAA", "CCC"], "2024-01-01", "2024-01-31")
+    assert hits == {"AAA": (_prices(5), "yfinance")} and stale == set()
+
+    monkeypatch.setattr(time, 'time', lambda: written + 5400)
+    assert cache.get("AAA", "2024-01-01", "2024-01-31") == (None, None)  # get() stays fresh-only
+    cache.clear_expired()
+    hits, stale = cache.lookup(["AAA", "BBB"], "2024-01-01", "2024-01-31")
+    assert hits["AAA"] == (_prices(5), "yfinance") and stale == {"AAA", "BBB"}
+
+    monkeypatch.setattr(time, 'time', lambda: written + 7300)
+    assert cache.lookup(["AAA", "BBB"], "2024-01-01", "2024-01-31") == ({}, set())
+    cache.clear_expired()
+    assert cache.stats()['entries'] == 0
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_writes_delete_entries_past_the_stale_bound(tmp_path, monkeypatch, backend):
+    from core import cache_manager
+
+    monkeypatch.setattr(cache_manager, 'SWEEP_INTERVAL_SECONDS', 0)
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1, max_stale_hours=1, backend=backend)
+    cache.set_many({"AAA": _prices(5)}, "2023-11-01", "2023-12-31", source="yfinance")
+    written = time.time()
+
+    # A day later: AAA is past TTL + max_stale, BBB is written fresh and sweeps it away
+    monkeypatch.setattr(time, 'time', lambda: written + 86400)
+    cache.set_many({"BBB": _prices(3)}, "2024-01-01", "2024-01-31", source="yfinance")
+    assert cache.stats()['entries'] == 1
+    assert cache.lookup(["AAA", "BBB"], "2024-01-01", "2024-01-31")[0].keys() == {"BBB"}
+
+    # Still within the stale bound: kept by the next sweep
+    monkeypatch.setattr(time, 'time', lambda: written + 86400 + 5400)
+    cache.set_many({"CCC": _prices(3)}, "2024-01-01", "2024-01-31", source="yfinance")
+    assert cache.stats()['entries'] == 2
+
+
+def test_revalidate_runs_one_refresh_per_entry(tmp_path):
+    cache = StockDataCache(cache_dir=tmp_path)
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def refresh(tickers):
+        calls.append(list(tickers))
+        release.wait(5)
+        cache.set_many({ticker: _prices(2) for ticker in tickers}, "2024-01-01", "2024-01-31")
+        done.set()
+
+    assert cache.revalidate(["AAA", "BBB", "AAA"], "2024-01-01", "2024-01-31", refresh) == ["AAA", "BBB"]
+    assert cache.revalidate(["BBB"], "2024-01-01", "2024-01-31", refresh) == []
+    release.set()
+    assert done.wait(5)
+
+    deadline = time.time() + 5
+    while cache._revalidating and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [["AAA", "BBB"]]
+    assert cache.lookup(["AAA", "BBB"], "2024-01-01", "2024-01-31")[1] == set()
+    assert cache.revalidate(["BBB"], "2024-01-01", "2024-01-31", lambda tickers: None) == ["BBB"]
+
+
+def test_stale_prices_are_flagged_and_refreshed_in_the_background(tmp_path, monkeypatch):
+    import main
+    from benchmarks import fixtures
+    from core import cache_manager
+
+    fixtures.register_stub_provider()
+    cache = StockDataCache(cache_dir=tmp_path, ttl_hours=1, max_stale_hours=24)
+    monkeypatch.setattr(cache_manager, '_cache', cache)
+    ticker = fixtures.stub_tickers(1)[0]
+    cache.set(ticker, "2024-01-01", "2024-03-01", _prices(3), source=fixtures.STUB_PROVIDER)
+    entry = tmp_path / f"{ticker}_2024-01-01_2024-03-01.json"
+    payload = json.loads(entry.read_text())
+    payload['timestamp'] -= 7200
+    entry.write_text(json.dumps(payload))
+
+    prices, sources = main.fetch_prices_with_cache_and_hybrid(
+        [ticker], "2024-01-01", "2024-03-01", primary_source=fixtures.STUB_PROVIDER
+    )
+    assert prices[ticker] == _prices(3)
+    assert sources[ticker] == {"source": f"{fixtures.STUB_PROVIDER} (cached)", "cached": True, "stale": True}
+
+    deadline = time.time() + 10
+    while time.time() < deadline and cache.lookup([ticker], "2024-01-01", "2024-03-01")[1]:
+        time.sleep(0.02)
+    refreshed, stale = cache.lookup([ticker], "2024-01-01", "2024-03-01")
+    assert stale == set() and refreshed[ticker][0] != _prices(3)
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_moved_window_falls_back_to_the_newest_covering_window(tmp_path, backend):
+    cache = StockDataCache(cache_dir=tmp_path, backend=backend, max_stale_hours=24)
+    cache.set("AAA", "2023-12-01", "2024-01-30", _prices(5, offset=50.0), source="alpha_vantage")
+    cache.set("AAA", "2024-01-01", "2024-03-01", _prices(5), source="yfinance")
+
+    # The next day's window misses exactly, but yesterday's still covers 59 of its 60 days
+    hits, stale = cache.lookup(["AAA", "BBB"], "2024-01-02", "2024-03-02")
+    assert hits == {"AAA": (_prices(5)[1:], "yfinance")}
+    assert stale == {"AAA"}
+
+    # Windows covering too little of the request are misses
+    assert cache.lookup(["AAA"], "2024-02-01", "2024-04-01") == ({}, set())
+
+    no_stale = StockDataCache(cache_dir=tmp_path / "strict", backend=backend)
+    no_stale.set("AAA", "2024-01-01", "2024-03-01", _prices(5), source="yfinance")
+    assert no_stale.lookup(["AAA"], "2024-01-02", "2024-03-02") == ({}, set())
+
+
+def test_next_days_window_is_served_stale_and_refetched(tmp_path, monkeypatch):
+    import main
+    from benchmarks import fixtures
+    from core import cache_manager
+
+    fixtures.register_stub_provider()
+    cache = StockDataCache(cache_dir=tmp_path, max_stale_hours=24)
+    monkeypatch.setattr(cache_manager, '_cache', cache)
+    ticker = fixtures.stub_tickers(1)[0]
+    cache.set(ticker, "2024-01-01", "2024-03-01", _prices(3), source=fixtures.STUB_PROVIDER)
+
+    # Still within the TTL, but the analysis window has moved on by a day
+    prices, sources = main.fetch_prices_with_cache_and_hybrid(
+        [ticker], "2024-01-02", "2024-03-02", primary_source=fixtures.STUB_PROVIDER
+    )
+    assert prices[ticker] == _prices(3)[1:]
+    assert sources[ticker]["stale"] is True
+
+    deadline = time.time() + 10
+    while time.time() < deadline and cache.get(ticker, "2024-01-02", "2024-03-02") == (None, None):
+        time.sleep(0.02)
+    refreshed, stale = cache.lookup([ticker], "2024-01-02", "2024-03-02")
+    assert stale == set() and refreshed[ticker][0] != _prices(3)[1:]
+
+
+def test_fully_cached_portfolio_is_read_as_one_panel(tmp_path, monkeypatch):
+    import numpy as np
+    import pandas as pd
+    import main
+    from core import cache_manager
+
+    cache = StockDataCache(cache_dir=tmp_path, backend='sqlite')
+    monkeypatch.setattr(cache_manager, '_cache', cache)
+    start, end = main.analysis_window()
+    days = pd.bdate_range(end=end, periods=6).strftime('%Y-%m-%d')
+    closes = {
+        "AAA": [{"date": day, "close": 100.0 + i} for i, day in enumerate(days)],
+        "BBB": [{"date": day, "close": 50.0 - i} for i, day in enumerate(days[1:])],
+    }
+    cache.set_many(closes, start, end, source="yfinance")
+    expected, sources, _, _, _ = main.fetch_aligned_prices(["AAA", "BBB"], [0.5, 0.5], start, end, "yfinance", None)
+
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("per-ticker lookup should not run")
+
+    monkeypatch.setattr(main, 'fetch_prices_with_cache_and_hybrid', no_fetch)
+    loaded = main.load_portfolio_returns(["AAA", "BBB"], [0.5, 0.5], x_data_source="yfinance")
+
+    assert loaded['data_sources'] == sources
+    assert len(expected) == 5 and loaded['prices'].equals(expected)
+    np.testing.assert_allclose(loaded['returns'].to_numpy(), expected.pct_change().dropna().to_numpy())
@@ -0,0 +1,150 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core.correlation import CorrelationStore, average_linkage, build_snapshot, slice_correlations
+
+
+def _prices(days=300, seed=3):
+    """Two factor groups (A*, B*) plus an independent asset and a short history."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-01', periods=days).strftime('%Y-%m-%d')
+    factors = rng.normal(0, 0.01, size=(2, days))
+    returns = {
+        'A1': factors[0] + rng.normal(0, 0.001, days),
+        'A2': factors[0] + rng.normal(0, 0.001, days),
+        'B1': factors[1] + rng.normal(0, 0.002, days),
+        'B2': factors[1] + rng.normal(0, 0.002, days),
+        'B3': factors[1] + rng.normal(0, 0.002, days),
+        'IND': rng.normal(0, 0.01, days),
+    }
+    prices = {
+        ticker: [{'date': d, 'close': float(p)} for d, p in zip(dates, 100 * np.cumprod(1 + r))]
+        for ticker, r in returns.items()
+    }
+    prices['NEW'] = prices['A1'][-30:]  # Too little overlap to correlate
+    return prices
+
+
+def test_snapshot_clusters_correlated_assets_together():
+    snapshot = build_snapshot(_prices(), '2024-01-01', '2025-02-01')
+    tickers, labels = snapshot['tickers'], snapshot['labels']
+    label = dict(zip(tickers, labels))
+
+    assert label['A1'] == label['A2'] and label['B1'] == label['B2'] == label['B3']
+    assert len({label['A1'], label['B1'], label['IND'], label['NEW']}) == 4
+
+    # Members of a cluster are adjacent in the leaf order
+    ordered = [tickers[i] for i in snapshot['order']]
+    positions = sorted(ordered.index(t) for t in ('B1', 'B2', 'B3'))
+    assert positions == list(range(positions[0], positions[0] + 3))
+
+    index = tickers.index('NEW')
+    assert np.isnan(snapshot['correlation'][index, tickers.index('A1')])
+
+
+def test_weekend_trading_does_not_drop_stock_returns():
+    prices = _prices()
+    days = pd.date_range('2024-01-01', periods=400).strftime('%Y-%m-%d')
+    closes = 100 * np.cumprod(1 + np.random.default_rng(9).normal(0, 0.03, len(days)))
+    with_crypto = dict(prices, BTC=[{'date': d, 'close': float(p)} for d, p in zip(days, closes)])
+
+    plain = build_snapshot(prices, '2024-01-01', '2025-02-01')
+    mixed = build_snapshot(with_crypto, '2024-01-01', '2025-02-01')
+
+    # Stock pairs correlate over the same returns whether or not a 7-day asset shares the universe
+    a1, a2 = plain['tickers'].index('A1'), plain['tickers'].index('A2')
+    assert mixed['tickers'][a1] == 'A1' and mixed['tickers'][a2] == 'A2'
+    assert mixed['correlation'][a1, a2] == plain['correlation'][a1, a2]
+
+
+def test_average_linkage_uses_mean_cluster_distance():
+    distance = np.array([
+        [0.0, 0.1, 0.5, 0.9],
+        [0.1, 0.0, 0.7, 0.9],
+        [0.5, 0.7, 0.0, 0.9],
+        [0.9, 0.9, 0.9, 0.0],
+    ])
+    # {0, 1} merge at 0.1; leaf 2 joins at the average (0.5 + 0.7) / 2 = 0.6
+    order, labels = average_linkage(distance, 0.6)
+    assert labels[0] == labels[1] == labels[2] != labels[3]
+    order, labels = average_linkage(distance, 0.55)
+    assert labels[0] == labels[1] != labels[2]
+    assert sorted(order) == [0, 1, 2, 3]
+
+
+def test_saved_snapshot_slices_in_clustered_order(tmp_path):
+    snapshot = build_snapshot(_prices(), '2024-01-01', '2025-02-01')
+    store = CorrelationStore(path=tmp_path / 'universe.corr')
+    store.save(snapshot)
+    entry = store.load()
+
+    assert entry['tickers'] == snapshot['tickers']
+    assert entry['matrix'].dtype == np.float16
+    assert store.load() is entry  # Unchanged file stays mapped
+    np.testing.assert_allclose(entry['matrix'], snapshot['correlation'], atol=1e-3)
+
+    result = slice_correlations(entry, ['B2', 'A1', 'ZZZ', 'A2', 'B1'], redundancy_threshold=0.9)
+    assert result['missing'] == ['ZZZ']
+    assert sorted(result['tickers']) == ['A1', 'A2', 'B1', 'B2']
+    assert sorted(map(sorted, result['clusters'])) == [['A1', 'A2'], ['B1', 'B2']]
+    assert {tuple(sorted(p['tickers'])) for p in result['redundant_pairs']} == {('A1', 'A2'), ('B1', 'B2')}
+    assert sorted(result['redundant_pairs'][0]['tickers']) == ['A1', 'A2']  # Strongest first
+
+    full = slice_correlations(entry, None)
+    assert full['tickers'] == [snapshot['tickers'][i] for i in snapshot['order']]
+    assert full['matrix'].shape == (7, 7)
+
+
+def test_missing_or_stale_snapshot_refreshes_once(tmp_path):
+    store = CorrelationStore(path=tmp_path / 'universe.corr')
+    assert store.load() is None
+
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def rebuild():
+        calls.append(1)
+        release.wait(5)
+        store.save(build_snapshot(_prices(), '2024-01-01', '2025-02-01'))
+        done.set()
+
+    assert store.refresh_in_background(rebuild)
+    assert not store.refresh_in_background(rebuild)
+    release.set()
+    assert done.wait(5)
+
+    entry = store.load()
+    assert calls == [1] and entry is not None
+    assert not store.is_stale(entry)
+    assert store.is_stale(entry, max_age_hours=-1)
+
+
+def test_rebuild_lock_is_exclusive_across_stores(tmp_path):
+    first = CorrelationStore(path=tmp_path / 'universe.corr')
+    second = CorrelationStore(path=tmp_path / 'universe.corr')
+
+    with first.rebuild_lock() as held:
+        assert held
+        with second.rebuild_lock() as other:
+            assert not other
+    with second.rebuild_lock() as held:
+        assert held
+
+
+def test_refresh_skips_while_another_process_rebuilds(tmp_path, monkeypatch):
+    import main
+
+    store = CorrelationStore(path=tmp_path / 'universe.corr')
+    monkeypatch.setattr(main, 'get_correlation_store', lambda: store)
+
+    def fetch(*args, **kwargs):
+        raise AssertionError("fetched while another process held the rebuild lock")
+
+    monkeypatch.setattr(main, 'fetch_prices_with_cache_and_hybrid', fetch)
+    with CorrelationStore(path=tmp_path / 'universe.corr').rebuild_lock() as held:
+        assert held
+        assert main.refresh_correlations() is None
+    assert store.load() is None
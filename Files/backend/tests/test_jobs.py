@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+
+from core.jobs import BOOT_TOKEN, JobStore, job_key
+
+
+def _wait(store, job_id):
+    for _ in range(500):
+        job = store.get(job_id, include_result=True)
+        if job['status'] not in ('queued', 'running'):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_identical_submissions_share_one_job(tmp_path):
+    store = JobStore(jobs_dir=tmp_path)
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {'value': 42}
+
+    first = store.submit('analyze', {'a': 1, 'b': [1, 2]}, work)
+    second = store.submit('analyze', {'b': [1, 2], 'a': 1}, work)
+    assert first['id'] == second['id'] == job_key('analyze', {'a': 1, 'b': [1, 2]})
+    assert 'result' not in first
+
+    release.set()
+    job = _wait(store, first['id'])
+    assert job['status'] == 'succeeded' and job['result'] == {'value': 42}
+    assert store.submit('analyze', {'a': 1, 'b': [1, 2]}, work)['status'] == 'succeeded'
+    assert calls == [1]
+
+
+def test_results_survive_a_restart(tmp_path):
+    store = JobStore(jobs_dir=tmp_path)
+    job_id = store.submit('analyze', {'a': 1}, lambda: {'value': 1})['id']
+    _wait(store, job_id)
+
+    restarted = JobStore(jobs_dir=tmp_path)
+    assert restarted.get(job_id, include_result=True)['result'] == {'value': 1}
+    assert restarted.get('0' * 32) is None
+    assert restarted.get('../etc/passwd') is None
+
+
+def test_failed_jobs_rerun_and_expired_jobs_vanish(tmp_path):
+    store = JobStore(jobs_dir=tmp_path)
+    failed = store.submit('analyze', {'a': 1}, lambda: {'error': 'No data'})
+    assert _wait(store, failed['id'])['error'] == 'No data'
+
+    retried = store.submit('analyze', {'a': 1}, lambda: 1 / 0)
+    assert _wait(store, retried['id'])['error'] == 'division by zero'
+
+    expiring = JobStore(jobs_dir=tmp_path, ttl_seconds=0)
+    job_id = expiring.submit('analyze', {'a': 2}, lambda: {'value': 2})['id']
+    for _ in range(500):
+        if expiring.get(job_id) is None:
+            break
+        threading.Event().wait(0.01)
+    assert expiring.get(job_id) is None
+
+
+def test_jobs_of_a_dead_process_are_reported_failed(tmp_path):
+    job_id = job_key('analyze', {'a': 1})
+    record = {
+        'id': job_id, 'kind': 'analyze', 'status': 'running', 'submitted_at': 0, 'started_at': 0,
+        'finished_at': None, 'expires_at': None, 'pid': 2 ** 22 + 1, 'error': None, 'result': None
+    }
+    (tmp_path / f"{job_id}.json").write_text(json.dumps(record))
+
+    store = JobStore(jobs_dir=tmp_path)
+    assert store.get(job_id)['status'] == 'failed'
+    # A new submission re-runs it
+    resubmitted = store.submit('analyze', {'a': 1}, lambda: {'value': 3})
+    assert _wait(store, resubmitted['id'])['result'] == {'value': 3}
+
+
+def _active_record(job_id, **fields):
+    record = {
+        'id': job_id, 'kind': 'analyze', 'status': 'running', 'submitted_at': time.time(),
+        'started_at': time.time(), 'finished_at': None, 'expires_at': None, 'pid': os.getpid(),
+        'boot': BOOT_TOKEN, 'heartbeat_at': time.time(), 'error': None, 'result': None
+    }
+    return dict(record, **fields)
+
+
+def test_jobs_of_a_relaunch_with_the_same_pid_are_reported_failed(tmp_path):
+    job_id = job_key('analyze', {'a': 1})
+    # Written by an earlier server process that happened to have our pid
+    (tmp_path / f"{job_id}.json").write_text(json.dumps(_active_record(job_id, boot='earlier-boot')))
+
+    store = JobStore(jobs_dir=tmp_path)
+    job = store.get(job_id)
+    assert job['status'] == 'failed' and job['expires_at'] is not None
+    assert 'boot' not in job and 'heartbeat_at' not in job
+
+
+def test_orphans_with_a_lapsed_lease_fail_and_are_purged(tmp_path, monkeypatch):
+    from core import jobs
+
+    job_id = job_key('analyze', {'a': 1})
+    # Owner pid looks alive (another process) but has not renewed the lease
+    stale = _active_record(job_id, pid=os.getppid(), boot='other', heartbeat_at=time.time() - 600)
+    (tmp_path / f"{job_id}.json").write_text(json.dumps(stale))
+
+    monkeypatch.setattr(jobs, 'PURGE_INTERVAL_SECONDS', 0)
+    store = JobStore(jobs_dir=tmp_path, ttl_seconds=0, lease_seconds=300)
+    store._maybe_purge()
+    assert json.loads((tmp_path / f"{job_id}.json").read_text())['status'] == 'failed'
+    store._maybe_purge()
+    assert not (tmp_path / f"{job_id}.json").exists()
+
+
+def test_running_jobs_renew_their_lease(tmp_path):
+    store = JobStore(jobs_dir=tmp_path, lease_seconds=0.3)
+    release = threading.Event()
+    job_id = store.submit('analyze', {'a': 1}, lambda: release.wait(5) and {'value': 1})['id']
+
+    time.sleep(0.6)  # Two lease periods
+    other_worker = JobStore(jobs_dir=tmp_path, lease_seconds=0.3)
+    assert other_worker.get(job_id)['status'] == 'running'
+    release.set()
+    assert _wait(store, job_id)['result'] == {'value': 1}
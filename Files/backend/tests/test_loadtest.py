@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from loadtest import yahoo_provider
+from loadtest.fake_upstreams import price_history, start_fake_alpha_vantage, start_fake_yahoo
+from loadtest.run import classify, percentile_report
+from sources import alpha_vantage_source as av
+
+
+@pytest.fixture
+def fake_alpha_vantage(monkeypatch):
+    server = start_fake_alpha_vantage(av_calls_per_minute=2)
+    monkeypatch.setenv('ALPHAVANTAGE_BASE_URL', f"{server.url}/query")
+    monkeypatch.setenv('ALPHAVANTAGE_RATE_LIMIT_WAIT', '0')
+    monkeypatch.setattr(av._rate_limiter, "acquire", lambda: None)
+    yield server
+    server.stop()
+
+
+def test_alpha_vantage_source_against_fake_server(fake_alpha_vantage):
+    start = (date.today() - timedelta(days=60)).isoformat()
+    end = date.today().isoformat()
+
+    prices = av.fetch_prices(['AAA', 'ZZBAD', 'BBB'], start, end, api_key='test')
+
+    # AAA and ZZBAD use the key's two calls; BBB gets a "Note", retries once and gets another
+    assert list(prices) == ['AAA']
+    days, closes = price_history('AAA')
+    recent = [str(day) for day in days if str(day) >= start]
+    assert [point['date'] for point in prices['AAA']] == recent
+    assert prices['AAA'][-1]['close'] == pytest.approx(closes[-1], abs=1e-4)
+    assert fake_alpha_vantage.snapshot() == {'requests': 4, 'unknown_symbol': 1, 'rate_limit_notes': 2}
+
+
+def test_yahoo_provider_against_fake_server(monkeypatch):
+    server = start_fake_yahoo()
+    monkeypatch.setenv('YAHOO_CHART_BASE_URL', server.url)
+    try:
+        days, closes = price_history('BRK-B')
+        start, end = str(days[-30]), str(days[-1])
+        prices = yahoo_provider.fetch_prices(['BRK.B', 'ZZBAD'], start, end)
+    finally:
+        server.stop()
+
+    assert list(prices) == ['BRK.B']
+    # End is exclusive, as with yfinance
+    assert [point['date'] for point in prices['BRK.B']] == [str(day) for day in days[-30:-1]]
+    np.testing.assert_allclose([point['close'] for point in prices['BRK.B']], closes[-30:-1], atol=1e-4)
+    assert server.snapshot() == {'requests': 3, 'unknown_symbol': 2}  # The unknown symbol is retried once
+
+
+def test_percentile_report_and_classification():
+    samples = [('analyze', latency / 1000.0, 'ok') for latency in range(1, 101)]
+    samples += [('analyze', 0.5, 'rejected'), ('popular', 0.002, 'error')]
+    report = percentile_report(samples, elapsed_seconds=10.0)
+
+    assert report['analyze']['count'] == 101 and report['analyze']['rejected'] == 1
+    assert report['analyze']['rps'] == pytest.approx(10.0)  # Only successful responses count
+    assert report['analyze']['p50_ms'] == pytest.approx(51.0)
+    assert report['analyze']['max_ms'] == pytest.approx(500.0)
+    assert report['popular']['errors'] == 1 and report['popular']['rps'] == 0.0
+    assert report['all']['count'] == 102
+
+    assert classify(200, b'{"tickers": []}') == 'ok'
+    assert classify(200, b' {"error": "No data"}') == 'error'
+    assert classify(503, b'{"detail": "busy"}') == 'rejected'
+    assert classify(422, b'{"detail": []}') == 'error'
@@ -0,0 +1,59 @@
+import os
+import types
+
+import pytest
+
+from core import data_adapter
+from sources import local_source
+
+
+def _write_csv(path, rows, header="date,adj_close"):
+    path.write_text(header + "\n" + "\n".join(f"{day},{close}" for day, close in rows) + "\n")
+
+
+def test_local_source_slices_window(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_DATA_DIR", str(tmp_path))
+    _write_csv(tmp_path / "BRK-B.csv", [
+        ("2024-01-04", 13.0), ("2024-01-02", 11.0), ("2024-01-03", ""), ("2024-01-05", 14.0)
+    ])
+
+    prices = local_source.fetch_prices(["BRK.B", "MISSING"], "2024-01-02", "2024-01-05")
+
+    assert prices == {"BRK.B": [
+        {"date": "2024-01-02", "close": 11.0},
+        {"date": "2024-01-04", "close": 13.0},
+    ]}
+
+
+def test_local_source_rereads_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOCAL_DATA_DIR", str(tmp_path))
+    path = tmp_path / "AAA.csv"
+    _write_csv(path, [("2024-01-02", 1.0)], header="Date,Close")
+    assert local_source.fetch_prices(["AAA"], "2024-01-01", "2024-02-01")["AAA"][0]["close"] == 1.0
+
+    _write_csv(path, [("2024-01-02", 2.0), ("2024-01-03", 3.0)], header="Date,Close")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert [p["close"] for p in local_source.fetch_prices(["AAA"], "2024-01-01", "2024-02-01")["AAA"]] == [2.0, 3.0]
+
+
+def test_registry_routes_to_registered_providers(monkeypatch):
+    monkeypatch.setattr(data_adapter, "_PROVIDERS", dict(data_adapter._PROVIDERS))
+    calls = []
+    stub = types.SimpleNamespace(
+        fetch_prices=lambda tickers, start, end, api_key=None: calls.append((tickers, api_key)) or {}
+    )
+
+    data_adapter.register_provider("stub", stub, requires_api_key=True, offline=True)
+
+    assert "stub" in data_adapter.available_providers()
+    assert data_adapter.is_offline_provider("stub")
+    assert not data_adapter.is_offline_provider("yfinance")
+    with pytest.raises(ValueError):
+        data_adapter.DataProvider(source="stub")
+    with pytest.raises(ValueError):
+        data_adapter.DataProvider(source="nope")
+
+    data_adapter.DataProvider(source="stub", api_key="k").get_prices(["AAA"], "2024-01-01", "2024-02-01")
+    assert calls == [(["AAA"], "k")]
@@ -0,0 +1,72 @@
+import io
+import json
+
+import pytest
+
+from core import logger as log
+
+
+@pytest.fixture
+def log_stream(monkeypatch):
+    def configure(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        stream = io.StringIO()
+        log.configure_logging(stream=stream, force=True)
+        return stream
+
+    yield configure
+    monkeypatch.undo()
+    log.configure_logging(force=True)
+
+
+def test_records_carry_request_id_and_respect_level(log_stream):
+    stream = log_stream(LOG_LEVEL='INFO', LOG_FORMAT='text')
+    logger = log.get_logger('tests')
+
+    token = log.request_id_var.set('req-123')
+    try:
+        logger.info("fetched %d ticker(s)", 3)
+        logger.debug("hidden")
+    finally:
+        log.request_id_var.reset(token)
+    logger.warning("outside")
+    log.flush_logging()
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 2
+    assert '[req-123] smartrisk.tests: fetched 3 ticker(s)' in lines[0]
+    assert '[-] smartrisk.tests: outside' in lines[1]
+
+
+def test_json_format_includes_extra_fields(log_stream):
+    stream = log_stream(LOG_LEVEL='DEBUG', LOG_FORMAT='json')
+
+    log.get_logger('tests').info("cache hit", extra={'ticker': 'AAPL'})
+    log.flush_logging()
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry['message'] == 'cache hit'
+    assert entry['level'] == 'INFO'
+    assert entry['ticker'] == 'AAPL'
+    assert entry['request_id'] == '-'
+
+
+def test_sampled_debug_respects_level_and_rate(log_stream):
+    stream = log_stream(LOG_LEVEL='DEBUG', LOG_SAMPLE_RATE='0')
+    logger = log.get_logger('tests')
+    for _ in range(50):
+        log.sampled_debug(logger, "dropped")
+    log.flush_logging()
+    assert stream.getvalue() == ''
+
+    stream = log_stream(LOG_LEVEL='DEBUG', LOG_SAMPLE_RATE='1')
+    log.sampled_debug(logger, "kept %s", 'AAPL')
+    log.flush_logging()
+    assert 'kept AAPL' in stream.getvalue()
+
+
+def test_request_ids_are_reused_only_when_safe():
+    assert log.new_request_id('abc-123_x.y') == 'abc-123_x.y'
+    assert log.new_request_id('bad id\n') != 'bad id\n'
+    assert len(log.new_request_id(None)) == 16
@@ -0,0 +1,54 @@
+import pytest
+
+from core import metrics
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.set_enabled(True)
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+    metrics.set_enabled(False)
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.set_enabled(False)
+    metrics.reset()
+
+    with metrics.span('monte_carlo'):
+        pass
+    metrics.increment('smartrisk_cache_lookups_total', result='hit')
+
+    text = metrics.render()
+    assert '# TYPE smartrisk_stage_duration_seconds histogram' in text
+    assert 'smartrisk_cache_lookups_total{' not in text
+    assert 'smartrisk_stage_duration_seconds_count' not in text
+
+
+def test_render_prometheus_text(enabled_metrics):
+    with enabled_metrics.span('align'):
+        pass
+    enabled_metrics.observe('smartrisk_stage_duration_seconds', 100.0, stage='monte_carlo')
+    enabled_metrics.increment('smartrisk_cache_lookups_total', 3, result='hit')
+    enabled_metrics.increment('smartrisk_cache_lookups_total', 2, result='hit')
+    enabled_metrics.record_upstream_call('alpha_vantage', 0.2, ok=False)
+    enabled_metrics.record_simulation(5000, 2.0)
+
+    lines = enabled_metrics.render().splitlines()
+
+    assert 'smartrisk_cache_lookups_total{result="hit"} 5' in lines
+    assert 'smartrisk_stage_duration_seconds_count{stage="align"} 1' in lines
+    assert 'smartrisk_stage_duration_seconds_bucket{stage="monte_carlo",le="30.0"} 0' in lines
+    assert 'smartrisk_stage_duration_seconds_bucket{stage="monte_carlo",le="+Inf"} 1' in lines
+    assert 'smartrisk_stage_duration_seconds_sum{stage="monte_carlo"} 100.0' in lines
+    assert 'smartrisk_upstream_requests_total{outcome="error",provider="alpha_vantage"} 1' in lines
+    assert 'smartrisk_upstream_request_duration_seconds_bucket{provider="alpha_vantage",le="0.25"} 1' in lines
+    assert 'smartrisk_simulation_paths_total 5000' in lines
+    assert 'smartrisk_simulation_paths_per_second 2500.0' in lines
+
+
+def test_label_values_are_escaped(enabled_metrics):
+    enabled_metrics.increment('smartrisk_upstream_requests_total', provider='a"b\\c', outcome='ok')
+
+    assert 'provider="a\\"b\\\\c"' in enabled_metrics.render()
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 
-from core.monte_carlo import run_monte_carlo_simulation
+from core.monte_carlo import run_monte_carlo_simulation, run_scenario_sweep
 
 
 def _expected_value(daily_return, years, initial):
@@ -128,3 +128,126 @@ def test_chunk_size_larger_than_paths(monkeypatch):
     for key in ['p10', 'p50', 'p90', 'mean']:
         assert len(result['percentiles'][key]) == 1
         assert result['percentiles'][key][0] > 0
+
+
+def test_scenario_sweep_matches_individual_runs(monkeypatch):
+    rng_data = np.random.default_rng(21)
+    returns = pd.DataFrame(rng_data.normal(0.0004, 0.01, size=(252, 2)), columns=["AAA", "BBB"])
+    weights = [0.7, 0.3]
+    monkeypatch.setenv('MC_PATH_CHUNK_SIZE', '500')
+
+    scenarios = [
+        {"initial_value": 10000, "periodic_contribution": 0.0, "contribution_frequency": "monthly"},
+        {"initial_value": 5000, "periodic_contribution": 250.0, "contribution_frequency": "monthly"},
+        {"initial_value": 2000, "periodic_contribution": 1000.0, "contribution_frequency": "quarterly"},
+    ]
+    sweep = run_scenario_sweep(returns, weights, scenarios, num_years=2, num_paths=400, rng=np.random.default_rng(5))
+
+    assert sweep['years'] == [1, 2]
+    for scenario, swept in zip(scenarios, sweep['scenarios']):
+        single = run_monte_carlo_simulation(
+            returns,
+            weights,
+            num_years=2,
+            num_paths=400,
+            initial_value=scenario['initial_value'],
+            periodic_contribution=scenario['periodic_contribution'],
+            contribution_frequency=scenario['contribution_frequency'],
+            rng=np.random.default_rng(5)
+        )
+        for key in ['p10', 'p50', 'p90', 'mean']:
+            np.testing.assert_allclose(swept['percentiles'][key], single['percentiles'][key], rtol=1e-9)
+
+
+def test_risk_metrics_deterministic_decline():
+    daily_return = -0.001
+    returns = pd.DataFrame({"AAA": [daily_return] * 252})
+
+    result = run_monte_carlo_simulation(
+        returns,
+        [1.0],
+        num_years=2,
+        num_paths=100,
+        initial_value=1000,
+        rng=np.random.default_rng(1)
+    )
+
+    risk = result['risk_metrics']
+    for year_idx, year in enumerate(result['years']):
+        terminal = _expected_value(daily_return, year, 1000)
+        assert np.isclose(risk['var_95'][year_idx], 1000 - terminal)
+        assert np.isclose(risk['cvar_95'][year_idx], 1000 - terminal)
+        assert np.isclose(risk['max_drawdown_mean'][year_idx], 1 - terminal / 1000)
+    assert np.isclose(risk['max_drawdown']['worst'], 1 - _expected_value(daily_return, 2, 1000) / 1000)
+
+
+def test_risk_metrics_ordering_random(monkeypatch):
+    rng_data = np.random.default_rng(11)
+    returns = pd.DataFrame(rng_data.normal(0.0003, 0.012, size=(252, 2)), columns=["AAA", "BBB"])
+    monkeypatch.setenv('MC_PATH_CHUNK_SIZE', '64')
+
+    result = run_monte_carlo_simulation(returns, [0.5, 0.5], num_years=3, num_paths=600,
+                                        periodic_contribution=100.0, rng=np.random.default_rng(3))
+
+    risk = result['risk_metrics']
+    assert all(cvar >= var for var, cvar in zip(risk['var_95'], risk['cvar_95']))
+    assert all(np.diff(risk['max_drawdown_mean']) >= 0)
+    assert 0 < risk['max_drawdown']['p50'] <= risk['max_drawdown']['p90'] <= risk['max_drawdown']['worst'] < 1
+
+
+def test_rebalancing_modes_deterministic(monkeypatch):
+    # Negligible volatility so every path follows the mean returns exactly
+    daily_means = np.array([0.002, 0.0])
+    moments = (daily_means, np.eye(2) * 1e-24)
+    weights = [0.5, 0.5]
+    monkeypatch.setenv('MC_REBALANCE_BLOCK_KB', '1')  # Several blocks, the last one shorter
+
+    def simulate(frequency):
+        return run_monte_carlo_simulation(
+            None, weights, num_years=1, num_paths=50, initial_value=1000,
+            rng=np.random.default_rng(5), moments=moments, rebalance_frequency=frequency
+        )
+
+    def reference(interval):
+        holdings = np.array(weights) * 1000
+        for day in range(1, 253):
+            holdings *= 1 + daily_means
+            if interval and day % interval == 0:
+                holdings = np.array(weights) * holdings.sum()
+        return holdings.sum()
+
+    assert np.isclose(simulate("daily")['percentiles']['p50'][0], 1000 * 1.001 ** 252, rtol=1e-9)
+    assert np.isclose(simulate("never")['percentiles']['p50'][0], reference(None), rtol=1e-9)
+    monthly = simulate("monthly")
+    assert np.isclose(monthly['percentiles']['p10'][0], reference(21), rtol=1e-9)
+    assert np.isclose(monthly['percentiles']['p90'][0], reference(21), rtol=1e-9)
+    assert monthly['rebalancing']['rebalances_per_year_mean'] == 12
+    assert 'rebalancing' not in simulate("daily")
+
+
+def test_threshold_rebalancing(monkeypatch):
+    rng = np.random.default_rng(11)
+    daily_returns = pd.DataFrame(rng.normal(0.0005, 0.015, size=(252, 3)), columns=["AAA", "BBB", "CCC"])
+    weights = [0.5, 0.3, 0.2]
+
+    def simulate(frequency, threshold=0.05):
+        return run_monte_carlo_simulation(
+            daily_returns, weights, num_years=2, num_paths=200, rng=np.random.default_rng(3),
+            rebalance_frequency=frequency, rebalance_threshold=threshold
+        )
+
+    # A threshold that is never reached is buy-and-hold on the same draws
+    never = simulate("never")
+    untouched = simulate("threshold", threshold=0.99)
+    assert untouched['rebalancing']['rebalances_per_year_mean'] == 0
+    np.testing.assert_allclose(untouched['percentiles']['p50'], never['percentiles']['p50'])
+
+    tight = simulate("threshold", threshold=0.01)
+    assert tight['rebalancing']['rebalances_per_year_mean'] > 1
+
+    try:
+        simulate("weekly")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown rebalance frequency accepted")
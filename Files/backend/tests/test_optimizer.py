@@ -0,0 +1,85 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core import optimizer
+from core.optimizer import optimize_portfolio, _project_to_simplex
+
+
+def _random_returns(asset_count, seed=3):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.01, size=(252, 4))
+    loadings = rng.normal(0.5, 0.3, size=(4, asset_count))
+    noise = rng.normal(0.0004, 0.012, size=(252, asset_count))
+    drift = rng.normal(0.0003, 0.0004, size=asset_count)
+    columns = [f"T{i}" for i in range(asset_count)]
+    return pd.DataFrame(factors @ loadings + noise + drift, columns=columns)
+
+
+def test_simplex_projection_rows_are_feasible():
+    points = np.random.default_rng(1).normal(0, 2, size=(20, 7))
+    projected = _project_to_simplex(points)
+
+    assert np.all(projected >= 0)
+    np.testing.assert_allclose(projected.sum(axis=1), 1.0, atol=1e-12)
+    # Points already on the simplex are unchanged
+    np.testing.assert_allclose(_project_to_simplex(projected), projected, atol=1e-12)
+
+
+def test_factor_cache_stays_bounded_under_concurrent_use(monkeypatch):
+    monkeypatch.setenv('OPTIMIZER_CACHE_SIZE', '3')
+    monkeypatch.setattr(optimizer, '_factor_cache', optimizer.OrderedDict())
+    cov = np.cov(_random_returns(5).values, rowvar=False) * 252
+
+    def factorize(i):
+        return optimizer._factorize_covariance(cov, cache_key=('T', i % 8))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(factorize, range(400)))
+
+    assert len(optimizer._factor_cache) == 3
+    assert all(result['lipschitz'] == results[0]['lipschitz'] for result in results)
+
+
+def test_two_asset_min_variance_matches_closed_form():
+    returns = _random_returns(2)
+    cov = returns.cov().values * 252
+
+    result = optimize_portfolio(returns, num_points=10)
+
+    expected = (cov[1, 1] - cov[0, 1]) / (cov[0, 0] + cov[1, 1] - 2 * cov[0, 1])
+    expected = min(max(expected, 0.0), 1.0)
+    np.testing.assert_allclose(result['min_variance']['weights'][0], expected, atol=1e-5)
+
+
+def test_frontier_is_feasible_and_bounds_max_sharpe():
+    returns = _random_returns(12)
+
+    result = optimize_portfolio(returns, num_points=40)
+
+    frontier = result['frontier']
+    assert len(frontier) == 40
+    for point in frontier + [result['min_variance'], result['max_sharpe']]:
+        weights = np.array(point['weights'])
+        assert np.all(weights >= 0)
+        assert np.isclose(weights.sum(), 1.0, atol=1e-9)
+
+    vols = [point['annual_volatility'] for point in frontier]
+    rets = [point['expected_annual_return'] for point in frontier]
+    assert np.isclose(vols[0], result['min_variance']['annual_volatility'])
+    assert np.all(np.diff(rets) >= -1e-9)
+    assert np.isclose(rets[-1], returns.mean().max() * 252)
+    assert result['max_sharpe']['sharpe_ratio'] >= max(point['sharpe_ratio'] for point in frontier) - 1e-9
+
+
+def test_fifty_asset_frontier_is_fast():
+    returns = _random_returns(50)
+
+    started = time.perf_counter()
+    result = optimize_portfolio(returns, num_points=100, cache_key=("bench",))
+    elapsed = time.perf_counter() - started
+
+    assert len(result['frontier']) == 100
+    assert elapsed < 1.0
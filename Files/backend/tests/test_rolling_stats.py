@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from core.rolling_stats import RollingMoments, RollingStatsStore
+
+
+def _returns(days=400, assets=4, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2023-01-02', periods=days)
+    return pd.DataFrame(rng.normal(0.0005, 0.01, size=(days, assets)), index=index,
+                        columns=[f"T{i}" for i in range(assets)])
+
+
+def _assert_matches_pandas(stats, window):
+    np.testing.assert_allclose(stats.mean, window.mean().values, rtol=1e-10, atol=1e-15)
+    np.testing.assert_allclose(stats.cov, window.cov().values, rtol=1e-9, atol=1e-15)
+    assert stats.count == len(window)
+
+
+def test_sliding_window_matches_a_full_recomputation():
+    returns = _returns()
+    store = RollingStatsStore()
+    key = tuple(returns.columns)
+
+    _assert_matches_pandas(store.update(key, returns.iloc[0:250]), returns.iloc[0:250])
+    for day in range(1, 120):
+        window = returns.iloc[day:day + 250]
+        _assert_matches_pandas(store.update(key, window), window)
+
+    entry = store._entries[key]
+    assert 0 < entry['updates'] <= store.resync_interval
+
+
+def test_reuse_rebuild_and_resync():
+    returns = _returns(assets=3)
+    store = RollingStatsStore(resync_interval=10)
+    key = tuple(returns.columns)
+    store.update(key, returns.iloc[0:250])
+    moments = store._entries[key]['moments']
+
+    # Same window: moments reused untouched
+    store.update(key, returns.iloc[0:250])
+    assert store._entries[key]['moments'] is moments and store._entries[key]['updates'] == 0
+
+    # Five days later: incremental (5 added + 5 removed)
+    store.update(key, returns.iloc[5:255])
+    assert store._entries[key]['moments'] is moments and store._entries[key]['updates'] == 10
+
+    # Past the resync budget: rebuilt from scratch
+    _assert_matches_pandas(store.update(key, returns.iloc[6:256]), returns.iloc[6:256])
+    assert store._entries[key]['updates'] == 0
+
+    # A revised history (same dates, different values) is never patched
+    revised = returns.iloc[6:256] * 1.01
+    _assert_matches_pandas(store.update(key, revised), revised)
+
+
+def test_moments_add_and_remove_are_inverse():
+    rows = _returns(days=50, assets=2).values
+    moments = RollingMoments.from_rows(rows[:40])
+    for row in rows[40:]:
+        moments.add(row)
+    for row in rows[:10]:
+        moments.remove(row)
+
+    np.testing.assert_allclose(moments.mean, rows[10:].mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(moments.covariance(), np.cov(rows[10:], rowvar=False), rtol=1e-10)
+    assert np.isnan(RollingMoments(2).covariance()).all()
+
+
+def test_store_is_bounded():
+    returns = _returns(days=30, assets=2)
+    store = RollingStatsStore(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        store.update(key, returns)
+    assert list(store._entries) == ['b', 'c']
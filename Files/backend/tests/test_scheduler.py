@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+from core.rolling_stats import WindowStats
+from core.scheduler import JobScheduler, SchedulerFull, estimate_cost
+
+
+def _blocked_scheduler(**kwargs):
+    """Scheduler whose single worker is held busy until the returned event is set."""
+    scheduler = JobScheduler(max_workers=1, **kwargs)
+    release = threading.Event()
+    started = threading.Event()
+    scheduler.submit(lambda: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    return scheduler, release
+
+
+def test_cheaper_jobs_run_first():
+    scheduler, release = _blocked_scheduler(max_queued=5, cost_weight_seconds=10)
+    order = []
+    futures = [
+        scheduler.submit(order.append, 'large', cost=estimate_cost(20000, 10, 50)),
+        scheduler.submit(order.append, 'medium', cost=estimate_cost(10000, 10, 1)),
+        scheduler.submit(order.append, 'small', cost=estimate_cost(5000, 10, 1)),
+    ]
+    release.set()
+    for future in futures:
+        future.result(timeout=5)
+
+    assert order == ['small', 'medium', 'large']
+
+
+def test_full_queue_rejects_with_retry_after():
+    scheduler, release = _blocked_scheduler(max_queued=1)
+    queued = scheduler.submit(lambda: 'done')
+
+    with pytest.raises(SchedulerFull) as excinfo:
+        scheduler.submit(lambda: 'rejected')
+    assert 1 <= excinfo.value.retry_after <= 60
+
+    # Background work may opt out of rejection and wait its turn
+    waiting = scheduler.submit(lambda: 'waited', reject_when_full=False)
+    release.set()
+    assert queued.result(timeout=5) == 'done'
+    assert waiting.result(timeout=5) == 'waited'
+
+
+def test_exceptions_and_cancellation():
+    scheduler, release = _blocked_scheduler(max_queued=2)
+    failing = scheduler.submit(lambda: 1 / 0)
+    ran = []
+    cancelled = scheduler.submit(ran.append, 'ran')
+    assert cancelled.cancel()
+
+    release.set()
+    with pytest.raises(ZeroDivisionError):
+        failing.result(timeout=5)
+    scheduler.submit(lambda: None).result(timeout=5)
+    assert ran == []
+    assert scheduler.stats()['queued'] == 0
+
+
+def test_busy_scheduler_returns_503(monkeypatch):
+    fastapi_testclient = pytest.importorskip('fastapi.testclient')
+    import main
+
+    scheduler, release = _blocked_scheduler(max_queued=0)
+    monkeypatch.setattr(main, 'get_scheduler', lambda: scheduler)
+    monkeypatch.setattr(main, 'load_portfolio_returns', lambda *args, **kwargs: {
+        'tickers': ['AAA'], 'weights': [1.0], 'returns': None, 'stats': WindowStats(None, None, 0)
+    })
+    try:
+        response = fastapi_testclient.TestClient(main.app).post('/portfolio_scenarios', json={
+            'tickers': ['AAA'], 'weights': [1.0], 'initial_investments': [1000],
+            'monthly_contributions': [0], 'contribution_frequencies': ['monthly']
+        })
+    finally:
+        release.set()
+
+    assert response.status_code == 503
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+
+
+
+def _on_event_loop():
+    """Whether the caller runs on the thread of a running event loop."""
+    import asyncio
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def test_scenario_data_loads_off_the_event_loop(monkeypatch):
+    fastapi_testclient = pytest.importorskip('fastapi.testclient')
+    import main
+
+    on_loop = []
+
+    def load(*args, **kwargs):
+        on_loop.append(_on_event_loop())
+        raise ValueError("No data")
+
+    monkeypatch.setattr(main, 'load_portfolio_returns', load)
+    response = fastapi_testclient.TestClient(main.app).post('/portfolio_scenarios', json={
+        'tickers': ['AAA'], 'weights': [1.0], 'initial_investments': [1000],
+        'monthly_contributions': [0], 'contribution_frequencies': ['monthly']
+    })
+
+    assert response.json() == {"error": "No data"}
+    assert on_loop == [False]
+
+
+def test_optimizer_loads_and_solves_off_the_event_loop(monkeypatch):
+    fastapi_testclient = pytest.importorskip('fastapi.testclient')
+    import numpy as np
+    import pandas as pd
+    import main
+
+    returns = pd.DataFrame(
+        np.random.default_rng(0).normal(0, 0.01, (60, 2)),
+        index=pd.bdate_range('2024-01-01', periods=60), columns=['AAA', 'BBB']
+    )
+    on_loop = []
+
+    def load(*args, **kwargs):
+        on_loop.append(_on_event_loop())
+        return {'tickers': ['AAA', 'BBB'], 'weights': [0.5, 0.5], 'returns': returns,
+                'stats': WindowStats(returns.mean().to_numpy(), returns.cov().to_numpy(), 60),
+                'data_sources': {}, 'warning': None}
+
+    def solve(*args, **kwargs):
+        on_loop.append(_on_event_loop())
+        return {'tickers': ['AAA', 'BBB']}
+
+    monkeypatch.setattr(main, 'load_portfolio_returns', load)
+    monkeypatch.setattr(main, 'compute_optimal_portfolios', solve)
+    response = fastapi_testclient.TestClient(main.app).post('/optimize_portfolio', json={
+        'tickers': ['AAA', 'BBB'], 'num_points': 10
+    })
+
+    assert response.json() == {'tickers': ['AAA', 'BBB'], 'data_sources': {}}
+    assert on_loop == [False, False]
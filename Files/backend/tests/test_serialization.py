@@ -0,0 +1,74 @@
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+from core import serialization
+
+
+class _Request:
+    def __init__(self, **headers):
+        self.headers = {name.lower().replace('_', '-'): value for name, value in headers.items()}
+
+
+def _payload():
+    return {
+        'years': np.arange(1, 11),
+        'percentiles': {'p50': np.linspace(1.0, 2.0, 10)},
+        'sharpe_ratio': np.float64(0.5),
+        'count': np.int64(3),
+        'tickers': ['AAA', 'BBB']
+    }
+
+
+def test_numpy_values_encode_like_builtins():
+    decoded = json.loads(serialization.dumps_json(_payload()))
+    assert decoded['years'] == list(range(1, 11))
+    assert decoded['percentiles']['p50'][-1] == 2.0
+    assert decoded['sharpe_ratio'] == 0.5 and decoded['count'] == 3
+    with pytest.raises(TypeError):
+        serialization.dumps_json({'value': object()})
+
+
+def test_json_fallback_encodes_non_finite_floats_as_null(monkeypatch):
+    monkeypatch.setattr(serialization, 'orjson', None)
+    payload = dict(_payload(), drawdown=float('nan'), series=np.array([1.0, np.nan, np.inf]),
+                   ratio=np.float64('-inf'), pair=(np.nan, 2))
+
+    decoded = json.loads(serialization.dumps_json(payload))
+    assert decoded['drawdown'] is None and decoded['ratio'] is None
+    assert decoded['series'] == [1.0, None, None]
+    assert decoded['pair'] == [None, 2]
+    assert decoded['years'] == list(range(1, 11)) and decoded['count'] == 3
+
+
+def test_gzip_is_negotiated_above_the_size_threshold(monkeypatch):
+    monkeypatch.setattr(serialization, 'brotli', None)
+    monkeypatch.setenv('RESPONSE_COMPRESSION_MIN_BYTES', '100')
+    large = {'values': list(range(500))}
+
+    response = serialization.encode_response(_Request(accept_encoding='br, gzip;q=0.8'), large)
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert json.loads(gzip.decompress(response.body)) == large
+
+    refused = serialization.encode_response(_Request(accept_encoding='gzip;q=0'), large)
+    small = serialization.encode_response(_Request(accept_encoding='gzip'), {'ok': True})
+    assert 'content-encoding' not in refused.headers
+    assert 'content-encoding' not in small.headers
+    assert json.loads(small.body) == {'ok': True}
+
+
+def test_msgpack_requests_fall_back_to_json_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, 'msgpack', None)
+    response = serialization.encode_response(_Request(accept='application/msgpack'), _payload())
+    assert response.media_type == 'application/json'
+    assert json.loads(response.body)['tickers'] == ['AAA', 'BBB']
+
+
+def test_msgpack_round_trip():
+    msgpack = pytest.importorskip('msgpack')
+    response = serialization.encode_response(_Request(accept='application/msgpack'), _payload())
+    assert response.media_type == 'application/msgpack'
+    assert msgpack.unpackb(response.body)['years'] == list(range(1, 11))
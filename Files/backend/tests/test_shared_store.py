@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from core.shared_store import SharedMatrixStore
+
+
+def _sample_matrix(days=30, tickers=3, seed=4):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.cumprod(1 + rng.normal(0.0005, 0.01, size=(days, tickers)), axis=0)
+    dates = [f"2024-01-{day + 1:02d}" for day in range(days)]
+    return dates, prices
+
+
+def test_round_trip_is_zero_copy(tmp_path):
+    store = SharedMatrixStore(store_dir=tmp_path)
+    dates, prices = _sample_matrix()
+    tickers = ["AAA", "BBB", "CCC"]
+    sources = {t: {"source": "yfinance", "cached": False} for t in tickers}
+
+    store.set(tickers, "2024-01-01", "2024-01-30", dates, prices, data_sources=sources)
+    entry = store.get(tickers, "2024-01-01", "2024-01-30")
+
+    assert entry['tickers'] == tickers
+    assert entry['dates'] == dates
+    assert entry['data_sources'] == sources
+    assert isinstance(entry['prices'], np.memmap)
+    assert not entry['prices'].flags.writeable
+    np.testing.assert_array_equal(entry['prices'], prices)
+    np.testing.assert_allclose(entry['returns'], prices[1:] / prices[:-1] - 1)
+    # Repeated lookups reuse the same mapping
+    assert store.get(tickers, "2024-01-01", "2024-01-30") is entry
+
+
+def test_missing_and_expired_entries(tmp_path):
+    store = SharedMatrixStore(store_dir=tmp_path, ttl_hours=0)
+    dates, prices = _sample_matrix(tickers=2)
+
+    assert store.get(["AAA", "BBB"], "2024-01-01", "2024-01-30") is None
+    store.set(["AAA", "BBB"], "2024-01-01", "2024-01-30", dates, prices)
+    assert store.get(["AAA", "BBB"], "2024-01-01", "2024-01-30") is None
+    store.clear_expired()
+    assert list(tmp_path.glob("*.mat")) == []
+
+
+def test_publishing_sweeps_expired_entries_periodically(tmp_path, monkeypatch):
+    from core import shared_store
+
+    store = SharedMatrixStore(store_dir=tmp_path, ttl_hours=1)
+    dates, prices = _sample_matrix(tickers=2)
+    store.set(["AAA", "BBB"], "2024-01-01", "2024-01-30", dates, prices)
+    old = next(tmp_path.glob("*.mat"))
+    os.utime(old, (old.stat().st_atime, old.stat().st_mtime - 7200))
+
+    # The first publish swept before the old entry expired; the next sweep waits for the interval
+    store.set(["AAA", "BBB"], "2024-01-02", "2024-01-31", dates, prices)
+    assert old.exists()
+
+    monkeypatch.setattr(shared_store, 'PURGE_INTERVAL_SECONDS', 0)
+    store.set(["AAA", "BBB"], "2024-01-03", "2024-02-01", dates, prices)
+    assert not old.exists()
+    assert len(list(tmp_path.glob("*.mat"))) == 2
+
+
+def test_other_process_attaches(tmp_path):
+    store = SharedMatrixStore(store_dir=tmp_path)
+    dates, prices = _sample_matrix(tickers=2)
+    store.set(["AAA", "BBB"], "2024-01-01", "2024-01-30", dates, prices)
+
+    script = (
+        "import sys; from core.shared_store import SharedMatrixStore; "
+        "entry = SharedMatrixStore(store_dir=sys.argv[1]).get(['AAA', 'BBB'], '2024-01-01', '2024-01-30'); "
+        "print(repr(float(entry['prices'][-1, 1])))"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, "-c", script, str(tmp_path)],
+        cwd=backend_dir, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert float(output) == prices[-1, 1]
+
+
+def test_mappings_are_bounded_and_pruned(tmp_path, monkeypatch):
+    from core import shared_store
+
+    store = SharedMatrixStore(store_dir=tmp_path, max_mapped=2)
+    other_worker = SharedMatrixStore(store_dir=tmp_path)
+    dates, prices = _sample_matrix(tickers=2)
+    windows = [("2024-01-01", "2024-01-30"), ("2024-01-02", "2024-01-31"), ("2024-01-03", "2024-02-01")]
+    for start, end in windows:
+        store.set(["AAA", "BBB"], start, end, dates, prices)
+        assert store.get(["AAA", "BBB"], start, end) is not None
+
+    # Least recently used mapping is dropped first
+    assert len(store._mapped) == 2
+    assert store._get_path(["AAA", "BBB"], *windows[0]) not in store._mapped
+
+    # A file another worker deleted is unmapped by the next sweep
+    other_worker._get_path(["AAA", "BBB"], *windows[2]).unlink()
+    monkeypatch.setattr(shared_store, 'PURGE_INTERVAL_SECONDS', 0)
+    store._maybe_purge()
+    assert list(store._mapped) == [store._get_path(["AAA", "BBB"], *windows[1])]
@@ -0,0 +1,83 @@
+import json
+import os
+import subprocess
+import sys
+
+from core import startup_profile
+
+# Import budget for `import main` in a fresh interpreter. Measured at ~0.6 s
+# after deferring yfinance/requests/uvicorn (~1.0 s before); override on slow
+# CI machines with STARTUP_IMPORT_BUDGET_SECONDS.
+IMPORT_BUDGET_SECONDS = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', 2.0))
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'seconds': elapsed,
+    'loaded': [name for name in ('yfinance', 'requests', 'uvicorn') if name in sys.modules],
+    'cache_created': __import__('core.cache_manager').cache_manager._cache is not None,
+}))
+"""
+
+
+def _probe_import():
+    result = subprocess.run(
+        [sys.executable, '-c', _PROBE],
+        cwd=startup_profile.BACKEND_DIR,
+        env=dict(os.environ, PYTHONPATH=startup_profile.BACKEND_DIR),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_main_stays_lazy_and_within_budget():
+    probe = min((_probe_import() for _ in range(2)), key=lambda p: p['seconds'])
+
+    assert probe['loaded'] == []
+    assert probe['cache_created'] is False
+    assert probe['seconds'] < IMPORT_BUDGET_SECONDS, (
+        f"import main took {probe['seconds']:.2f}s (budget {IMPORT_BUDGET_SECONDS:.2f}s); "
+        f"run `python -m core.startup_profile` to see which imports grew"
+    )
+
+
+def test_profile_imports_lists_imported_modules():
+    rows = startup_profile.profile_imports('core.monte_carlo')
+
+    names = [row['module'] for row in rows]
+    assert 'core.monte_carlo' in names
+    assert rows[0]['cumulative_ms'] >= rows[-1]['cumulative_ms']
+
+
+_DOTENV_PROBE = """
+import json, logging, os, sys, types
+# Stand-in .env: settings the logger and metrics read when main is imported
+sys.modules['dotenv'] = types.SimpleNamespace(
+    load_dotenv=lambda: os.environ.update(LOG_LEVEL='WARNING', METRICS_ENABLED='1')
+)
+import main
+from core import logger, metrics
+print(json.dumps({
+    'log_level': logging.getLevelName(logging.getLogger(logger.ROOT_LOGGER).level),
+    'metrics_enabled': metrics.metrics_enabled(),
+}))
+"""
+
+
+def test_dotenv_is_loaded_before_settings_are_read():
+    env = {key: value for key, value in os.environ.items() if key not in ('LOG_LEVEL', 'METRICS_ENABLED')}
+    result = subprocess.run(
+        [sys.executable, '-c', _DOTENV_PROBE],
+        cwd=startup_profile.BACKEND_DIR,
+        env=dict(env, PYTHONPATH=startup_profile.BACKEND_DIR),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == {'log_level': 'WARNING', 'metrics_enabled': True}
@@ -0,0 +1,100 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from sources import yfinance_source as yfs
+
+
+class _FakeDownload:
+    """Stand-in for yf.download returning a MultiIndex frame like yfinance 0.2+."""
+
+    def __init__(self, closes, fail_batches_larger_than=None):
+        self.closes = closes
+        self.fail_batches_larger_than = fail_batches_larger_than
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        with self.lock:
+            self.calls.append(list(tickers))
+        if self.fail_batches_larger_than and len(tickers) > self.fail_batches_larger_than:
+            raise RuntimeError("batch failed")
+
+        index = pd.date_range('2024-01-01', periods=3, freq='D')
+        columns = pd.MultiIndex.from_product([['Adj Close', 'Close'], tickers], names=['Price', 'Ticker'])
+        frame = pd.DataFrame(np.nan, index=index, columns=columns)
+        for ticker in tickers:
+            if ticker in self.closes:
+                frame[('Adj Close', ticker)] = self.closes[ticker]
+                frame[('Close', ticker)] = self.closes[ticker]
+        return frame
+
+
+def test_fetch_prices_batches_and_maps_tickers(monkeypatch):
+    tickers = [f"T{i}" for i in range(10)] + ["BRK.B"]
+    fake = _FakeDownload({ticker.replace('.', '-'): [1.0, np.nan, 3.0] for ticker in tickers})
+    monkeypatch.setattr(yfs.yf, "download", fake)
+    monkeypatch.setenv("YF_BATCH_SIZE", "4")
+
+    prices = yfs.fetch_prices(tickers, "2024-01-01", "2024-01-04")
+
+    assert sorted(prices) == sorted(tickers)
+    assert prices["BRK.B"] == [
+        {"date": "2024-01-01", "close": 1.0},
+        {"date": "2024-01-03", "close": 3.0},
+    ]
+    assert all(len(batch) <= 4 for batch in fake.calls)
+    assert sorted(t for batch in fake.calls for t in batch) == sorted(t.replace('.', '-') for t in tickers)
+
+
+def test_universes_are_split_only_beyond_the_batch_size(monkeypatch):
+    monkeypatch.setenv("YF_BATCH_SIZE", "4")
+
+    assert yfs._plan_batches(["A", "B", "C"]) == [["A", "B", "C"]]
+    assert yfs._plan_batches(["A", "B", "C", "D", "E", "F"]) == [["A", "B", "C", "D"], ["E", "F"]]
+
+
+def test_concurrent_fetches_never_overlap_downloads(monkeypatch):
+    """yfinance 0.2.x resets module-global results on every download call."""
+    shared = {}
+    inner = _FakeDownload({f"T{i}": [1.0, 2.0, 3.0] for i in range(12)})
+
+    def racy_download(tickers, **kwargs):
+        shared.clear()  # Like shared._DFS = {} at the start of yf.download
+        frame = inner(tickers, **kwargs)
+        shared.update({ticker: frame[('Adj Close', ticker)] for ticker in tickers})
+        time.sleep(0.02)  # Other calls clearing `shared` now lose this call's results
+        return pd.concat({'Adj Close': pd.DataFrame({ticker: shared[ticker] for ticker in tickers})}, axis=1)
+
+    monkeypatch.setattr(yfs.yf, "download", racy_download)
+    monkeypatch.setenv("YF_BATCH_SIZE", "2")
+    results = {}
+
+    def fetch(group):
+        results[group] = yfs.fetch_prices([f"T{i}" for i in range(group * 4, group * 4 + 4)], "2024-01-01", "2024-01-04")
+
+    threads = [threading.Thread(target=fetch, args=(group,)) for group in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(len(prices) == 4 for prices in results.values())
+    assert len(inner.calls) == 6  # No retries were needed
+
+
+def test_failed_batches_are_retried_per_ticker(monkeypatch):
+    fake = _FakeDownload(
+        {"AAA": [1.0, 2.0, 3.0], "BBB": [4.0, 5.0, 6.0]},
+        fail_batches_larger_than=1
+    )
+    monkeypatch.setattr(yfs.yf, "download", fake)
+    monkeypatch.setenv("YF_BATCH_SIZE", "3")
+
+    prices = yfs.fetch_prices(["AAA", "BBB", "ZZZ"], "2024-01-01", "2024-01-04")
+
+    assert sorted(prices) == ["AAA", "BBB"]
+    assert fake.calls[0] == ["AAA", "BBB", "ZZZ"]
+    assert sorted(fake.calls[1:]) == [["AAA"], ["BBB"], ["ZZZ"]]